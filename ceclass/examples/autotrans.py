@@ -9,6 +9,7 @@ Usage:
 """
 from __future__ import annotations
 import argparse
+import functools
 import time
 
 import torch
@@ -19,6 +20,8 @@ from ceclass.strategies.no_prune import NoPruneClassifier
 from ceclass.strategies.alw_mid import AlwMidClassifier
 from ceclass.strategies.bs_random import BSRandomClassifier
 from ceclass.strategies.long_bs import LongBSClassifier
+from ceclass.strategies.chain_bs import ChainBSClassifier
+from ceclass.strategies.factored import FactoredClassifier
 from ceclass.utils.data import load_traces
 
 
@@ -28,6 +31,7 @@ STRATEGIES = {
     'alw_mid': AlwMidClassifier,
     'bs_random': BSRandomClassifier,
     'long_bs': LongBSClassifier,
+    'chain_bs': ChainBSClassifier,
 }
 
 def build_at_spec(k_val: int = 2) -> tuple[STLNode, list]:
@@ -244,18 +248,37 @@ def run_classification(
     dt: float = 1.0,
     max_time_per_node: float = 60.0,
     eval_devices=None,
+    synth_mode: str = 'cmaes',
+    witness_values: bool = True,
+    eval_workers=None,
+    compact_graph: bool = False,
+    lattice_cache=None,
+    hasse_edges: bool = False,
+    canonical: bool = False,
+    parse_workers=None,
+    factorize: bool = False,
+    previous=None,
+    lazy_graph: bool = False,
+    speculative_workers=None,
 ):
     """Run classification and print results. Returns (result, classifier)."""
     strategy_cls = STRATEGIES[strategy_name]
 
-    print(f"Strategy: {strategy_name}")
+    print(f"Strategy: {strategy_name}" + (" (factorized)" if factorize else ""))
     print(f"Formula: {formula}")
     print(f"Traces shape: {traces.shape}")
     print(f"Device: {device}")
     if eval_devices is not None:
         print(f"Eval devices (robustness vmap): {eval_devices}")
+    if eval_workers is not None:
+        print(f"Eval workers (CPU processes): {eval_workers}")
     print("-" * 60)
 
+    if factorize:
+        strategy_cls = functools.partial(FactoredClassifier, strategy=strategy_cls)
+    if speculative_workers:
+        # LongBSClassifier only (see main).
+        strategy_cls = functools.partial(strategy_cls, speculative_workers=speculative_workers)
     classifier = strategy_cls(
         formula=formula,
         k=k,
@@ -264,17 +287,44 @@ def run_classification(
         dt=dt,
         max_time_per_node=max_time_per_node,
         eval_devices=eval_devices,
+        synth_mode=synth_mode,
+        witness_values=witness_values,
+        eval_workers=eval_workers,
+        compact_graph=compact_graph,
+        lattice_cache=lattice_cache,
+        hasse_edges=hasse_edges,
+        canonical=canonical,
+        parse_workers=parse_workers,
+        previous=previous,
+        lazy_graph=lazy_graph,
     )
 
-    print(f"Lattice: {classifier.num_classes} refined formulas")
+    if lazy_graph:
+        print(f"Lattice: {classifier.graph.num_terms} product terms (lazy)")
+    else:
+        print(f"Lattice: {classifier.num_classes} refined formulas")
     print(f"Parse time: {classifier.time_split:.3f}s")
+    if previous is not None:
+        print(f"Reused from previous run: {classifier.num_reused} nodes")
     print("-" * 60)
 
-    result = classifier.solve()
+    try:
+        result = classifier.solve()
+    finally:
+        classifier.close()
 
     print(f"\nResults:")
-    print(f"  Classes (total):     {result.num_classes}")
-    print(f"  Classes (covered):   {result.num_covered}")
+    if result.num_terms is not None:
+        # Lazy search: what was explored, not lattice classes.
+        print(f"  Product terms:       {result.num_terms}")
+        print(f"  Nodes built:         {result.num_built}")
+        print(f"  Covered generators:  {result.num_covered_generators}")
+        if result.num_classes is not None:
+            print(f"  Classes (enumerated, total):   {result.num_classes}")
+            print(f"  Classes (enumerated, covered): {result.num_covered}")
+    else:
+        print(f"  Classes (total):     {result.num_classes}")
+        print(f"  Classes (covered):   {result.num_covered}")
     print(f"  Parse time:          {result.time_split:.3f}s")
     print(f"  Classification time: {result.time_class:.3f}s")
     print(f"  Total time:          {result.time_total:.3f}s")
@@ -293,11 +343,33 @@ def main():
     parser.add_argument("--device", type=str, default="cuda")
     parser.add_argument("--dt", type=float, default=1.0)
     parser.add_argument("--max-time", type=float, default=60.0)
+    parser.add_argument("--synth", type=str, default="cmaes", choices=["cmaes", "exact"],
+                        help="Parametric node search: CMA-ES or exhaustive split-point grid")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Shard traces across this many CPU worker processes")
+    parser.add_argument("--compact-graph", action="store_true",
+                        help="Classify on the array-backed CompactGraph")
+    parser.add_argument("--lattice-cache", type=str, default=None,
+                        help="Directory of cached parsed lattices (created if missing)")
+    parser.add_argument("--hasse-edges", action="store_true",
+                        help="Build the lattice's immediate edges directly from product covers")
+    parser.add_argument("--canonical", action="store_true",
+                        help="Merge refinements with the same canonical form into one node")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="Build the lattice's root product in this many processes")
+    parser.add_argument("--factorize", action="store_true",
+                        help="Classify the children of a root AND/OR separately (FactoredClassifier)")
+    parser.add_argument("--lazy-graph", action="store_true",
+                        help="Explore the lattice on demand (long_bs, alw_mid, bs_random)")
+    parser.add_argument("--speculative-workers", type=int, default=None,
+                        help="long_bs: test the next midpoints ahead in this many threads")
     parser.add_argument("--plot-lattice", type=str, default=None,
                         help="Save lattice Hasse diagram to this path (e.g. lattice.png)")
     parser.add_argument("--plot-landscape", type=str, default=None,
                         help="Save robustness landscape for each parametric covered node to this prefix (e.g. landscape)")
     args = parser.parse_args()
+    if args.speculative_workers and (args.strategy != 'long_bs' or args.factorize):
+        parser.error("--speculative-workers needs --strategy long_bs without --factorize")
 
     device = torch.device(args.device)
 
@@ -323,6 +395,16 @@ def main():
         device=device,
         dt=args.dt,
         max_time_per_node=args.max_time,
+        synth_mode=args.synth,
+        eval_workers=args.workers,
+        compact_graph=args.compact_graph,
+        lattice_cache=args.lattice_cache,
+        hasse_edges=args.hasse_edges,
+        canonical=args.canonical,
+        parse_workers=args.parse_workers,
+        factorize=args.factorize,
+        lazy_graph=args.lazy_graph,
+        speculative_workers=args.speculative_workers,
     )
 
     if args.plot_lattice or args.plot_landscape:
@@ -10,15 +10,19 @@ import argparse
 import csv
 import time
 from itertools import product as iterproduct
+from typing import Optional
 
 import torch
 
 from ceclass.formula.stl_node import STLNode
+from ceclass.lattice.cache import LatticeCache
 from ceclass.strategies.bfs import BFSClassifier
 from ceclass.strategies.no_prune import NoPruneClassifier
 from ceclass.strategies.alw_mid import AlwMidClassifier
 from ceclass.strategies.bs_random import BSRandomClassifier
 from ceclass.strategies.long_bs import LongBSClassifier
+from ceclass.strategies.chain_bs import ChainBSClassifier
+from ceclass.strategies.base import ClassificationResult
 
 
 STRATEGIES = {
@@ -27,6 +31,7 @@ STRATEGIES = {
     'no_prune': NoPruneClassifier,
     'alw_mid': AlwMidClassifier,
     'bs_random': BSRandomClassifier,
+    'chain_bs': ChainBSClassifier,
 }
 
 
@@ -56,9 +61,16 @@ def run_single(
     dt: float,
     max_time_per_node: float,
     max_evals_per_node: int,
-) -> dict:
+    lattice_cache=None,
+    hasse_edges: bool = False,
+    canonical: bool = False,
+    parse_workers=None,
+    traces: Optional[torch.Tensor] = None,
+    previous: Optional[ClassificationResult] = None,
+) -> tuple[dict, ClassificationResult]:
     formula, k = build_at_spec(k_val)
-    traces = generate_traces(num_traces, timesteps=50, device=device)
+    if traces is None:
+        traces = generate_traces(num_traces, timesteps=50, device=device)
 
     strategy_cls = STRATEGIES[strategy_name]
     classifier = strategy_cls(
@@ -69,6 +81,11 @@ def run_single(
         dt=dt,
         max_time_per_node=max_time_per_node,
         max_evals_per_node=max_evals_per_node,
+        lattice_cache=lattice_cache,
+        hasse_edges=hasse_edges,
+        canonical=canonical,
+        parse_workers=parse_workers,
+        previous=previous,
     )
 
     result = classifier.solve()
@@ -83,7 +100,7 @@ def run_single(
         'time_class': round(result.time_class, 4),
         'time_total': round(result.time_total, 4),
         'num_synth_calls': result.num_synth_calls,
-    }
+    }, result
 
 
 def main():
@@ -95,9 +112,20 @@ def main():
     parser.add_argument("--output", type=str, default="benchmark_results.csv")
     parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES.keys()),
                         choices=list(STRATEGIES.keys()))
+    parser.add_argument("--lattice-cache", type=str, default=None,
+                        help="Directory of cached parsed lattices, shared by all runs")
+    parser.add_argument("--hasse-edges", action="store_true",
+                        help="Build the lattice's immediate edges directly from product covers")
+    parser.add_argument("--canonical", action="store_true",
+                        help="Merge refinements with the same canonical form into one node")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help="Build the lattice's root product in this many processes")
+    parser.add_argument("--reuse-k", action="store_true",
+                        help="Fix one trace set per trace count and pre-prune each k with the k-1 result")
     args = parser.parse_args()
 
     device = torch.device(args.device)
+    lattice_cache = LatticeCache(args.lattice_cache) if args.lattice_cache else None
 
     k_values = [1, 2, 3, 4, 5]
     trace_counts = [30, 50, 70, 100]
@@ -116,13 +144,18 @@ def main():
 
     rows = []
     run_idx = 0
+    # With --reuse-k every k sees the same traces, so results carry over.
+    trace_sets = {}
+    previous = {}
+    if args.reuse_k:
+        trace_sets = {n: generate_traces(n, timesteps=50, device=device) for n in trace_counts}
 
     for strategy_name, k_val, num_traces in iterproduct(strategies, k_values, trace_counts):
         run_idx += 1
         print(f"[{run_idx}/{total_runs}] strategy={strategy_name}, k={k_val}, traces={num_traces} ... ", end="", flush=True)
 
         try:
-            row = run_single(
+            row, result = run_single(
                 strategy_name=strategy_name,
                 k_val=k_val,
                 num_traces=num_traces,
@@ -130,7 +163,15 @@ def main():
                 dt=args.dt,
                 max_time_per_node=args.max_time,
                 max_evals_per_node=args.max_evals,
+                lattice_cache=lattice_cache,
+                hasse_edges=args.hasse_edges,
+                canonical=args.canonical,
+                parse_workers=args.parse_workers,
+                traces=trace_sets.get(num_traces),
+                previous=previous.get((strategy_name, k_val - 1, num_traces)),
             )
+            if args.reuse_k:
+                previous[strategy_name, k_val, num_traces] = result
             rows.append(row)
             print(f"classes={row['num_classes']}, covered={row['num_covered']}, "
                   f"calls={row['num_synth_calls']}, time={row['time_total']:.3f}s")
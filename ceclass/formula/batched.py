@@ -0,0 +1,83 @@
+"""
+Batched robustness at t=0 over (parameter candidates x traces).
+
+stlcgpp bakes interval bounds into each module, so scoring a CMA-ES
+population through ``to_stlcgpp`` costs one module build, one vmap and one
+host sync per candidate. Here a whole population is evaluated in one pass
+(through a compiled ``FormulaTemplate``, see template.py) with a leading
+candidate dimension carried through every operator. The kernels reproduce
+stlcgpp's quantitative semantics, including the ``-1e9`` padding for windows
+that run past the end of the trace and the ``±1e9`` value of an empty window.
+"""
+from __future__ import annotations
+from typing import Optional, Sequence
+
+import torch
+
+from ceclass.formula.stl_node import STLNode
+from ceclass.formula.sparse_table import LARGE_NUMBER, SparseTable
+
+# Robustness of the TRUE / FALSE leaves (see converter.to_stlcgpp).
+TRUE_ROBUSTNESS = 1e6
+
+
+def batch_rob0(
+    node: STLNode,
+    traces: torch.Tensor,
+    dt: float = 1.0,
+    params: Optional[torch.Tensor] = None,
+    param_names: Sequence[str] = (),
+) -> torch.Tensor:
+    """
+    Robustness of ``node`` at t=0 for every (candidate, trace) pair.
+
+    One-shot convenience wrapper; callers that evaluate the same formula
+    repeatedly should keep a ``FormulaTemplate`` instead.
+
+    Args:
+        node: Formula to evaluate.
+        traces: Shape (num_traces, timesteps, dims).
+        dt: Timestep duration for converting continuous time to indices.
+        params: Candidate parameter values, shape (num_candidates, len(param_names)).
+            ``None`` evaluates a parameter-free formula as a single candidate.
+        param_names: Column order of ``params``.
+
+    Returns:
+        Tensor of shape (num_candidates, num_traces).
+    """
+    from ceclass.formula.template import FormulaTemplate
+    return FormulaTemplate(node, dt, param_names).rob0(traces, params)
+
+
+def window_reduce(
+    child: torch.Tensor,
+    lo: torch.Tensor,
+    hi: torch.Tensor,
+    length: int,
+    is_min: bool,
+    lo_min: Optional[int] = None,
+    reach: Optional[int] = None,
+) -> torch.Tensor:
+    """
+    out[p, n, t] = min (or max) of child[p, n, s] over s in [t + lo[p], t + hi[p]].
+
+    Positions past the end of ``child`` read as ``-LARGE_NUMBER`` (stlcgpp's
+    padding) and an empty window yields ``+LARGE_NUMBER`` for min and
+    ``-LARGE_NUMBER`` for max, as stlcgpp's mask value does. Answered from a
+    ``SparseTable`` built over ``child``; keep the table instead when the same
+    child is queried with several windows.
+
+    Args:
+        child: Shape (Pc, N, Lc) with Pc either 1 or P.
+        lo, hi: Window offsets in timesteps, shape (P,) or (1,).
+        length: Number of output timesteps.
+        is_min: True for always (min), False for eventually (max).
+        lo_min, reach: ``max(min(lo), 0)`` and ``max(max(hi), 0)`` when already
+            known on the host (avoids a device sync); they bound the table depth.
+    """
+    if reach is None:
+        reach = max(int(hi.max().item()), 0)
+    if lo_min is None:
+        lo_min = max(int(lo.min().item()), 0)
+    table = SparseTable(child, is_min, max_width=reach - lo_min + 1)
+    return table.query(lo, hi, length)
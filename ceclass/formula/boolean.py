@@ -0,0 +1,59 @@
+"""
+Sign-only STL semantics for covered / not-covered decisions.
+
+A non-parametric node check only asks whether rho(phi, sigma_i) < 0 at t=0
+for some trace. Every signal is carried as two masks, ``neg`` (rho < 0) and
+``nonpos`` (rho <= 0), which propagate exactly:
+
+- AND (min):  neg = neg_a | neg_b,   nonpos = nonpos_a | nonpos_b
+- OR (max):   neg = neg_a & neg_b,   nonpos = nonpos_a & nonpos_b
+- NOT:        neg = ~nonpos,         nonpos = ~neg
+- always / eventually: "any" / "all" of the masks over the window, counted
+  with prefix sums. Samples past the trace end are stlcgpp's -1e9 padding
+  (both masks set); an empty window is +1e9 for always and -1e9 for
+  eventually.
+
+The verdict therefore matches the quantitative one, including rho == 0.
+"""
+from __future__ import annotations
+
+import torch
+
+
+def window_signs(
+    neg: torch.Tensor,
+    nonpos: torch.Tensor,
+    lo: int,
+    hi: int,
+    length: int,
+    is_min: bool,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Masks of min (always) or max (eventually) over windows [t + lo, t + hi].
+
+    Args:
+        neg, nonpos: Child masks, shape (N, Lc).
+        lo, hi: Window offsets in timesteps.
+        length: Number of output timesteps.
+        is_min: True for always, False for eventually.
+
+    Returns:
+        (neg, nonpos) of shape (N, length).
+    """
+    lo = max(lo, 0)
+    num_traces = neg.shape[0]
+    if hi < lo:
+        # Empty window: +1e9 for always (neither mask), -1e9 for eventually (both).
+        empty = torch.full((num_traces, length), not is_min, dtype=torch.bool, device=neg.device)
+        return empty, empty.clone()
+
+    width = hi - lo + 1
+    outputs = []
+    for mask in (neg, nonpos):
+        short = length + hi - mask.shape[-1]
+        if short > 0:
+            mask = torch.cat([mask, mask.new_ones((num_traces, short))], dim=-1)
+        counts = torch.nn.functional.pad(mask.to(torch.int32).cumsum(dim=-1), (1, 0))
+        in_window = counts[:, lo + width:lo + width + length] - counts[:, lo:lo + length]
+        outputs.append(in_window > 0 if is_min else in_window == width)
+    return outputs[0], outputs[1]
@@ -0,0 +1,87 @@
+"""
+Precomputed predicate robustness signals for one classification run.
+
+Every lattice node and every synthesis candidate reads the same handful of
+atomic predicates (``speed < 90``, ``RPM < 4000``, ...). A ``PredicateStore``
+computes ``threshold - x`` / ``x - threshold`` once per trace set, keeps the
+result on the traces' device and hands out views of it. Signals are never
+evicted while their trace set is in use: there are only as many as distinct
+predicates in the specification. Only the least recently used trace sets
+(e.g. per-call copies onto another device) are dropped.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+
+import torch
+
+# Trace sets (devices, shards) whose predicate signals are kept.
+DEFAULT_MAX_TRACE_SETS = 8
+
+
+class PredicateStore:
+    """
+    Robustness signals of atomic predicates, shape (1, num_traces, timesteps).
+
+    Args:
+        max_trace_sets: Number of distinct trace tensors to keep signals for.
+    """
+
+    def __init__(self, max_trace_sets: int = DEFAULT_MAX_TRACE_SETS):
+        self.max_trace_sets = max_trace_sets
+        self.hits = 0
+        self.misses = 0
+        self._trace_sets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def signal(self, traces: torch.Tensor, op: str, column: int, threshold: float) -> torch.Tensor:
+        """
+        Robustness of ``x[column] op threshold`` over every sample of ``traces``.
+
+        Views that share storage with earlier ``traces`` but are cropped to
+        fewer timesteps (see ``crop_to_horizon``) reuse the same entry.
+
+        Args:
+            traces: Shape (num_traces, timesteps, dims).
+            op: ``'<'`` or ``'>'``.
+            column: Signal index into the last dimension.
+            threshold: Predicate threshold.
+        """
+        # Keyed on storage and layout but not on length: a crop is a prefix.
+        set_key = (traces.data_ptr(), traces.shape[0], traces.stride(), traces.dtype,
+                   traces.device)
+        key = (op, column, float(threshold))
+        length = traces.shape[1]
+        with self._lock:
+            entry = self._trace_sets.get(set_key)
+            if entry is not None:
+                self._trace_sets.move_to_end(set_key)
+                signal = entry[1].get(key)
+                if signal is not None and signal.shape[-1] >= length:
+                    self.hits += 1
+                    return signal[..., :length]
+            self.misses += 1
+        if op == '<':
+            signal = (threshold - traces[:, :, column]).unsqueeze(0)
+        elif op == '>':
+            signal = (traces[:, :, column] - threshold).unsqueeze(0)
+        else:
+            raise ValueError(f"Unknown predicate op: {op}")
+        with self._lock:
+            entry = self._trace_sets.get(set_key)
+            if entry is None or entry[0].shape[1] < length:
+                # Holding ``traces`` keeps its storage (and so the key) from being reused.
+                entry = (traces, {} if entry is None else entry[1])
+                self._trace_sets[set_key] = entry
+                if len(self._trace_sets) > self.max_trace_sets:
+                    self._trace_sets.popitem(last=False)
+            entry[1][key] = signal
+        return signal
+
+    def clear(self) -> None:
+        with self._lock:
+            self._trace_sets.clear()
+
+    def __len__(self) -> int:
+        """Number of stored predicate signals."""
+        return sum(len(signals) for _, signals in self._trace_sets.values())
@@ -0,0 +1,90 @@
+"""
+Robustness signals of parameter-free subformulas, shared across lattice nodes.
+
+Refined lattice nodes are built from the same predicates and segments
+(``formula_dict`` entries, ``AlwX`` / ``EvX`` pieces), so the same subtree is
+evaluated by many nodes. ``FormulaTemplate`` gives every parameter-free op a
+structural key (operator, canonical children, interval in timesteps; node IDs
+play no part) and looks it up here before evaluating the subtree.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+import torch
+
+# Default bound on the bytes of cached signals.
+DEFAULT_MAX_BYTES = 1 << 28
+
+
+def traces_key(traces: torch.Tensor) -> tuple:
+    """Identity of a trace tensor (storage, layout, device)."""
+    return (traces.data_ptr(), tuple(traces.shape), traces.stride(),
+            traces.dtype, traces.device)
+
+
+class SignalCache:
+    """
+    LRU cache of subformula robustness signals, bounded in bytes.
+
+    Entries are keyed by (trace set, structural key) and hold a signal of shape
+    (1, num_traces, L) whose first L timesteps are exact. A lookup for a shorter
+    prefix is a hit; a longer one is a miss and the entry is replaced. Each
+    entry keeps a reference to its traces so their storage, and therefore the
+    key, cannot be reused while the entry is alive.
+
+    Args:
+        max_bytes: Evict least recently used signals beyond this many bytes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, traces: torch.Tensor, key: Hashable, length: int) -> Optional[torch.Tensor]:
+        """Cached signal with at least ``length`` exact timesteps, or None."""
+        entry_key = (traces_key(traces), key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None or entry[0].shape[-1] < length:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, traces: torch.Tensor, key: Hashable, signal: torch.Tensor) -> None:
+        """Store ``signal`` unless a longer one is already cached."""
+        size = signal.element_size() * signal.nelement()
+        if size > self.max_bytes:
+            return
+        entry_key = (traces_key(traces), key)
+        with self._lock:
+            old = self._entries.pop(entry_key, None)
+            if old is not None:
+                if old[0].shape[-1] >= signal.shape[-1]:
+                    self._entries[entry_key] = old
+                    return
+                self._bytes -= old[0].element_size() * old[0].nelement()
+            self._entries[entry_key] = (signal, traces)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                evicted, _ = self._entries.popitem(last=False)[1]
+                self._bytes -= evicted.element_size() * evicted.nelement()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def num_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
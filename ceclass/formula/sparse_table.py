@@ -0,0 +1,107 @@
+"""
+Sparse-table range-min / range-max over robustness signals.
+
+An Always/Eventually whose interval is a split-point parameter keeps the same
+child signal for every candidate; only the window moves. A ``SparseTable``
+precomputes the min (or max) over every power-of-two run of the child once,
+after which the reduction over any window [a, b] is the min of two
+overlapping runs: two gathers per (candidate, trace, timestep) instead of a
+scan over the window.
+"""
+from __future__ import annotations
+from typing import Optional, Union
+
+import torch
+
+# stlcgpp's default ``large_number``: padding past the trace end and the
+# value of an empty always (+) / eventually (-) window.
+LARGE_NUMBER = 1e9
+
+
+class SparseTable:
+    """
+    Range-reduction table over the last axis of ``signal``.
+
+    Level ``k`` holds the reduction over ``[i, i + 2**k)``. One ``-LARGE_NUMBER``
+    position is appended after the signal so that windows running past its end
+    read stlcgpp's padding: query indices are clamped onto that position.
+
+    Args:
+        signal: Shape (Pc, N, L); Pc is 1 for a candidate-independent child.
+        is_min: True for always (min), False for eventually (max).
+        max_width: Widest window that will be queried. Defaults to the full
+            padded length; a smaller value builds fewer levels.
+    """
+
+    def __init__(self, signal: torch.Tensor, is_min: bool, max_width: Optional[int] = None):
+        self.is_min = is_min
+        self._reduce = torch.minimum if is_min else torch.maximum
+        self.empty = LARGE_NUMBER if is_min else -LARGE_NUMBER
+
+        pad = signal.new_full((*signal.shape[:-1], 1), -LARGE_NUMBER)
+        level = torch.cat([signal, pad], dim=-1)
+        self.size = level.shape[-1]
+        widest = self.size if max_width is None else max(1, min(max_width, self.size))
+        self.num_levels = widest.bit_length()
+
+        levels = [level]
+        for k in range(1, self.num_levels):
+            half = 1 << (k - 1)
+            level = torch.cat([
+                self._reduce(level[..., :-half], level[..., half:]),
+                level[..., -half:],  # never read: windows this wide start earlier
+            ], dim=-1)
+            levels.append(level)
+        # (Pc, N, num_levels * size) so one gather picks both level and position.
+        self.table = torch.cat(levels, dim=-1)
+
+        widths = torch.arange(1, widest + 1, device=signal.device)
+        self._log2 = torch.cat([
+            torch.zeros(1, dtype=torch.long, device=signal.device),
+            torch.floor(torch.log2(widths.double())).long(),
+        ])
+
+    @property
+    def num_windows(self) -> int:
+        return self.table.shape[0]
+
+    def query(
+        self,
+        lo: Union[int, torch.Tensor],
+        hi: Union[int, torch.Tensor],
+        length: int,
+    ) -> torch.Tensor:
+        """
+        out[p, n, t] = reduction of signal[p, n, s] over s in [t + lo[p], t + hi[p]].
+
+        Args:
+            lo, hi: Window offsets in timesteps, ints or tensors of shape (P,) or (1,).
+            length: Number of output timesteps.
+
+        Returns:
+            Tensor of shape (max(Pc, P), N, length). Empty windows (hi < lo)
+            yield ``+LARGE_NUMBER`` for min and ``-LARGE_NUMBER`` for max.
+        """
+        device = self.table.device
+        lo = torch.as_tensor(lo, device=device).reshape(-1, 1, 1).clamp(min=0)
+        hi = torch.as_tensor(hi, device=device).reshape(-1, 1, 1)
+        t = torch.arange(length, device=device).view(1, 1, -1)
+
+        last = self.size - 1
+        start = (t + lo).clamp(max=last)
+        stop = (t + hi).clamp(min=0, max=last)
+        empty = hi < lo
+        width = (stop - start + 1).clamp(min=1, max=self._log2.shape[0] - 1)
+        k = self._log2[width]
+        offset = k * self.size
+        first = offset + start
+        second = offset + stop + 1 - (torch.ones_like(k) << k)
+
+        num_windows = max(self.num_windows, lo.shape[0], hi.shape[0])
+        shape = (num_windows, self.table.shape[1], length)
+        table = self.table.expand(num_windows, -1, -1)
+        out = self._reduce(
+            torch.gather(table, -1, first.expand(shape)),
+            torch.gather(table, -1, second.expand(shape)),
+        )
+        return torch.where(empty, self.empty, out)
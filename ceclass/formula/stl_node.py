@@ -135,6 +135,31 @@ class STLNode:
 
     # --- Display ---
 
+    def horizon(self, dt: float = 1.0,
+                param_bounds: Optional[dict[str, tuple[float, float]]] = None) -> Optional[int]:
+        """
+        Last timestep index that the robustness at t=0 can depend on.
+
+        Interval ends are rounded to ``int(round(b / dt))`` as in the converter;
+        a symbolic end takes the upper end of its ``param_bounds`` range.
+        Returns None if a symbolic end has no known range.
+        """
+        reach = 0
+        if self.interval is not None:
+            end = self.interval[1]
+            if isinstance(end, str):
+                if param_bounds is None or end not in param_bounds:
+                    return None
+                end = param_bounds[end][1]
+            reach = max(int(round(float(end) / dt)), 0)
+        child_reach = 0
+        for child in self.children:
+            h = child.horizon(dt, param_bounds)
+            if h is None:
+                return None
+            child_reach = max(child_reach, h)
+        return reach + child_reach
+
     def __str__(self) -> str:
         if self.node_type == 'predicate':
             return f"{self.predicate_name} {self.predicate_op} {self.predicate_threshold}"
@@ -0,0 +1,451 @@
+"""
+Compiled parametric formula templates.
+
+``to_stlcgpp`` (and a plain tree walk) rebuild the formula for every
+parameter vector. A ``FormulaTemplate`` flattens an STLNode tree once into a
+post-order list of operations, merging structurally identical subtrees and
+resolving predicate columns and fixed interval bounds up front. Symbolic
+interval bounds stay as parameter columns that are bound at call time, so
+evaluating a new batch of candidates is a single pass over the op list with
+no tree walk or module allocation.
+
+When a split-point window sits over a parameter-free child, the child's
+``SparseTable`` is kept between calls on the same traces: later candidate
+batches skip the child subtree entirely and only do the table lookups.
+Parameter-free subtrees can also be shared between templates (lattice nodes)
+through a ``SignalCache``, and predicate leaves through a ``PredicateStore``.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import torch
+
+from ceclass.formula.stl_node import STLNode
+from ceclass.formula.batched import TRUE_ROBUSTNESS
+from ceclass.formula.boolean import window_signs
+from ceclass.formula.predicate_store import PredicateStore
+from ceclass.formula.signal_cache import SignalCache, traces_key
+from ceclass.formula.sparse_table import SparseTable
+
+_PREDICATES = {'pred_lt': '<', 'pred_gt': '>'}
+# Trace tensors whose static tables are kept (one per device shard / OOM chunk).
+_MAX_CACHED_TRACES = 8
+
+
+class _Op:
+    """One operation in a compiled template."""
+    __slots__ = ('kind', 'args', 'column', 'threshold', 'lo', 'hi')
+
+    def __init__(self, kind: str, args: tuple = (), column: Optional[int] = None,
+                 threshold: float = 0.0, lo=None, hi=None):
+        self.kind = kind            # 'pred_lt', 'pred_gt', 'const', 'neg', 'min', 'max', 'always', 'eventually'
+        self.args = args            # indices of operand ops
+        self.column = column        # signal column for predicates
+        self.threshold = threshold  # predicate threshold or constant value
+        self.lo = lo                # interval bounds: ('fixed', steps) or ('param', column)
+        self.hi = hi
+
+    def __repr__(self):
+        return f"_Op({self.kind}, args={self.args})"
+
+
+class FormulaTemplate:
+    """
+    Reusable robustness evaluator for one formula structure.
+
+    Args:
+        formula: Formula to compile, or a non-empty sequence of formulas
+            compiled into one program (subtrees they share are evaluated once;
+            see ``rob0_all`` and ``violated_all``).
+        dt: Timestep duration for converting continuous time to indices.
+        param_names: Column order of the parameter matrix passed at call time.
+            Defaults to the formulas' ``get_param_names()``.
+    """
+
+    def __init__(self, formula: Union[STLNode, Sequence[STLNode]], dt: float = 1.0,
+                 param_names: Optional[Sequence[str]] = None):
+        self.formulas = [formula] if isinstance(formula, STLNode) else list(formula)
+        if not self.formulas:
+            raise ValueError("FormulaTemplate needs at least one formula")
+        self.formula = self.formulas[0]
+        self.dt = dt
+        if param_names is None:
+            param_names = dict.fromkeys(n for f in self.formulas for n in f.get_param_names())
+        self.param_names = list(param_names)
+        self._columns = {name: i for i, name in enumerate(self.param_names)}
+        self.ops: list[_Op] = []
+        self._memo: dict[tuple, int] = {}
+        self.roots = [self._compile(f) for f in self.formulas]
+        self.root = self.roots[0]
+        del self._memo
+
+        # Number of consumers per op, so intermediate signals can be freed early.
+        self._uses = [0] * len(self.ops)
+        for op in self.ops:
+            for a in op.args:
+                self._uses[a] += 1
+        for r in self.roots:
+            self._uses[r] += 1
+
+        # Ops whose signal does not depend on the parameters.
+        self._static = []
+        for op in self.ops:
+            fixed = op.lo is None or (op.lo[0] == 'fixed' and op.hi[0] == 'fixed')
+            self._static.append(fixed and all(self._static[a] for a in op.args))
+        # Parametric windows over a static child: their tables are cached.
+        self._cached_children = {
+            i: op.args[0] for i, op in enumerate(self.ops)
+            if op.kind in ('always', 'eventually')
+            and not self._static[i] and self._static[op.args[0]]
+        }
+        self._tables: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Structural key of every static op, for sharing through a SignalCache.
+        self._keys: list[Optional[tuple]] = []
+        for i, op in enumerate(self.ops):
+            if not self._static[i]:
+                self._keys.append(None)
+            elif op.kind in ('pred_lt', 'pred_gt'):
+                self._keys.append((op.kind, op.column, op.threshold))
+            elif op.kind == 'const':
+                self._keys.append((op.kind, op.threshold))
+            elif op.kind in ('min', 'max'):
+                # Commutative: operand order does not matter.
+                self._keys.append((op.kind, frozenset(self._keys[a] for a in op.args)))
+            elif op.kind == 'neg':
+                self._keys.append((op.kind, self._keys[op.args[0]]))
+            else:
+                self._keys.append((op.kind, self._keys[op.args[0]], op.lo[1], op.hi[1]))
+
+    # ------------------------------------------------------------------
+    # Compilation
+    # ------------------------------------------------------------------
+
+    def _bound(self, value: Union[str, float]) -> tuple[str, int]:
+        if isinstance(value, (int, float)):
+            return ('fixed', int(round(float(value) / self.dt)))
+        if isinstance(value, str):
+            if value not in self._columns:
+                raise KeyError(
+                    f"Parametric interval bound '{value}' not found in params: {self.param_names}"
+                )
+            return ('param', self._columns[value])
+        raise TypeError(f"Unexpected interval bound type: {type(value)}")
+
+    def _emit(self, key: tuple, op: _Op) -> int:
+        idx = self._memo.get(key)
+        if idx is None:
+            idx = len(self.ops)
+            self.ops.append(op)
+            self._memo[key] = idx
+        return idx
+
+    def _compile(self, node: STLNode) -> int:
+        t = node.node_type
+        if t == 'predicate':
+            if node.predicate_op == '<':
+                kind = 'pred_lt'
+            elif node.predicate_op == '>':
+                kind = 'pred_gt'
+            else:
+                raise ValueError(f"Unknown predicate op: {node.predicate_op}")
+            threshold = float(node.predicate_threshold)
+            return self._emit((kind, node.signal_index, threshold),
+                              _Op(kind, column=node.signal_index, threshold=threshold))
+        elif t in ('true', 'false'):
+            value = TRUE_ROBUSTNESS if t == 'true' else -TRUE_ROBUSTNESS
+            return self._emit(('const', value), _Op('const', threshold=value))
+        elif t == 'not':
+            a = self._compile(node.children[0])
+            return self._emit(('neg', a), _Op('neg', (a,)))
+        elif t in ('and', 'or'):
+            a = self._compile(node.children[0])
+            b = self._compile(node.children[1])
+            kind = 'min' if t == 'and' else 'max'
+            return self._emit((kind, a, b), _Op(kind, (a, b)))
+        elif t in ('always', 'eventually'):
+            a = self._compile(node.children[0])
+            lo = self._bound(node.interval[0])
+            hi = self._bound(node.interval[1])
+            return self._emit((t, a, lo, hi), _Op(t, (a,), lo=lo, hi=hi))
+        raise ValueError(f"Unknown STLNode type: {t}")
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def _param_steps(self, params) -> Optional[torch.Tensor]:
+        """Round a (P, n_params) parameter matrix to timestep indices on the host."""
+        if not isinstance(params, torch.Tensor):
+            params = torch.as_tensor(np.asarray(params, dtype=np.float64))
+        params = params.detach().to('cpu', torch.float64)
+        if params.ndim == 1:
+            params = params.unsqueeze(0)
+        return torch.round(params / self.dt).to(torch.long)
+
+    def rob0(self, traces: torch.Tensor, params=None,
+             cache: Optional[SignalCache] = None,
+             predicates: Optional[PredicateStore] = None) -> torch.Tensor:
+        """
+        Robustness at t=0 for every (candidate, trace) pair.
+
+        Args:
+            traces: Shape (num_traces, timesteps, dims).
+            params: Candidate values, shape (num_candidates, len(param_names)),
+                as a tensor, array or nested list. ``None`` for parameter-free formulas.
+            cache: Shared store for the signals of parameter-free subtrees.
+            predicates: Precomputed predicate signals; predicate leaves are
+                then read from it instead of ``cache``.
+
+        Returns:
+            Tensor of shape (num_candidates, num_traces).
+        """
+        steps = None if params is None else self._param_steps(params)
+        num_candidates = 1 if steps is None else steps.shape[0]
+        root = self._evaluate(traces, steps, cache, predicates)[0]
+        return root[:, :, 0].expand(num_candidates, -1)
+
+    __call__ = rob0
+
+    def rob0_all(self, traces: torch.Tensor,
+                 cache: Optional[SignalCache] = None,
+                 predicates: Optional[PredicateStore] = None) -> torch.Tensor:
+        """
+        Robustness at t=0 of every compiled (parameter-free) formula.
+
+        Returns:
+            Tensor of shape (num_formulas, num_traces).
+        """
+        roots = self._evaluate(traces, None, cache, predicates)
+        return torch.stack([r[0, :, 0] for r in roots])
+
+    def _evaluate(self, traces: torch.Tensor, steps: Optional[torch.Tensor],
+                  cache: Optional[SignalCache],
+                  predicates: Optional[PredicateStore]) -> list[torch.Tensor]:
+        """Signals of the roots, each (Pc, N, 1), for parameter steps ``steps``."""
+        if steps is not None:
+            step_min = steps.min(dim=0).values.tolist()
+            step_max = steps.max(dim=0).values.tolist()
+            steps_dev = steps.to(traces.device)
+
+        def _bound(spec):
+            """(tensor, min, max) of one interval bound."""
+            kind, value = spec
+            if kind == 'fixed':
+                return torch.tensor([value], device=traces.device), value, value
+            return steps_dev[:, value], step_min[value], step_max[value]
+
+        num_steps = traces.shape[1]
+        tables = self._static_tables(traces)
+        bounds = {}
+        cached = {}
+        if cache is None:
+            shared = [False] * len(self.ops)
+        else:
+            shared = [self._static[i] and not (predicates is not None and op.kind in _PREDICATES)
+                      for i, op in enumerate(self.ops)]
+        need = [0] * len(self.ops)
+        for r in self.roots:
+            need[r] = 1
+        for i in range(len(self.ops) - 1, -1, -1):
+            op = self.ops[i]
+            need[i] = min(need[i], num_steps)
+            if shared[i] and need[i] > 0:
+                signal = cache.get(traces, self._keys[i], need[i])
+                if signal is not None:
+                    cached[i] = signal  # the subtree below is not evaluated
+                    continue
+            if op.kind in ('always', 'eventually'):
+                lo, lo_min, _ = _bound(op.lo)
+                hi, _, hi_max = _bound(op.hi)
+                bounds[i] = (lo, hi, max(lo_min, 0), max(hi_max, 0))
+                if i in self._cached_children:
+                    # Cached tables cover the whole trace; build one if missing.
+                    if need[i] > 0 and i not in tables:
+                        need[op.args[0]] = num_steps
+                    continue
+                reach = need[i] + max(hi_max, 0)
+            else:
+                reach = need[i]
+            for a in op.args:
+                need[a] = max(need[a], reach)
+
+        signals: list[Optional[torch.Tensor]] = [None] * len(self.ops)
+        remaining = list(self._uses)
+        with torch.no_grad():
+            for i, op in enumerate(self.ops):
+                length = need[i]
+                kind = op.kind
+                if length == 0:
+                    out = None
+                elif i in cached:
+                    out = cached[i][..., :length]
+                elif predicates is not None and kind in _PREDICATES:
+                    out = predicates.signal(traces, _PREDICATES[kind], op.column,
+                                            op.threshold)[..., :length]
+                elif kind == 'pred_lt':
+                    out = (op.threshold - traces[:, :length, op.column]).unsqueeze(0)
+                elif kind == 'pred_gt':
+                    out = (traces[:, :length, op.column] - op.threshold).unsqueeze(0)
+                elif kind == 'const':
+                    out = torch.full((1, traces.shape[0], length), op.threshold,
+                                     dtype=traces.dtype, device=traces.device)
+                elif kind == 'neg':
+                    out = -signals[op.args[0]][..., :length]
+                elif kind == 'min':
+                    out = torch.minimum(signals[op.args[0]][..., :length],
+                                        signals[op.args[1]][..., :length])
+                elif kind == 'max':
+                    out = torch.maximum(signals[op.args[0]][..., :length],
+                                        signals[op.args[1]][..., :length])
+                else:
+                    lo, hi, lo_min, reach = bounds[i]
+                    table = tables.get(i)
+                    if table is None and i in self._cached_children:
+                        table = SparseTable(signals[op.args[0]], kind == 'always')
+                        tables[i] = table
+                    elif table is None:
+                        table = SparseTable(signals[op.args[0]][..., :length + reach],
+                                            kind == 'always', max_width=reach - lo_min + 1)
+                    out = table.query(lo, hi, length)
+                if shared[i] and out is not None and i not in cached:
+                    cache.put(traces, self._keys[i], out)
+                signals[i] = out
+                for a in op.args:
+                    remaining[a] -= 1
+                    if remaining[a] == 0:
+                        signals[a] = None
+
+        return [signals[r][..., :1] for r in self.roots]
+
+    def violated(self, traces: torch.Tensor,
+                 predicates: Optional[PredicateStore] = None) -> torch.Tensor:
+        """
+        Per-trace verdict "robustness at t=0 is negative", from signs alone.
+
+        Same answer as ``rob0(traces)[0] < 0`` without computing robustness
+        values (see ``ceclass.formula.boolean``). Parameter-free formulas only.
+
+        Returns:
+            Bool tensor of shape (num_traces,).
+        """
+        return self.violated_all(traces, predicates)[0]
+
+    def violated_all(self, traces: torch.Tensor,
+                     predicates: Optional[PredicateStore] = None) -> torch.Tensor:
+        """
+        ``violated`` for every compiled formula in one pass.
+
+        Returns:
+            Bool tensor of shape (num_formulas, num_traces).
+        """
+        if not all(self._static[r] for r in self.roots):
+            raise ValueError("Sign-only evaluation needs a parameter-free formula")
+        num_steps = traces.shape[1]
+        need = [0] * len(self.ops)
+        for r in self.roots:
+            need[r] = 1
+        for i in range(len(self.ops) - 1, -1, -1):
+            op = self.ops[i]
+            need[i] = min(need[i], num_steps)
+            reach = need[i]
+            if op.kind in ('always', 'eventually'):
+                reach += max(op.hi[1], 0)
+            for a in op.args:
+                need[a] = max(need[a], reach)
+
+        signs: list[Optional[tuple[torch.Tensor, torch.Tensor]]] = [None] * len(self.ops)
+        remaining = list(self._uses)
+        with torch.no_grad():
+            for i, op in enumerate(self.ops):
+                length = need[i]
+                kind = op.kind
+                if length == 0:
+                    out = None
+                elif kind in _PREDICATES:
+                    if predicates is not None:
+                        rob = predicates.signal(traces, _PREDICATES[kind], op.column,
+                                                op.threshold)[0, :, :length]
+                    elif kind == 'pred_lt':
+                        rob = op.threshold - traces[:, :length, op.column]
+                    else:
+                        rob = traces[:, :length, op.column] - op.threshold
+                    out = (rob < 0, rob <= 0)
+                elif kind == 'const':
+                    mask = torch.full((traces.shape[0], length), op.threshold < 0,
+                                      dtype=torch.bool, device=traces.device)
+                    out = (mask, mask)
+                elif kind == 'neg':
+                    a_neg, a_nonpos = signs[op.args[0]]
+                    out = (~a_nonpos[:, :length], ~a_neg[:, :length])
+                elif kind in ('min', 'max'):
+                    combine = torch.logical_or if kind == 'min' else torch.logical_and
+                    (a_neg, a_nonpos), (b_neg, b_nonpos) = signs[op.args[0]], signs[op.args[1]]
+                    out = (combine(a_neg[:, :length], b_neg[:, :length]),
+                           combine(a_nonpos[:, :length], b_nonpos[:, :length]))
+                else:
+                    out = window_signs(*signs[op.args[0]], op.lo[1], op.hi[1], length,
+                                       kind == 'always')
+                signs[i] = out
+                for a in op.args:
+                    remaining[a] -= 1
+                    if remaining[a] == 0:
+                        signs[a] = None
+        return torch.stack([signs[r][0][:, 0] for r in self.roots])
+
+    def candidate_length(self, num_steps: int) -> int:
+        """
+        Upper bound on the length of the per-candidate signals of one evaluation.
+
+        Used to size candidate batches: a batch of P candidates materializes
+        signals of shape (P, num_traces, candidate_length) at most.
+        """
+        need = [0] * len(self.ops)
+        for r in self.roots:
+            need[r] = 1
+        for i in range(len(self.ops) - 1, -1, -1):
+            op = self.ops[i]
+            need[i] = min(need[i], num_steps)
+            reach = need[i]
+            if op.kind in ('always', 'eventually'):
+                if i in self._cached_children:
+                    continue
+                reach += max(op.hi[1], 0) if op.hi[0] == 'fixed' else num_steps
+            for a in op.args:
+                need[a] = max(need[a], reach)
+        return max([need[i] for i in range(len(self.ops)) if not self._static[i]] + [1])
+
+    def _static_tables(self, traces: torch.Tensor) -> dict:
+        """Cached tables of parametric windows over static children, for ``traces``."""
+        if not self._cached_children:
+            return {}
+        key = traces_key(traces)
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is None:
+                # Holding ``traces`` keeps its storage (and so the key) from being reused.
+                entry = (traces, {})
+                self._tables[key] = entry
+                if len(self._tables) > _MAX_CACHED_TRACES:
+                    self._tables.popitem(last=False)
+            else:
+                self._tables.move_to_end(key)
+        return entry[1]
+
+    def __getstate__(self) -> dict:
+        # Locks and per-trace tables stay in the process that built them.
+        state = self.__dict__.copy()
+        del state['_lock'], state['_tables']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"FormulaTemplate(ops={len(self.ops)}, params={self.param_names})"
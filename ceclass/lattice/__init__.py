@@ -1,3 +1,8 @@
+from ceclass.lattice.formula_table import FormulaTable
 from ceclass.lattice.parser import Parser
 from ceclass.lattice.phi_graph import PhiGraph
 from ceclass.lattice.phi_node import PhiNode
+from ceclass.lattice.cache import LatticeCache
+from ceclass.lattice.compact_graph import CompactGraph
+from ceclass.lattice.canonical import CanonicalForms
+from ceclass.lattice.lazy_graph import LazyGraph
@@ -0,0 +1,180 @@
+"""
+On-disk cache of parsed refinement lattices.
+
+Parsing is deterministic in (formula, k), so a lattice can be stored once
+and loaded by every later run: strategy sweeps, trace subsets, restarts.
+One file per lattice, named by ``lattice_key``: a SHA-256 of the
+specification tree (node types, IDs, intervals, predicate fields), k and
+the format version (and the ``canonical`` / ``hasse_edges`` flags when
+set: both change the stored edge lists).
+
+Each file holds the formula DAG of the nodes as a flat table (shared
+subformulas are stored once), the four edge lists of the ``PhiGraph`` as
+int32 CSR arrays (list order preserved, the transitive ones empty for a
+lattice without closure), the maxima, the parser's ``interval_dict`` and its
+``simp_phi_dict`` as node positions (with ``canonical``, every member ID
+maps to its class node).
+Files are pickles: only point the cache at a directory you trust.
+"""
+from __future__ import annotations
+import dataclasses
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+from ceclass.formula.stl_node import STLNode
+from ceclass.lattice.compact_graph import CSR
+from ceclass.lattice.parser import Parser
+from ceclass.lattice.phi_graph import PhiGraph
+from ceclass.lattice.phi_node import PhiNode
+
+# Bump when the parser output or the file layout changes.
+FORMAT_VERSION = 3
+
+_FIELDS = tuple(f.name for f in dataclasses.fields(STLNode) if f.name != 'children')
+_EDGE_LISTS = ('smaller_all', 'greater_all', 'smaller_imme', 'greater_imme')
+
+
+def _flatten(roots: list[STLNode]) -> tuple[list[tuple], list[int]]:
+    """
+    Formula DAG as a table, children before parents.
+
+    Each entry is ``(field values..., child indices)``; returns the table and
+    the index of every root. Shared subformula objects get one entry.
+    """
+    table: list[tuple] = []
+    index: dict[int, int] = {}
+    root_index = []
+    for root in roots:
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in index:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((c, False) for c in reversed(node.children))
+                continue
+            index[id(node)] = len(table)
+            table.append(tuple(getattr(node, f) for f in _FIELDS)
+                         + (tuple(index[id(c)] for c in node.children),))
+        root_index.append(index[id(root)])
+    return table, root_index
+
+
+def _unflatten(table: list[tuple]) -> list[STLNode]:
+    nodes: list[STLNode] = []
+    for *values, children in table:
+        node = STLNode(**dict(zip(_FIELDS, values)))
+        node.children = [nodes[c] for c in children]
+        nodes.append(node)
+    return nodes
+
+
+def lattice_key(formula: STLNode, k: list, canonical: bool = False,
+                hasse_edges: bool = False) -> str:
+    """Canonical hash of (specification tree, k, parser flags)."""
+    table, _ = _flatten([formula])
+    fields = ((FORMAT_VERSION, table, k) + (('canonical',) if canonical else ())
+              + (('hasse_edges',) if hasse_edges else ()))
+    return hashlib.sha256(repr(fields).encode()).hexdigest()
+
+
+class LatticeCache:
+    """
+    Directory of parsed lattices.
+
+    Args:
+        directory: Where lattice files are kept (created on first save).
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike]):
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, formula: STLNode, k: list, canonical: bool = False,
+             hasse_edges: bool = False) -> Path:
+        return self.directory / f"{lattice_key(formula, k, canonical, hasse_edges)}.lattice"
+
+    def parse(self, parser: Parser) -> PhiGraph:
+        """
+        ``parser.parse()``, served from the cache when possible.
+
+        On a hit the parser is filled in as if it had parsed (``phi_graph``,
+        ``simp_phi_dict``, ``interval_dict``); on a miss the parsed lattice
+        is stored. Unreadable or stale files count as misses.
+        """
+        path = self.path(parser.formula, parser.k, parser.canonical, parser.hasse_edges)
+        graph = self.load(path, parser)
+        if graph is not None:
+            self.hits += 1
+            return graph
+        self.misses += 1
+        graph = parser.parse()
+        self.save(path, parser)
+        return graph
+
+    def load(self, path: Path, parser: Parser) -> Optional[PhiGraph]:
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            if data.get('version') != FORMAT_VERSION:
+                return None
+            formulas = _unflatten(data['formulas'])
+            nodes = [PhiNode(formula=formulas[i]) for i in data['nodes']]
+            for attr in _EDGE_LISTS:
+                indptr, indices = (a.tolist() for a in data[attr])
+                for i, nd in enumerate(nodes):
+                    setattr(nd, attr, [nodes[j] for j in indices[indptr[i]:indptr[i + 1]]])
+            maxima = [nodes[i] for i in data['maxima']]
+            bottom = None if data['bottom'] is None else nodes[data['bottom']]
+            aliases = {fid: nodes[i] for fid, i in data['aliases'].items()}
+            transitive = data['transitive']
+        except (OSError, EOFError, pickle.UnpicklingError, KeyError,
+                IndexError, TypeError, ValueError, AttributeError):
+            return None
+
+        graph = PhiGraph(nodes)
+        graph.maxima = maxima
+        graph.transitive = transitive
+        graph.bottom = bottom
+        parser.phi_graph = graph
+        parser.simp_phi_dict = aliases
+        parser.interval_dict = dict(data['interval_dict'])
+        return graph
+
+    def save(self, path: Path, parser: Parser) -> None:
+        """Write ``parser``'s lattice to ``path`` (atomically)."""
+        graph = parser.phi_graph
+        position = {id(nd): i for i, nd in enumerate(graph.nodes)}
+        formulas, roots = _flatten([nd.formula for nd in graph.nodes])
+        data = {
+            'version': FORMAT_VERSION,
+            'formulas': formulas,
+            'nodes': roots,
+            'maxima': [position[id(m)] for m in graph.maxima],
+            'transitive': graph.transitive,
+            'bottom': None if graph.bottom is None else position[id(graph.bottom)],
+            'interval_dict': dict(parser.interval_dict),
+            'aliases': {fid: position[id(nd)] for fid, nd in parser.simp_phi_dict.items()},
+        }
+        for attr in _EDGE_LISTS:
+            csr = CSR([[position[id(x)] for x in getattr(nd, attr)] for nd in graph.nodes])
+            data[attr] = (csr.indptr, csr.indices)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def __repr__(self) -> str:
+        return f"LatticeCache({str(self.directory)!r}, hits={self.hits}, misses={self.misses})"
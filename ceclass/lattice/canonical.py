@@ -0,0 +1,227 @@
+"""
+Canonical keys of refined formulas.
+
+A refined temporal formula stands for a family of formulas: its split
+points ``{phi_id}____t{j}`` range, in order, over the operator's interval.
+Two adjacent segments with the same child merge into one
+(``Alw_[a,t2](p) and Alw_[t2,b](p)`` is ``Alw_[a,b](p)`` once ``t2`` is
+free), so refinements that differ only by such runs describe the same
+family and are covered by exactly the same traces, whatever ``k`` they come
+from. ``CanonicalForms`` gives them the same key.
+
+A temporal formula is read back as its row of segments. Each position
+holds the key of its child, or None where the segment was simplified away
+(TRUE under always, FALSE under eventually). Runs of equal entries are
+collapsed into one. The bounds of the operator that the formula still
+shows (a numeric first start or last end) are kept, so formulas of
+different operators do not meet.
+
+Boolean structure is normalized too: nested ANDs (ORs) are flattened into
+one operand set, so operand order and repeats do not matter, ``a AND (a OR
+b)`` absorbs to ``a`` (and dually), and a double negation cancels.
+Polarity tags (``Neg``/``Pos``) name the same operators and are dropped.
+
+``merge_equivalent`` uses the keys to collapse the nodes of one lattice.
+"""
+from __future__ import annotations
+from typing import Optional
+
+from ceclass.formula.stl_node import STLNode
+from ceclass.lattice.phi_graph import PhiGraph
+from ceclass.lattice.phi_node import PhiNode
+
+_TEMPORAL_TAGS = {
+    'NegAlw': ('always', 'and'), 'PosAlw': ('always', 'and'),
+    'NegEv': ('eventually', 'or'), 'PosEv': ('eventually', 'or'),
+}
+_DUAL = {'and': 'or', 'or': 'and'}
+
+
+def _position(bound) -> Optional[int]:
+    """Index of split point ``{phi_id}____t{j}``, or None for a numeric bound."""
+    if isinstance(bound, str):
+        return int(bound.rsplit('____t', 1)[1])
+    return None
+
+
+class CanonicalForms:
+    """
+    Canonical keys (small ints) of the formulas of ``Parser`` lattice nodes.
+
+    Keys are only comparable between formulas passed to the same instance;
+    lattices of different ``k`` can share one.
+    """
+
+    def __init__(self):
+        self._ids: dict[tuple, int] = {}
+        self._structures: list[tuple] = []
+        # id(formula) -> (formula, key); the formula keeps its id alive.
+        self._memo: dict[int, tuple[STLNode, int]] = {}
+
+    def key(self, formula: STLNode) -> int:
+        """Canonical key of ``formula``."""
+        memo = self._memo.get(id(formula))
+        if memo is not None:
+            return memo[1]
+        key = self._intern(self._structure(formula))
+        self._memo[id(formula)] = (formula, key)
+        return key
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _intern(self, structure: tuple) -> int:
+        key = self._ids.get(structure)
+        if key is None:
+            key = self._ids[structure] = len(self._structures)
+            self._structures.append(structure)
+        return key
+
+    def _structure(self, formula: STLNode) -> tuple:
+        if not formula.children:
+            return ('leaf', formula.node_type, formula.id)
+        tag = formula.id.split('_', 1)[0]
+        if tag in _TEMPORAL_TAGS:
+            return self._temporal(formula, tag)
+        if tag.endswith('Not'):
+            key = self.key(formula.children[0])
+            inner = self._structures[key]
+            return self._structures[inner[1]] if inner[0] == 'not' else ('not', key)
+        if tag.endswith(('And', 'Or')):
+            return self._boolean(formula.node_type, formula.children)
+        # Not built by Parser: only identical subtrees share a key.
+        return ('node', formula.node_type, formula.id, formula.interval) + \
+            tuple(self.key(c) for c in formula.children)
+
+    def _boolean(self, op: str, children: list[STLNode]) -> tuple:
+        operands: set[int] = set()
+        for child in children:
+            key = self.key(child)
+            structure = self._structures[key]
+            if structure[0] == op:
+                operands.update(structure[1])
+            else:
+                operands.add(key)
+        # Absorption: drop a dual operand that contains another operand.
+        operands = {x for x in operands
+                    if not (self._structures[x][0] == _DUAL[op]
+                            and operands.intersection(self._structures[x][1]))}
+        if len(operands) == 1:
+            return self._structures[operands.pop()]
+        return (op, tuple(sorted(operands)))
+
+    def _temporal(self, formula: STLNode, tag: str) -> tuple:
+        op, chain = _TEMPORAL_TAGS[tag]
+        # Segments of the formula: the nodes of type op in its _chain_and /
+        # _chain_or tree (a single segment is the formula itself).
+        segments = []
+        stack = [formula]
+        while stack:
+            node = stack.pop()
+            if node.node_type == op:
+                start, end = node.interval
+                first = _position(start)
+                position = 0 if first is None else first - 1
+                segments.append((position, start, end, node.children[0]))
+            elif node.node_type == chain and (node is formula
+                                              or node.id.startswith(f"{formula.id}__p")):
+                stack.extend(node.children)
+            else:
+                return ('node', formula.node_type, formula.id, formula.interval) + \
+                    tuple(self.key(c) for c in formula.children)
+        segments.sort(key=lambda s: s[0])
+
+        row: list[Optional[int]] = []
+        last = -1
+        for j, _, _, child in segments:
+            if j > last + 1:
+                row.append(None)
+            row.append(self.key(child))
+            last = j
+        start, end = segments[0][1], segments[-1][2]
+        if _position(end) is not None:
+            row.append(None)
+        collapsed = tuple(x for i, x in enumerate(row) if i == 0 or x != row[i - 1])
+        shown_start = None if _position(start) is not None else start
+        shown_end = None if _position(end) is not None else end
+        return (op, shown_start, shown_end, collapsed)
+
+
+def merge_equivalent(graph: PhiGraph, forms: Optional[CanonicalForms] = None
+                     ) -> tuple[PhiGraph, list[PhiNode]]:
+    """
+    Quotient of ``graph`` by canonical key.
+
+    The first node of every key represents it. The quotient order is the
+    closure of the edges between classes; should it close a cycle, the
+    classes on it are equivalent too and merge. Immediate edges and maxima
+    are recomputed (``set_imme``).
+
+    Returns:
+        (quotient, the quotient node of every node of ``graph``). The
+        quotient is a new ``PhiGraph`` of fresh nodes, or ``graph`` itself
+        when no two nodes share a key.
+    """
+    forms = forms if forms is not None else CanonicalForms()
+    nodes = graph.nodes
+    index = {id(nd): i for i, nd in enumerate(nodes)}
+    first: dict[int, int] = {}
+    parent = [first.setdefault(forms.key(nd.formula), i) for i, nd in enumerate(nodes)]
+    if len(first) == len(nodes):
+        return graph, list(nodes)
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    while True:
+        # below[r]: classes under class r (bitset over representatives).
+        below: dict[int, int] = {}
+        for i, nd in enumerate(nodes):
+            r = find(i)
+            mask = below.get(r, 0)
+            for s in graph.below(nd):
+                mask |= 1 << find(index[id(s)])
+            below[r] = mask & ~(1 << r)
+        # Only paths through a merged class can be missing from the closure.
+        merged = 0
+        for i in range(len(nodes)):
+            if find(i) != i:
+                merged |= 1 << find(i)
+        changed = True
+        while changed:
+            changed = False
+            for r, mask in below.items():
+                closed = mask
+                bits = mask & merged
+                while bits:
+                    low = bits & -bits
+                    closed |= below[low.bit_length() - 1]
+                    bits ^= low
+                if closed != mask:
+                    below[r] = closed
+                    changed = True
+        cyclic = [r for r, mask in below.items() if mask >> r & 1]
+        if not cyclic:
+            break
+        for r in cyclic:
+            for t in (t for t in below if below[r] >> t & 1 and below[t] >> r & 1):
+                parent[find(t)] = find(r)
+
+    reps = sorted(below)
+    fresh = {r: PhiNode(formula=nodes[r].formula) for r in reps}
+    above: dict[int, list[int]] = {r: [] for r in reps}
+    for r in reps:
+        mask = below[r]
+        row = [t for t in reps if mask >> t & 1]
+        fresh[r].smaller_all = [fresh[t] for t in row]
+        for t in row:
+            above[t].append(r)
+    for r in reps:
+        fresh[r].greater_all = [fresh[t] for t in above[r]]
+    quotient = PhiGraph([fresh[r] for r in reps])
+    quotient.set_imme()
+    quotient.set_maxima()
+    return quotient, [fresh[find(i)] for i in range(len(nodes))]
@@ -0,0 +1,495 @@
+"""
+Array-backed refinement lattice.
+
+``PhiGraph`` keeps every edge as an object reference in four Python lists
+per node. A ``CompactGraph`` numbers the nodes 0..n-1 and stores the
+immediate and transitive edges as CSR arrays (``indptr`` / ``indices``), the
+active flags as one NumPy bool mask and the witnesses in one list.
+``CompactNode`` is a ``__slots__`` view (graph, index) with the ``PhiNode``
+attributes, so the strategies run unchanged on either graph. As on
+``PhiGraph``, the active count, the active maxima and the longest-path
+depths are updated incrementally as nodes are deactivated.
+"""
+from __future__ import annotations
+import random
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from ceclass.formula.stl_node import STLNode
+from ceclass.lattice.phi_graph import PhiGraph, immediate_edges
+
+
+class CSR:
+    """
+    Compressed sparse rows: row ``i`` is ``indices[indptr[i]:indptr[i + 1]]``.
+
+    Args:
+        rows: One sequence of column indices per row, kept in order.
+    """
+
+    __slots__ = ('indptr', 'indices')
+
+    def __init__(self, rows: Sequence[Sequence[int]]):
+        lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.indices = np.fromiter((j for r in rows for j in r), dtype=np.int32,
+                                   count=int(self.indptr[-1]))
+
+    def row(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def rows(self, items: np.ndarray) -> np.ndarray:
+        """Concatenated rows of ``items``."""
+        if len(items) == 0:
+            return self.indices[:0]
+        return np.concatenate([self.row(i) for i in items])
+
+    def row_ids(self) -> np.ndarray:
+        """Row index of every entry of ``indices``."""
+        return np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+
+    def transpose(self, num_cols: int) -> CSR:
+        """Column-major view as a new CSR; each row lists its sources in increasing order."""
+        out: list[list[int]] = [[] for _ in range(num_cols)]
+        for i, j in zip(self.row_ids().tolist(), self.indices.tolist()):
+            out[j].append(i)
+        return CSR(out)
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+
+class CompactNode:
+    """View of node ``index`` of a ``CompactGraph`` with the ``PhiNode`` interface."""
+
+    __slots__ = ('graph', 'index')
+
+    def __init__(self, graph: CompactGraph, index: int):
+        self.graph = graph
+        self.index = index
+
+    @property
+    def formula(self) -> STLNode:
+        return self.graph.formulas[self.index]
+
+    @property
+    def id(self) -> str:
+        return self.graph.formulas[self.index].id
+
+    @property
+    def active(self) -> bool:
+        return bool(self.graph.active[self.index])
+
+    @active.setter
+    def active(self, value: bool):
+        graph = self.graph
+        if bool(value) != graph.active[self.index]:
+            graph.active[self.index] = value
+            graph._active_changed(np.array([self.index]), bool(value))
+
+    @property
+    def results(self) -> list[Any]:
+        return self.graph.results[self.index]
+
+    @property
+    def greater_all(self) -> list[CompactNode]:
+        return self.graph._views(self.graph.greater_all.row(self.index))
+
+    @property
+    def smaller_all(self) -> list[CompactNode]:
+        return self.graph._views(self.graph.smaller_all.row(self.index))
+
+    @property
+    def greater_imme(self) -> list[CompactNode]:
+        return self.graph._views(self.graph.greater_imme.row(self.index))
+
+    @property
+    def smaller_imme(self) -> list[CompactNode]:
+        return self.graph._views(self.graph.smaller_imme.row(self.index))
+
+    def add_to_results(self, result: Any):
+        self.graph.results[self.index].append(result)
+
+    def __hash__(self) -> int:
+        return self.index
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CompactNode):
+            return False
+        return self.graph is other.graph and self.index == other.index
+
+    def __repr__(self) -> str:
+        return f"CompactNode(id={self.id}, active={self.active})"
+
+
+class CompactGraph:
+    """
+    Refinement lattice with nodes 0..n-1 and CSR adjacency.
+
+    Same query and pruning API as ``PhiGraph`` (``nodes``, ``maxima``,
+    ``get_longest_path``, ``eliminate_hold``, ...), with the same results
+    and tie-breaking.
+
+    Args:
+        formulas: Formula of every node.
+        smaller_all, greater_all: Transitive edges, one index list per node.
+        smaller_imme, greater_imme: Immediate edges, one index list per node.
+
+    Attributes:
+        transitive, bottom: As on ``PhiGraph``: whether the transitive
+            edges are filled in, and if not, the node below every other one
+            that the immediate edges leave out.
+    """
+
+    def __init__(
+        self,
+        formulas: list[STLNode],
+        smaller_all: Sequence[Sequence[int]],
+        greater_all: Sequence[Sequence[int]],
+        smaller_imme: Sequence[Sequence[int]],
+        greater_imme: Sequence[Sequence[int]],
+    ):
+        n = len(formulas)
+        self.formulas = formulas
+        self.smaller_all = CSR(smaller_all)
+        self.greater_all = CSR(greater_all)
+        self.smaller_imme = CSR(smaller_imme)
+        self.greater_imme = CSR(greater_imme)
+        self.active = np.ones(n, dtype=bool)
+        self.results: list[list[Any]] = [[] for _ in range(n)]
+        self.nodes = [CompactNode(self, i) for i in range(n)]
+        self.maxima: list[CompactNode] = []
+        self.transitive = True
+        self.bottom: Optional[CompactNode] = None
+        self._greater_imme_rows = self.greater_imme.row_ids()
+        self._levels = self._height_levels()
+        self._height = np.zeros(n, dtype=np.int64)
+        for h, (level, _, _) in enumerate(self._levels):
+            self._height[level] = h
+        self._num_active = n
+        # Active parents of every node and the active maxima (see
+        # ``_track_parents``), then the longest-path DP (``_active_depths``).
+        self._active_parents: Optional[np.ndarray] = None
+        self._roots: set[int] = set()
+        self._depth: Optional[np.ndarray] = None
+        self._changed: list[np.ndarray] = []
+
+    # --- Graph construction ---
+
+    @classmethod
+    def from_closure(cls, formulas: list[STLNode], smaller_all: Sequence[Sequence[int]],
+                     greater_all: Optional[Sequence[Sequence[int]]] = None) -> CompactGraph:
+        """
+        Build from transitive edges only; immediate edges as ``PhiGraph.set_imme``.
+
+        Args:
+            formulas: Formula of every node.
+            smaller_all: Indices of the nodes below each node (no self loops).
+            greater_all: Indices of the nodes above each node, in the order
+                to keep (default: the transpose of ``smaller_all``).
+        """
+        n = len(formulas)
+        if greater_all is None:
+            transposed = CSR(smaller_all).transpose(n)
+            greater_all = [transposed.row(i).tolist() for i in range(n)]
+        greater = [list(r) for r in greater_all]
+        smaller_imme = immediate_edges([list(r) for r in smaller_all], greater)
+        greater_imme = CSR(smaller_imme).transpose(n)
+        graph = cls(formulas, smaller_all, greater,
+                    smaller_imme, [greater_imme.row(i) for i in range(n)])
+        graph.set_maxima()
+        return graph
+
+    @classmethod
+    def from_phi_graph(cls, graph: PhiGraph) -> CompactGraph:
+        """Copy of ``graph`` (edges in the same order, active flags, results, maxima)."""
+        index = {id(nd): i for i, nd in enumerate(graph.nodes)}
+
+        def rows(attr):
+            return [[index[id(x)] for x in getattr(nd, attr)] for nd in graph.nodes]
+
+        compact = cls([nd.formula for nd in graph.nodes], rows('smaller_all'),
+                      rows('greater_all'), rows('smaller_imme'), rows('greater_imme'))
+        compact.active[:] = [nd.active for nd in graph.nodes]
+        compact._num_active = int(compact.active.sum())
+        compact.results = [list(nd.results) for nd in graph.nodes]
+        compact.maxima = [compact.nodes[index[id(m)]] for m in graph.maxima]
+        compact.transitive = graph.transitive
+        if graph.bottom is not None:
+            compact.bottom = compact.nodes[index[id(graph.bottom)]]
+        return compact
+
+    def _height_levels(self) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Nodes grouped by height (longest immediate chain below them).
+
+        Every child is in an earlier level than its parents, so evaluating
+        the levels in order sees children first. Each entry holds the level's
+        nodes, their concatenated children and the offsets of each node's
+        children in that array.
+        """
+        pending = np.diff(self.smaller_imme.indptr).copy()
+        frontier = np.flatnonzero(pending == 0)
+        levels = []
+        while len(frontier):
+            children = self.smaller_imme.rows(frontier)
+            lengths = np.diff(self.smaller_imme.indptr)[frontier]
+            levels.append((frontier, children, np.cumsum(lengths) - lengths))
+            parents = self.greater_imme.rows(frontier)
+            if len(parents) == 0:
+                break
+            np.subtract.at(pending, parents, 1)
+            parents = np.unique(parents)
+            frontier = parents[pending[parents] == 0]
+        return levels
+
+    def _views(self, items: np.ndarray) -> list[CompactNode]:
+        nodes = self.nodes
+        return [nodes[i] for i in items.tolist()]
+
+    def set_maxima(self):
+        """Find root nodes (no immediate ancestors)."""
+        roots = np.diff(self.greater_imme.indptr) == 0
+        self.maxima = self._views(np.flatnonzero(roots))
+
+    def set_active_maxima(self):
+        """Recompute maxima among active nodes only."""
+        self._track_parents()
+        self._publish_maxima()
+
+    def _track_parents(self):
+        """
+        Count the active immediate parents of every node.
+
+        From then on ``_active_changed`` keeps the counts, and the set of
+        active nodes without active parents, up to date.
+        """
+        self._active_parents = np.bincount(
+            self._greater_imme_rows,
+            weights=self.active[self.greater_imme.indices],
+            minlength=len(self.nodes),
+        ).astype(np.int64)
+        self._roots = set(np.flatnonzero(self.active & (self._active_parents == 0)).tolist())
+
+    def _publish_maxima(self):
+        self.maxima = self._views(np.array(sorted(self._roots), dtype=np.int64))
+
+    def _active_changed(self, items: np.ndarray, value: bool):
+        """Bookkeeping for ``items``, whose ``active`` flag just became ``value``."""
+        delta = 1 if value else -1
+        self._num_active += delta * len(items)
+        if self._depth is not None:
+            self._changed.append(items)
+        counts = self._active_parents
+        if counts is None:
+            return
+        children = self.smaller_imme.rows(items)
+        np.add.at(counts, children, delta)
+        active, roots = self.active, self._roots
+        for j in np.concatenate([items, children]).tolist():
+            if active[j] and counts[j] == 0:
+                roots.add(j)
+            else:
+                roots.discard(j)
+
+    # --- Comparabilities ---
+
+    def below(self, node: CompactNode) -> list[CompactNode]:
+        """Nodes strictly below ``node``, as ``PhiGraph.below``."""
+        if self.transitive:
+            return node.smaller_all
+        return self._reach(node.index, self.smaller_imme, node != self.bottom)
+
+    def above(self, node: CompactNode) -> list[CompactNode]:
+        """Nodes strictly above ``node``, as ``PhiGraph.above``."""
+        if self.transitive:
+            return node.greater_all
+        if node == self.bottom:
+            return [nd for nd in self.nodes if nd != node]
+        return self._reach(node.index, self.greater_imme, False)
+
+    def _reach(self, start: int, edges: CSR, with_bottom: bool) -> list[CompactNode]:
+        seen = np.zeros(len(self.nodes), dtype=bool)
+        seen[start] = True
+        reached = []
+        frontier = np.array([start])
+        while len(frontier):
+            nxt = edges.rows(frontier)
+            nxt = np.unique(nxt[~seen[nxt]])
+            seen[nxt] = True
+            reached.append(nxt)
+            frontier = nxt
+        items = np.concatenate(reached)
+        if with_bottom and self.bottom is not None and not seen[self.bottom.index]:
+            items = np.append(items, self.bottom.index)
+        return self._views(items)
+
+    # --- Path finding ---
+
+    def _depths(self, nodes: np.ndarray, children: np.ndarray,
+                offsets: np.ndarray) -> np.ndarray:
+        """Active depth of ``nodes`` from their children's (``children[offsets[i]:]``)."""
+        best = np.zeros(len(nodes), dtype=np.int64)
+        if len(children):
+            has_children = np.diff(np.append(offsets, len(children))) > 0
+            best[has_children] = np.maximum.reduceat(self._depth[children],
+                                                     offsets[has_children])
+        return np.where(self.active[nodes], best + 1, 0)
+
+    def _active_depths(self) -> np.ndarray:
+        """
+        Number of nodes on the longest active immediate chain starting at each node.
+
+        The first call fills the DP level by level. Later calls revisit only
+        the nodes whose ``active`` flag changed since, and then, by height,
+        the parents of every node whose depth changed.
+        """
+        if self._depth is None:
+            self._depth = np.zeros(len(self.nodes), dtype=np.int64)
+            for level, children, offsets in self._levels:
+                self._depth[level] = self._depths(level, children, offsets)
+            self._changed = []
+            return self._depth
+
+        depth, height = self._depth, self._height
+        pending: dict[int, list[np.ndarray]] = {}
+
+        def push(items: np.ndarray):
+            heights = height[items]
+            for h in np.unique(heights).tolist():
+                pending.setdefault(h, []).append(items[heights == h])
+
+        if self._changed:
+            push(np.concatenate(self._changed))
+            self._changed = []
+        while pending:
+            nodes = np.unique(np.concatenate(pending.pop(min(pending))))
+            lengths = np.diff(self.smaller_imme.indptr)[nodes]
+            value = self._depths(nodes, self.smaller_imme.rows(nodes),
+                                 np.cumsum(lengths) - lengths)
+            moved = nodes[value != depth[nodes]]
+            depth[nodes] = value
+            if len(moved):
+                push(self.greater_imme.rows(moved))
+        return depth
+
+    def get_longest_path(self) -> tuple[list[CompactNode], int]:
+        """
+        Longest active path from the maxima, as ``PhiGraph.get_longest_path``.
+
+        Among paths of maximal length, returns the first one in the DFS order
+        of ``PhiGraph`` (maxima in order, then children in ``smaller_imme``
+        order): the greedy walk that always takes the first node that still
+        reaches the full length.
+        """
+        depth = self._active_depths()
+        starts = [m.index for m in self.maxima if self.active[m.index]]
+        if not starts:
+            return [], 0
+        length = int(depth[starts].max())
+        cur = next(i for i in starts if depth[i] == length)
+        path = [cur]
+        for remaining in range(length - 1, 0, -1):
+            children = self.smaller_imme.row(cur)
+            cur = int(children[np.argmax(depth[children] == remaining)])
+            path.append(cur)
+        return self._views(np.asarray(path)), length
+
+    def get_random_path(self) -> tuple[list[CompactNode], int]:
+        """Random walk from maxima downward. Returns (path, length)."""
+        pool = list(self.maxima)
+        path = []
+
+        while True:
+            active_pool = [m for m in pool if m.active]
+            if not active_pool:
+                break
+
+            selected = random.choice(active_pool)
+            path.append(selected)
+            pool = selected.smaller_imme
+
+        return path, len(path)
+
+    # --- Pruning operations ---
+
+    def _deactivate_reachable(self, start: int, edges: CSR) -> np.ndarray:
+        """Deactivate ``start`` and every node reachable from it through active nodes."""
+        reached = [np.array([start])]
+        self.active[start] = False
+        self._active_changed(reached[0], False)
+        frontier = reached[0]
+        while len(frontier):
+            nxt = edges.rows(frontier)
+            nxt = np.unique(nxt[self.active[nxt]])
+            self.active[nxt] = False
+            self._active_changed(nxt, False)
+            reached.append(nxt)
+            frontier = nxt
+        return np.concatenate(reached)
+
+    def eliminate_hold(self, node: CompactNode, witness):
+        """
+        Node satisfies the spec → deactivate it and all ancestors.
+
+        When a refined formula is satisfied, all weaker (greater/more general)
+        formulas must also be satisfied.
+        """
+        if not self.active[node.index]:
+            return
+        if self._active_parents is None:
+            self._track_parents()
+        for i in self._deactivate_reachable(node.index, self.greater_imme).tolist():
+            self.results[i].append(witness)
+        self._publish_maxima()
+
+    def eliminate_unhold(self, node: CompactNode):
+        """
+        Node fails the spec → deactivate it and all descendants.
+
+        When a refined formula is NOT satisfied, all stronger (smaller/more specific)
+        formulas cannot be satisfied either.
+        """
+        if self.active[node.index]:
+            self._deactivate_reachable(node.index, self.smaller_imme)
+
+    # --- Query ---
+
+    def is_empty(self) -> bool:
+        """Check if any active nodes remain."""
+        return self._num_active == 0
+
+    def get_active_nodes(self) -> list[CompactNode]:
+        """Return all currently active nodes."""
+        return self._views(np.flatnonzero(self.active))
+
+    def get_covered_nodes(self) -> list[CompactNode]:
+        """Return nodes that have at least one witnessing result."""
+        return [self.nodes[i] for i, r in enumerate(self.results) if r]
+
+    # --- Visualization ---
+
+    def to_dict(self) -> dict:
+        """Export graph structure as a dictionary for visualization."""
+        ids = [f.id for f in self.formulas]
+        node_info = [{
+            'id': ids[i],
+            'formula': str(self.formulas[i]),
+            'active': bool(self.active[i]),
+            'has_results': len(self.results[i]) > 0,
+        } for i in range(len(self.nodes))]
+        rows = self.smaller_imme.row_ids().tolist()
+        edges = [(ids[i], ids[j]) for i, j in zip(rows, self.smaller_imme.indices.tolist())]
+        return {'nodes': node_info, 'edges': edges}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the adjacency arrays and the active mask."""
+        csrs = (self.smaller_all, self.greater_all, self.smaller_imme, self.greater_imme)
+        return self.active.nbytes + sum(c.indptr.nbytes + c.indices.nbytes for c in csrs)
+
+    def __repr__(self) -> str:
+        active = int(self.active.sum())
+        return f"CompactGraph(nodes={len(self.nodes)}, active={active}, maxima={len(self.maxima)})"
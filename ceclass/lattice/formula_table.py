@@ -0,0 +1,64 @@
+"""
+Hash-consing table for refined formulas.
+
+The parser refers to every refined formula by a small integer. A formula is
+identified by a key tuple: ``(name,)`` for a leaf (a predicate, ``TRUE``,
+``FALSE``), or an operator tag followed by the IDs of its operands (and any
+string markers), e.g. ``('NegAnd', 3, 7)``. Equal keys get the same ID, so
+deduplication and edge lookups hash a few integers instead of ID strings
+whose length grows with the lattice depth.
+
+Readable names are only built on request (``name``), in the format of the
+string IDs of Parser.m: ``'NegAnd_' + name(3) + name(7)``.
+"""
+from __future__ import annotations
+from typing import Optional
+
+
+class FormulaTable:
+    """
+    Interned formula keys, indexed by integer ID.
+
+    IDs are assigned in order of first ``intern`` and never reused.
+    """
+
+    def __init__(self):
+        self._ids: dict[tuple, int] = {}
+        self._keys: list[tuple] = []
+        self._names: dict[int, str] = {}
+
+    def intern(self, key: tuple) -> int:
+        """ID of ``key``, assigning the next free one if it is new."""
+        fid = self._ids.get(key)
+        if fid is None:
+            fid = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+        return fid
+
+    def get(self, key: tuple) -> Optional[int]:
+        """ID of ``key``, or None if it was never interned."""
+        return self._ids.get(key)
+
+    def key(self, fid: int) -> tuple:
+        return self._keys[fid]
+
+    def name(self, fid: int) -> str:
+        """Readable ID string of ``fid`` (memoized)."""
+        name = self._names.get(fid)
+        if name is None:
+            key = self._keys[fid]
+            if len(key) == 1:
+                name = key[0]
+            else:
+                parts = [f"{key[0]}_"]
+                for part in key[1:]:
+                    parts.append(part if isinstance(part, str) else self.name(part))
+                name = "".join(parts)
+            self._names[fid] = name
+        return name
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"FormulaTable(size={len(self._keys)})"
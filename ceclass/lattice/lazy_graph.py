@@ -0,0 +1,362 @@
+"""
+Refinement lattice explored on demand.
+
+``Parser`` builds the root lattice as a product: the pairs of the two child
+lattices of an AND/OR root, or ``child^k`` rows of a temporal root, one
+node (and STL formula) per simplified product element. Only the factors
+are small; their product is what reaches millions of nodes.
+
+A ``LazyGraph`` keeps just the factors. A root refinement is a *term*, a
+tuple with one factor element per child (per segment for a temporal root),
+ordered componentwise. Its formula and ``PhiNode`` are built the first time
+a strategy reaches it, with the parser's own simplification, so node IDs
+are those of the full lattice.
+
+Pruning is symbolic. ``eliminate_hold`` adds the term to the generators of
+the covered up-set, ``eliminate_unhold`` to those of the refuted down-set;
+a term is active when it is in neither and its formula has no verdict yet.
+Active terms are found by a search from the product maxima that steps past
+covered generators: below a term ``t`` covered by ``g <= t``, every term
+not above ``g`` is below ``t`` with one component lowered to a maximal
+element not above ``g``'s.
+"""
+from __future__ import annotations
+import math
+import random
+from itertools import product
+from typing import Any, Iterator, Optional
+
+from ceclass.lattice.parser import Parser
+from ceclass.lattice.phi_node import PhiNode
+
+COVERED = 'covered'
+REFUTED = 'refuted'
+ACTIVE = 'active'
+
+Term = tuple[int, ...]
+
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class _Factor:
+    """
+    A child lattice: its simplified formulas and their order, as bitsets.
+
+    ``down[a]`` / ``up[a]`` hold the elements below / above element ``a``
+    (``a`` included); ``lower`` / ``upper`` are the covers.
+    """
+
+    def __init__(self, parser: Parser, phi, k: list):
+        simplify = parser.simplify_dict
+        position: dict[int, int] = {}
+        # A generated (unsimplified) ID per element, to combine from.
+        self.rep: list[int] = []
+        for fid in parser._parse_nodes_neg(phi, k):
+            if simplify[fid] not in position:
+                position[simplify[fid]] = len(self.rep)
+                self.rep.append(fid)
+        n = len(self.rep)
+
+        down = [1 << a for a in range(n)]
+        for g, s in parser._parse_edges_neg(phi, k):
+            gi = position.get(simplify.get(g))
+            si = position.get(simplify.get(s))
+            if gi is not None and si is not None:
+                down[gi] |= 1 << si
+        changed = True
+        while changed:
+            changed = False
+            for a in range(n):
+                closed = down[a]
+                for b in _bits(down[a] & ~(1 << a)):
+                    closed |= down[b]
+                if closed != down[a]:
+                    down[a] = closed
+                    changed = True
+        up = [0] * n
+        for a in range(n):
+            for b in _bits(down[a]):
+                up[b] |= 1 << a
+
+        self.down, self.up = down, up
+        self.maxima = [a for a in range(n) if up[a] == 1 << a]
+        self.lower = [self._maximal(down[a] & ~(1 << a)) for a in range(n)]
+        self.upper = [[b for b in _bits(up[a] & ~(1 << a))
+                       if down[b] & up[a] & ~(1 << a) == 1 << b] for a in range(n)]
+        self._escapes: dict[tuple[int, int], list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rep)
+
+    def leq(self, a: int, b: int) -> bool:
+        return self.down[b] >> a & 1 == 1
+
+    def _maximal(self, mask: int) -> list[int]:
+        return [b for b in _bits(mask) if self.up[b] & mask == 1 << b]
+
+    def escapes(self, a: int, g: int) -> list[int]:
+        """Maximal elements below ``a`` that are not above ``g``."""
+        key = (a, g)
+        if key not in self._escapes:
+            self._escapes[key] = self._maximal(self.down[a] & ~self.up[g])
+        return self._escapes[key]
+
+
+class LazyGraph:
+    """
+    Refinement lattice of an AND/OR or temporal root, built on demand.
+
+    Offers the ``PhiGraph`` calls of the path-based strategies
+    (``get_longest_path``, ``get_random_path``, ``eliminate_hold``,
+    ``eliminate_unhold``, ``below``, ``is_empty``, ``get_covered_nodes``).
+    ``nodes`` holds only the nodes built so far.
+
+    ``eliminate_hold`` gives the witness to the tested node only: covered
+    nodes above it are implied, not materialized, and ``state`` answers
+    for any term.
+
+    Args:
+        parser: Parser of the specification; it must not have parsed.
+    """
+
+    def __init__(self, parser: Parser):
+        self.parser = parser
+        phi, k = parser.formula, parser.k
+        if phi.node_type in ('and', 'or') and len(phi.children) == 2:
+            self.factors = [_Factor(parser, phi.children[0], k[1]),
+                            _Factor(parser, phi.children[1], k[2])]
+            prefix = 'NegAnd' if phi.node_type == 'and' else 'NegOr'
+            self._combine = lambda reps: next(
+                parser._combine_binary(prefix, phi.node_type, [reps[0]], [reps[1]]))
+        elif phi.node_type in ('always', 'eventually'):
+            factor = _Factor(parser, phi.children[0], k[1])
+            tag, intervals = parser._temporal_segments(phi, k, phi.node_type, 'Neg')
+            self.factors = [factor] * len(intervals)
+            self._combine = lambda reps: next(
+                parser._build_temporal_nodes([reps], tag, phi.node_type, intervals))
+        else:
+            raise ValueError(
+                f"LazyGraph needs an AND/OR or temporal root, not {phi.node_type}")
+
+        self._simp: dict[Term, int] = {}
+        self._nodes: dict[int, PhiNode] = {}
+        self._simp_of: dict[int, int] = {}                # id(node) -> simplified ID
+        self._span: dict[int, tuple[Term, Term]] = {}     # id(node) -> (highest, lowest) term
+        self._verdicts: dict[int, bool] = {}              # simplified ID -> covered
+        self._covered: list[Term] = []                    # minimal covered generators
+        self._refuted: list[Term] = []                    # maximal refuted generators
+        self._active: Optional[Term] = None
+
+    @property
+    def nodes(self) -> list[PhiNode]:
+        return list(self._nodes.values())
+
+    @property
+    def num_terms(self) -> int:
+        """Size of the product (refinements before simplification)."""
+        return math.prod(len(f) for f in self.factors)
+
+    @property
+    def num_covered_generators(self) -> int:
+        """Minimal covered terms: the covered up-set is the one above them."""
+        return len(self._covered)
+
+    def terms(self) -> Iterator[Term]:
+        """Every term of the product; only for small lattices."""
+        return product(*(range(len(f)) for f in self.factors))
+
+    # --- Terms ---
+
+    def _simplified(self, term: Term) -> int:
+        simp = self._simp.get(term)
+        if simp is None:
+            fid = self._combine(tuple(f.rep[a] for f, a in zip(self.factors, term)))
+            simp = self._simp[term] = self.parser.simplify_dict[fid]
+        return simp
+
+    def node(self, term: Term) -> PhiNode:
+        """Lattice node of ``term``, built on first use."""
+        simp = self._simplified(term)
+        nd = self._nodes.get(simp)
+        if nd is None:
+            nd = self._nodes[simp] = PhiNode(formula=self.parser.get_formula(simp))
+            self._simp_of[id(nd)] = simp
+            self.parser.simp_phi_dict[nd.id] = nd
+        self._span[id(nd)] = (term, term)
+        return nd
+
+    def _leq(self, t1: Term, t2: Term) -> bool:
+        return all(f.leq(a, b) for f, a, b in zip(self.factors, t1, t2))
+
+    def _classify(self, term: Term) -> tuple[str, Optional[Term]]:
+        """State of ``term`` and, if covered, a covered generator below it."""
+        for g in self._covered:
+            if self._leq(g, term):
+                return COVERED, g
+        for r in self._refuted:
+            if self._leq(term, r):
+                return REFUTED, None
+        verdict = self._verdicts.get(self._simplified(term))
+        if verdict is True:
+            self._add_covered(term)
+            return COVERED, term
+        if verdict is False:
+            self._add_refuted(term)
+            return REFUTED, None
+        return ACTIVE, None
+
+    def state(self, term: Term) -> str:
+        """``'covered'``, ``'refuted'`` or ``'active'``."""
+        return self._classify(term)[0]
+
+    def _add_covered(self, term: Term) -> None:
+        self._covered = [g for g in self._covered if not self._leq(term, g)]
+        self._covered.append(term)
+
+    def _add_refuted(self, term: Term) -> None:
+        self._refuted = [r for r in self._refuted if not self._leq(r, term)]
+        self._refuted.append(term)
+
+    def _replace(self, term: Term, i: int, a: int) -> Term:
+        return term[:i] + (a,) + term[i + 1:]
+
+    def _upper(self, term: Term) -> Iterator[Term]:
+        for i, f in enumerate(self.factors):
+            for b in f.upper[term[i]]:
+                yield self._replace(term, i, b)
+
+    def _lower(self, term: Term) -> Iterator[Term]:
+        for i, f in enumerate(self.factors):
+            for b in f.lower[term[i]]:
+                yield self._replace(term, i, b)
+
+    def _find_active(self) -> Optional[Term]:
+        """An active term, or None once the whole product is decided."""
+        if self._active is not None and self.state(self._active) == ACTIVE:
+            return self._active
+        self._active = None
+        seen: set[Term] = set()
+        stack = list(product(*(f.maxima for f in self.factors)))
+        while stack:
+            term = stack.pop()
+            if term in seen:
+                continue
+            seen.add(term)
+            state, g = self._classify(term)
+            if state == ACTIVE:
+                self._active = term
+                return term
+            if state == COVERED:
+                for i, f in enumerate(self.factors):
+                    stack.extend(self._replace(term, i, b) for b in f.escapes(term[i], g[i]))
+        return None
+
+    def _path(self, terms: list[Term]) -> tuple[list[PhiNode], int]:
+        """Nodes of a chain of terms, top first; equal neighbours are merged."""
+        path: list[PhiNode] = []
+        for term in terms:
+            nd = self.node(term)
+            if path and path[-1] is nd:
+                self._span[id(nd)] = (highest, term)
+            else:
+                highest = term
+                path.append(nd)
+        return path, len(path)
+
+    # --- Path finding ---
+
+    def get_longest_path(self) -> tuple[list[PhiNode], int]:
+        """
+        A maximal chain of active nodes. Returns (path, length).
+
+        The chain is grown greedily from an active term, up then down
+        through the first active cover, so it cannot be shortened by a
+        test but is not necessarily the longest one.
+        """
+        term = self._find_active()
+        if term is None:
+            return [], 0
+        up, down = [], []
+        for chain, step in ((up, self._upper), (down, self._lower)):
+            cur = term
+            while True:
+                cur = next((t for t in step(cur) if self.state(t) == ACTIVE), None)
+                if cur is None:
+                    break
+                chain.append(cur)
+        return self._path(up[::-1] + [term] + down)
+
+    def get_random_path(self) -> tuple[list[PhiNode], int]:
+        """Random walk up from an active term to a top, then down. Returns (path, length)."""
+        term = self._find_active()
+        if term is None:
+            return [], 0
+        while True:
+            ups = [t for t in self._upper(term) if self.state(t) == ACTIVE]
+            if not ups:
+                break
+            term = random.choice(ups)
+        terms = [term]
+        while True:
+            downs = [t for t in self._lower(terms[-1]) if self.state(t) == ACTIVE]
+            if not downs:
+                break
+            terms.append(random.choice(downs))
+        return self._path(terms)
+
+    # --- Pruning operations ---
+
+    def eliminate_hold(self, node: PhiNode, witness: Any):
+        """Node satisfies the spec → cover its lowest term and everything above."""
+        simp = self._simp_of[id(node)]
+        if simp not in self._verdicts:
+            self._verdicts[simp] = True
+            node.active = False
+            node.add_to_results(witness)
+            self._add_covered(self._span[id(node)][1])
+
+    def eliminate_unhold(self, node: PhiNode):
+        """Node fails the spec → refute its highest term and everything below."""
+        simp = self._simp_of[id(node)]
+        if simp not in self._verdicts:
+            self._verdicts[simp] = False
+            node.active = False
+            self._add_refuted(self._span[id(node)][0])
+
+    # --- Query ---
+
+    def below(self, node: PhiNode) -> list[PhiNode]:
+        """Built nodes strictly below ``node``."""
+        highest = self._span[id(node)][0]
+        return [n for n in self._nodes.values()
+                if n is not node and self._leq(self._span[id(n)][1], highest)]
+
+    def is_empty(self) -> bool:
+        """Check if any active terms remain."""
+        return self._find_active() is None
+
+    def count_classes(self) -> tuple[int, int]:
+        """
+        (Simplified formulas, covered ones) over the whole product.
+
+        Enumerates every term (``terms``); only for small lattices. A
+        formula is covered when any of its terms is.
+        """
+        covered: dict[int, bool] = {}
+        for term in self.terms():
+            simp = self._simplified(term)
+            covered[simp] = covered.get(simp, False) or self.state(term) == COVERED
+        return len(covered), sum(covered.values())
+
+    def get_covered_nodes(self) -> list[PhiNode]:
+        """Built nodes that have a witnessing result."""
+        return [n for n in self._nodes.values() if n.results]
+
+    def __repr__(self) -> str:
+        return (f"LazyGraph(terms={self.num_terms}, built={len(self._nodes)}, "
+                f"covered={len(self._covered)}, refuted={len(self._refuted)})")
@@ -1,22 +1,17 @@
 from __future__ import annotations
 from itertools import product as cartesian_product
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Union
 
 from ceclass.formula.stl_node import STLNode
+from ceclass.lattice.canonical import merge_equivalent
+from ceclass.lattice.compact_graph import CompactGraph
+from ceclass.lattice.formula_table import FormulaTable
 from ceclass.lattice.phi_node import PhiNode
 from ceclass.lattice.phi_graph import PhiGraph
+from ceclass.lattice.product_pool import parse_root
 
-
-class _Edge:
-    """Temporary edge representation used during parsing."""
-    __slots__ = ('greater', 'smaller')
-
-    def __init__(self, greater: str, smaller: str):
-        self.greater = greater
-        self.smaller = smaller
-
-    def __repr__(self):
-        return f"Edge({self.greater} -> {self.smaller})"
+# Implication edge between two refined formulas: (greater ID, smaller ID).
+_Edge = tuple[Optional[int], Optional[int]]
 
 
 class Parser:
@@ -27,69 +22,243 @@ class Parser:
     generates all refined sub-formulas, builds implication edges, deduplicates,
     and returns a PhiGraph.
 
+    Products (AND/OR of two children, ``child^k`` under a temporal operator)
+    are generated lazily: only the children of an operator are held as
+    lists, and the refined formulas and edges of the root are streamed into
+    deduplication and edge connection without materializing the full product.
+
+    Refined formulas are integer IDs in ``table`` (a ``FormulaTable``) while
+    parsing. STLNode trees and readable ID strings (the Parser.m names) are
+    only built for the simplified formulas that become lattice nodes.
+
+    With ``hasse_edges`` the implication edges are not generated at all:
+    the covering pairs of each product (one coordinate steps down one child
+    cover, the others are fixed) are mapped through simplification, and the
+    immediate edges come from that much smaller relation (see
+    ``_connect_covers``). The lattice then keeps no closure lists
+    (``PhiGraph.transitive`` is off).
+
+    With ``canonical`` the lattice is reduced by canonical form
+    (``merge_equivalent``): refinements equal up to operand order,
+    absorption or adjacent segments with the same child become one node,
+    named after the first of them.
+
+    With ``workers`` the root product (nodes and implication edges) is
+    split across that many processes (``product_pool.parse_root``); the
+    lattice is the same. Children are still parsed here, and
+    ``hasse_edges`` parses sequentially.
+
     Args:
         formula: Root STLNode of the specification.
         k: Hierarchy depth config. Nested list, e.g. [2, [1, [1], [1]]].
            k[0] = number of temporal segments for temporal operators.
            k[1] = k for first sub-formula.
            k[2] = k for second sub-formula (if binary operator).
+        hasse_edges: Build the immediate edges from product covers instead
+            of reducing the full implication relation.
+        canonical: Merge refinements with the same canonical form.
+        workers: Worker processes for the root product (None: in process).
+
+    Attributes:
+        phi_graph: The parsed lattice (a ``CompactGraph`` after
+            ``parse_compact`` or ``compact``).
+        table: Interned refined formulas.
+        simplify_dict: Formula ID -> ID of its simplified form.
+        formula_dict: Simplified formula ID -> STLNode, filled on demand.
+        simp_phi_dict: Readable ID -> lattice node (with ``canonical``, the
+            node of the merged class for every member ID).
+        interval_dict: Parameter name -> bounds.
     """
 
-    def __init__(self, formula: STLNode, k: list):
+    def __init__(self, formula: STLNode, k: list, hasse_edges: bool = False,
+                 canonical: bool = False, workers: Optional[int] = None):
         self.formula = formula
         self.k = k
-        self.phi_graph: Optional[PhiGraph] = None
-        self.simplify_dict: dict[str, str] = {}
-        self.formula_dict: dict[str, STLNode] = {}
+        self.hasse_edges = hasse_edges
+        self.canonical = canonical
+        self.workers = workers
+        self.phi_graph: Union[None, PhiGraph, CompactGraph] = None
+        self.table = FormulaTable()
+        self.simplify_dict: dict[int, int] = {}
+        self.formula_dict: dict[int, STLNode] = {}
         self.simp_phi_dict: dict[str, PhiNode] = {}
         self.interval_dict: dict[str, tuple[float, float]] = {}
+        # Segments of simplified temporal formulas, see ``_build_temporal_nodes``.
+        self._segments: dict[int, tuple[str, list[tuple[int, tuple]]]] = {}
+
+        self._true = self._leaf(STLNode.true_node())
+        self._false = self._leaf(STLNode.false_node())
 
     def parse(self) -> PhiGraph:
         """Run the full parsing pipeline. Returns the constructed PhiGraph."""
-        # 1. Generate refined formula nodes
-        phi_nodes = self._parse_nodes_neg(self.formula, self.k)
-
-        # 2. Deduplicate: keep only unique simplified formulas
-        simp_phis = []
-        seen_ids = set()
-        for pn in phi_nodes:
-            orig_id = pn.formula.id
-            simp_id = self.simplify_dict[orig_id]
-            if simp_id not in seen_ids:
-                seen_ids.add(simp_id)
-                formula = self.formula_dict[simp_id]
-                simp_phis.append(PhiNode(formula=formula))
-
+        formulas, smaller, greater, bottom = self._parse_arrays()
+        simp_phis = [PhiNode(formula=f) for f in formulas]
         for sp in simp_phis:
             self.simp_phi_dict[sp.formula.id] = sp
 
-        # 3. Generate implication edges
-        edges = self._parse_edges_neg(self.formula, self.k)
-
-        # 4. Connect edges to deduplicated nodes
-        for edge in edges:
-            greater_simp_id = self.simplify_dict.get(edge.greater)
-            smaller_simp_id = self.simplify_dict.get(edge.smaller)
-            if greater_simp_id is None or smaller_simp_id is None:
-                continue
-            if greater_simp_id not in self.simp_phi_dict or smaller_simp_id not in self.simp_phi_dict:
-                continue
-            gn = self.simp_phi_dict[greater_simp_id]
-            sn = self.simp_phi_dict[smaller_simp_id]
-            gn.add_to_smaller_all(sn)
-            sn.add_to_greater_all(gn)
+        below, above = (('smaller_imme', 'greater_imme') if self.hasse_edges
+                        else ('smaller_all', 'greater_all'))
+        for sp, row_s, row_g in zip(simp_phis, smaller, greater):
+            setattr(sp, below, [simp_phis[i] for i in row_s])
+            setattr(sp, above, [simp_phis[i] for i in row_g])
 
         # 5. Build PhiGraph
         self.phi_graph = PhiGraph(simp_phis)
-        self.phi_graph.set_imme()
+        if self.hasse_edges:
+            self.phi_graph.transitive = False
+            self.phi_graph.bottom = None if bottom is None else simp_phis[bottom]
+        else:
+            self.phi_graph.set_imme()
         self.phi_graph.set_maxima()
+        return self._merge_equivalent()
+
+    def parse_compact(self) -> CompactGraph:
+        """
+        ``parse`` into a ``CompactGraph``, without a ``PhiNode`` per lattice node.
+
+        The node and edge arrays go straight into the compact graph; only
+        with ``canonical`` is the merged ``PhiGraph`` built and converted
+        (``compact``). Either way ``phi_graph`` and ``simp_phi_dict`` then
+        hold the compact graph and its nodes.
+        """
+        if self.canonical:
+            self.parse()
+            return self.compact()
+        formulas, smaller, greater, bottom = self._parse_arrays()
+        if self.hasse_edges:
+            empty = [[]] * len(formulas)
+            graph = CompactGraph(formulas, empty, empty, smaller, greater)
+            graph.transitive = False
+            graph.bottom = None if bottom is None else graph.nodes[bottom]
+            graph.set_maxima()
+        else:
+            graph = CompactGraph.from_closure(formulas, smaller, greater)
+        self.phi_graph = graph
+        self.simp_phi_dict = {nd.id: nd for nd in graph.nodes}
+        return graph
+
+    def compact(self) -> CompactGraph:
+        """
+        Swap the parsed ``phi_graph`` for its ``CompactGraph`` copy.
+
+        ``simp_phi_dict`` is mapped to the compact nodes, so no reference to
+        the ``PhiNode``s is kept.
+        """
+        graph = CompactGraph.from_phi_graph(self.phi_graph)
+        index = {id(nd): i for i, nd in enumerate(self.phi_graph.nodes)}
+        self.simp_phi_dict = {fid: graph.nodes[index[id(nd)]]
+                              for fid, nd in self.simp_phi_dict.items()}
+        self.phi_graph = graph
+        return graph
+
+    def _parse_arrays(self) -> tuple[list[STLNode], list[list[int]], list[list[int]],
+                                     Optional[int]]:
+        """
+        Steps 1-4, on node positions.
+
+        Returns:
+            (formula of every lattice node, rows below, rows above, bottom).
+            The rows are the implication closure in first-seen order, or
+            with ``hasse_edges`` the immediate edges, and then bottom is the
+            position of TRUE (see ``_connect_covers``).
+        """
+        simplify = self.simplify_dict
+        pooled = None
+        if self.workers and not self.hasse_edges:
+            pooled = parse_root(self, self.workers)
+
+        # 1. Generate refined formula nodes (streamed)
+        # 2. Deduplicate: keep only unique simplified formulas. Their STLNodes
+        #    are built once every refined formula has been generated.
+        position: dict[int, int] = {}
+        if pooled is not None:
+            position = {simp_id: i for i, simp_id in enumerate(pooled[0])}
+        else:
+            for fid in self._parse_nodes_neg(self.formula, self.k):
+                position.setdefault(simplify[fid], len(position))
+        formulas = [self.get_formula(simp_id) for simp_id in position]
+
+        if self.hasse_edges:
+            # 3-4. Covers of the product order -> immediate edges
+            _, covers = self._parse_covers(self.formula, self.k, 'Neg')
+            return (formulas,) + self._connect_covers(len(formulas), position, covers)
+
+        # 3. Generate implication edges (streamed), as node positions
+        if pooled is not None:
+            edges = pooled[1]
+        else:
+            edges = ((position.get(simplify.get(g)), position.get(simplify.get(s)))
+                     for g, s in self._parse_edges_neg(self.formula, self.k))
+
+        # 4. Connect edges to deduplicated nodes, in first-seen order
+        smaller: list[list[int]] = [[] for _ in formulas]
+        greater: list[list[int]] = [[] for _ in formulas]
+        seen: set[tuple[int, int]] = set()
+        for gi, si in edges:
+            if gi is None or si is None or gi == si or (gi, si) in seen:
+                continue
+            seen.add((gi, si))
+            smaller[gi].append(si)
+            greater[si].append(gi)
+        return formulas, smaller, greater, None
+
+    def _merge_equivalent(self) -> PhiGraph:
+        """6. With ``canonical``, collapse the lattice by canonical form."""
+        if self.canonical:
+            graph, classes = merge_equivalent(self.phi_graph)
+            self.simp_phi_dict = {nd.id: cls for nd, cls in zip(self.phi_graph.nodes, classes)}
+            self.phi_graph = graph
         return self.phi_graph
 
+    # ========================================================================
+    # Formula table
+    # ========================================================================
+
+    def _leaf(self, phi: STLNode) -> int:
+        fid = self.table.intern((phi.id,))
+        self.simplify_dict[fid] = fid
+        self.formula_dict[fid] = phi
+        return fid
+
+    def get_formula(self, fid: int) -> STLNode:
+        """STLNode of simplified formula ``fid``, built (once) from its operands."""
+        formula = self.formula_dict.get(fid)
+        if formula is not None:
+            return formula
+        table = self.table
+        name = table.name(fid)
+        segments = self._segments.get(fid)
+        if segments is not None:
+            op, pieces = segments
+            if op == 'always':
+                formula = self._chain_and([
+                    STLNode.always_node(self.get_formula(p), interval=iv,
+                                        node_id=f"Alw{table.name(p)}")
+                    for p, iv in pieces
+                ], name)
+            else:
+                formula = self._chain_or([
+                    STLNode.eventually_node(self.get_formula(p), interval=iv,
+                                            node_id=f"Ev{table.name(p)}")
+                    for p, iv in pieces
+                ], name)
+        else:
+            tag, *operands = table.key(fid)
+            children = [self.get_formula(p) for p in operands]
+            if tag.endswith('Not'):
+                formula = STLNode.not_node(children[0], name)
+            elif tag.endswith('And'):
+                formula = STLNode.and_node(children[0], children[1], name)
+            else:
+                formula = STLNode.or_node(children[0], children[1], name)
+        self.formula_dict[fid] = formula
+        return formula
+
     # ========================================================================
     # Node generation (positive polarity)
     # ========================================================================
 
-    def _parse_nodes_pos(self, phi: STLNode, k: list) -> list[PhiNode]:
+    def _parse_nodes_pos(self, phi: STLNode, k: list) -> Iterable[int]:
         if phi.node_type == 'predicate':
             return self._parse_predicate_pos(phi)
         elif phi.node_type == 'not':
@@ -105,62 +274,35 @@ class Parser:
         else:
             raise ValueError(f"Unsupported node type in parse_nodes_pos: {phi.node_type}")
 
-    def _parse_predicate_pos(self, phi: STLNode) -> list[PhiNode]:
-        self.simplify_dict[phi.id] = phi.id
-        self.formula_dict[phi.id] = phi
-
-        f_node = STLNode.false_node()
-        self.simplify_dict['FALSE'] = 'FALSE'
-        self.formula_dict['FALSE'] = f_node
-
-        return [PhiNode(formula=phi), PhiNode(formula=f_node)]
+    def _parse_predicate_pos(self, phi: STLNode) -> Iterable[int]:
+        return [self._leaf(phi), self._false]
 
-    def _parse_not_pos(self, phi: STLNode, k: list) -> list[PhiNode]:
+    def _parse_not_pos(self, phi: STLNode, k: list) -> Iterator[int]:
         # NOT in positive context: flip to negative for child
-        child_nodes = self._parse_nodes_neg(phi.children[0], k[1])
-        result = []
-        for pn in child_nodes:
-            p = pn.formula
-            new_id = f"PosNot_{p.id}"
-            new_formula = STLNode.not_node(p, new_id)
-            result.append(PhiNode(formula=new_formula))
-
-            p_simp_id = self.simplify_dict[p.id]
-            if p_simp_id == 'FALSE':
-                simplified_id = 'TRUE'
-                self.formula_dict['TRUE'] = STLNode.true_node()
-            elif p_simp_id == 'TRUE':
-                simplified_id = 'FALSE'
-                self.formula_dict['FALSE'] = STLNode.false_node()
-            else:
-                simplified_id = f"PosNot_{p_simp_id}"
-                self.formula_dict[simplified_id] = STLNode.not_node(
-                    self.formula_dict[p_simp_id], simplified_id
-                )
-            self.simplify_dict[new_id] = simplified_id
-        return result
+        child_ids = self._parse_nodes_neg(phi.children[0], k[1])
+        return self._build_not_nodes('PosNot', child_ids)
 
-    def _parse_and_pos(self, phi: STLNode, k: list) -> list[PhiNode]:
-        nodes1 = self._parse_nodes_pos(phi.children[0], k[1])
-        nodes2 = self._parse_nodes_pos(phi.children[1], k[2])
-        return self._combine_binary('PosAnd', 'and', nodes1, nodes2)
+    def _parse_and_pos(self, phi: STLNode, k: list) -> Iterator[int]:
+        ids1 = list(self._parse_nodes_pos(phi.children[0], k[1]))
+        ids2 = list(self._parse_nodes_pos(phi.children[1], k[2]))
+        return self._combine_binary('PosAnd', 'and', ids1, ids2)
 
-    def _parse_or_pos(self, phi: STLNode, k: list) -> list[PhiNode]:
-        nodes1 = self._parse_nodes_pos(phi.children[0], k[1])
-        nodes2 = self._parse_nodes_pos(phi.children[1], k[2])
-        return self._combine_binary('PosOr', 'or', nodes1, nodes2)
+    def _parse_or_pos(self, phi: STLNode, k: list) -> Iterator[int]:
+        ids1 = list(self._parse_nodes_pos(phi.children[0], k[1]))
+        ids2 = list(self._parse_nodes_pos(phi.children[1], k[2]))
+        return self._combine_binary('PosOr', 'or', ids1, ids2)
 
-    def _parse_always_pos(self, phi: STLNode, k: list) -> list[PhiNode]:
+    def _parse_always_pos(self, phi: STLNode, k: list) -> Iterator[int]:
         return self._parse_temporal_pos(phi, k, 'always')
 
-    def _parse_eventually_pos(self, phi: STLNode, k: list) -> list[PhiNode]:
+    def _parse_eventually_pos(self, phi: STLNode, k: list) -> Iterator[int]:
         return self._parse_temporal_pos(phi, k, 'eventually')
 
     # ========================================================================
     # Node generation (negative polarity)
     # ========================================================================
 
-    def _parse_nodes_neg(self, phi: STLNode, k: list) -> list[PhiNode]:
+    def _parse_nodes_neg(self, phi: STLNode, k: list) -> Iterable[int]:
         if phi.node_type == 'predicate':
             return self._parse_predicate_neg(phi)
         elif phi.node_type == 'not':
@@ -176,354 +318,198 @@ class Parser:
         else:
             raise ValueError(f"Unsupported node type in parse_nodes_neg: {phi.node_type}")
 
-    def _parse_predicate_neg(self, phi: STLNode) -> list[PhiNode]:
-        self.simplify_dict[phi.id] = phi.id
-        self.formula_dict[phi.id] = phi
-
-        t_node = STLNode.true_node()
-        self.simplify_dict['TRUE'] = 'TRUE'
-        self.formula_dict['TRUE'] = t_node
+    def _parse_predicate_neg(self, phi: STLNode) -> Iterable[int]:
+        return [self._leaf(phi), self._true]
 
-        return [PhiNode(formula=phi), PhiNode(formula=t_node)]
-
-    def _parse_not_neg(self, phi: STLNode, k: list) -> list[PhiNode]:
+    def _parse_not_neg(self, phi: STLNode, k: list) -> Iterator[int]:
         # NOT in negative context: flip to positive for child
-        child_nodes = self._parse_nodes_pos(phi.children[0], k[1])
-        result = []
-        for pn in child_nodes:
-            p = pn.formula
-            new_id = f"NegNot_{p.id}"
-            new_formula = STLNode.not_node(p, new_id)
-            result.append(PhiNode(formula=new_formula))
-
-            p_simp_id = self.simplify_dict[p.id]
-            if p_simp_id == 'FALSE':
-                simplified_id = 'TRUE'
-                self.formula_dict['TRUE'] = STLNode.true_node()
-            elif p_simp_id == 'TRUE':
-                simplified_id = 'FALSE'
-                self.formula_dict['FALSE'] = STLNode.false_node()
-            else:
-                simplified_id = f"NegNot_{p_simp_id}"
-                self.formula_dict[simplified_id] = STLNode.not_node(
-                    self.formula_dict[p_simp_id], simplified_id
-                )
-            self.simplify_dict[new_id] = simplified_id
-        return result
+        child_ids = self._parse_nodes_pos(phi.children[0], k[1])
+        return self._build_not_nodes('NegNot', child_ids)
 
-    def _parse_and_neg(self, phi: STLNode, k: list) -> list[PhiNode]:
-        nodes1 = self._parse_nodes_neg(phi.children[0], k[1])
-        nodes2 = self._parse_nodes_neg(phi.children[1], k[2])
-        return self._combine_binary('NegAnd', 'and', nodes1, nodes2)
+    def _parse_and_neg(self, phi: STLNode, k: list) -> Iterator[int]:
+        ids1 = list(self._parse_nodes_neg(phi.children[0], k[1]))
+        ids2 = list(self._parse_nodes_neg(phi.children[1], k[2]))
+        return self._combine_binary('NegAnd', 'and', ids1, ids2)
 
-    def _parse_or_neg(self, phi: STLNode, k: list) -> list[PhiNode]:
-        nodes1 = self._parse_nodes_neg(phi.children[0], k[1])
-        nodes2 = self._parse_nodes_neg(phi.children[1], k[2])
-        return self._combine_binary('NegOr', 'or', nodes1, nodes2)
+    def _parse_or_neg(self, phi: STLNode, k: list) -> Iterator[int]:
+        ids1 = list(self._parse_nodes_neg(phi.children[0], k[1]))
+        ids2 = list(self._parse_nodes_neg(phi.children[1], k[2]))
+        return self._combine_binary('NegOr', 'or', ids1, ids2)
 
-    def _parse_always_neg(self, phi: STLNode, k: list) -> list[PhiNode]:
+    def _parse_always_neg(self, phi: STLNode, k: list) -> Iterator[int]:
         return self._parse_temporal_neg(phi, k, 'always')
 
-    def _parse_eventually_neg(self, phi: STLNode, k: list) -> list[PhiNode]:
+    def _parse_eventually_neg(self, phi: STLNode, k: list) -> Iterator[int]:
         return self._parse_temporal_neg(phi, k, 'eventually')
 
     # ========================================================================
-    # Shared binary combination (AND/OR)
+    # Shared NOT / binary combination (AND/OR)
     # ========================================================================
 
-    def _combine_binary(self, prefix: str, op: str,
-                        nodes1: list[PhiNode], nodes2: list[PhiNode]) -> list[PhiNode]:
-        """Generate Cartesian product of two node lists with AND or OR semantics."""
-        result = []
-        for pn1 in nodes1:
-            for pn2 in nodes2:
-                p1, p2 = pn1.formula, pn2.formula
-                new_id = f"{prefix}_{p1.id}{p2.id}"
-
-                if op == 'and':
-                    new_formula = STLNode.and_node(p1, p2, new_id)
-                else:
-                    new_formula = STLNode.or_node(p1, p2, new_id)
-                result.append(PhiNode(formula=new_formula))
-
-                p1_simp = self.simplify_dict[p1.id]
-                p2_simp = self.simplify_dict[p2.id]
-
-                if op == 'and':
-                    simplified_id, simp_formula = self._simplify_and(
-                        p1_simp, p2_simp, prefix
-                    )
-                else:
-                    simplified_id, simp_formula = self._simplify_or(
-                        p1_simp, p2_simp, prefix
-                    )
-
-                self.simplify_dict[new_id] = simplified_id
-                self.formula_dict[simplified_id] = simp_formula
-        return result
+    def _build_not_nodes(self, tag: str, child_ids: Iterable[int]) -> Iterator[int]:
+        """Negate each child; the simplification swaps TRUE and FALSE."""
+        intern, simplify = self.table.intern, self.simplify_dict
+        for p in child_ids:
+            new_id = intern((tag, p))
+            p_simp = simplify[p]
+            if p_simp == self._false:
+                simplified_id = self._true
+            elif p_simp == self._true:
+                simplified_id = self._false
+            else:
+                simplified_id = intern((tag, p_simp))
+            simplify[new_id] = simplified_id
+            yield new_id
 
-    def _simplify_and(self, p1_simp: str, p2_simp: str,
-                      prefix: str) -> tuple[str, STLNode]:
-        if p1_simp == 'FALSE' or p2_simp == 'FALSE':
-            return 'FALSE', STLNode.false_node()
-        elif p1_simp == 'TRUE' and p2_simp == 'TRUE':
-            return 'TRUE', STLNode.true_node()
-        elif p1_simp == 'TRUE':
-            return p2_simp, self.formula_dict[p2_simp]
-        elif p2_simp == 'TRUE':
-            return p1_simp, self.formula_dict[p1_simp]
+    def _combine_binary(self, prefix: str, op: str,
+                        ids1: list[int], ids2: list[int]) -> Iterator[int]:
+        """Generate Cartesian product of two formula lists with AND or OR semantics."""
+        intern, simplify = self.table.intern, self.simplify_dict
+        simplify_op = self._simplify_and if op == 'and' else self._simplify_or
+        for p1 in ids1:
+            p1_simp = simplify[p1]
+            for p2 in ids2:
+                new_id = intern((prefix, p1, p2))
+                simplify[new_id] = simplify_op(p1_simp, simplify[p2], prefix)
+                yield new_id
+
+    def _simplify_and(self, p1_simp: int, p2_simp: int, prefix: str) -> int:
+        if p1_simp == self._false or p2_simp == self._false:
+            return self._false
+        elif p1_simp == self._true:
+            return p2_simp
+        elif p2_simp == self._true:
+            return p1_simp
         else:
-            sid = f"{prefix}_{p1_simp}{p2_simp}"
-            formula = STLNode.and_node(
-                self.formula_dict[p1_simp], self.formula_dict[p2_simp], sid
-            )
-            return sid, formula
-
-    def _simplify_or(self, p1_simp: str, p2_simp: str,
-                     prefix: str) -> tuple[str, STLNode]:
-        if p1_simp == 'TRUE' or p2_simp == 'TRUE':
-            return 'TRUE', STLNode.true_node()
-        elif p1_simp == 'FALSE' and p2_simp == 'FALSE':
-            return 'FALSE', STLNode.false_node()
-        elif p1_simp == 'FALSE':
-            return p2_simp, self.formula_dict[p2_simp]
-        elif p2_simp == 'FALSE':
-            return p1_simp, self.formula_dict[p1_simp]
+            return self.table.intern((prefix, p1_simp, p2_simp))
+
+    def _simplify_or(self, p1_simp: int, p2_simp: int, prefix: str) -> int:
+        if p1_simp == self._true or p2_simp == self._true:
+            return self._true
+        elif p1_simp == self._false:
+            return p2_simp
+        elif p2_simp == self._false:
+            return p1_simp
         else:
-            sid = f"{prefix}_{p1_simp}{p2_simp}"
-            formula = STLNode.or_node(
-                self.formula_dict[p1_simp], self.formula_dict[p2_simp], sid
-            )
-            return sid, formula
+            return self.table.intern((prefix, p1_simp, p2_simp))
 
     # ========================================================================
-    # Temporal operator handling (positive)
+    # Temporal operator handling
     # ========================================================================
 
     def _parse_temporal_pos(self, phi: STLNode, k: list,
-                            temporal_type: str) -> list[PhiNode]:
-        phi_id = phi.id
-        k_num = k[0]
-        child_nodes = self._parse_nodes_pos(phi.children[0], k[1])
-
-        # Extract interval bounds
-        t_start, t_end = phi.interval
-        if isinstance(t_start, (int, float)) and isinstance(t_end, (int, float)):
-            self.interval_dict[f"{phi_id}____"] = (float(t_start), float(t_end))
-
-        # Build Cartesian product queue: child_nodes^k_num
-        queue = [[cn] for cn in child_nodes]
-        while len(queue[0]) < k_num:
-            new_queue = []
-            for row in queue:
-                for cn in child_nodes:
-                    new_queue.append(row + [cn])
-            queue = new_queue
-
-        if temporal_type == 'always':
-            return self._build_always_nodes(queue, phi_id, t_start, t_end, 'Pos')
-        else:
-            return self._build_eventually_nodes(queue, phi_id, t_start, t_end, 'Pos')
-
-    # ========================================================================
-    # Temporal operator handling (negative)
-    # ========================================================================
+                            temporal_type: str) -> Iterator[int]:
+        child_ids = list(self._parse_nodes_pos(phi.children[0], k[1]))
+        return self._parse_temporal(phi, k, temporal_type, child_ids, 'Pos')
 
     def _parse_temporal_neg(self, phi: STLNode, k: list,
-                            temporal_type: str) -> list[PhiNode]:
+                            temporal_type: str) -> Iterator[int]:
+        child_ids = list(self._parse_nodes_neg(phi.children[0], k[1]))
+        return self._parse_temporal(phi, k, temporal_type, child_ids, 'Neg')
+
+    def _parse_temporal(self, phi: STLNode, k: list, temporal_type: str,
+                        child_ids: list[int], polarity: str) -> Iterator[int]:
+        tag, intervals = self._temporal_segments(phi, k, temporal_type, polarity)
+        # Cartesian product child_ids^k_num, one row at a time
+        rows = cartesian_product(child_ids, repeat=len(intervals))
+        return self._build_temporal_nodes(rows, tag, temporal_type, intervals)
+
+    def _temporal_segments(self, phi: STLNode, k: list, temporal_type: str,
+                           polarity: str) -> tuple[str, list[tuple]]:
+        """Tag and segment intervals of a temporal operator (registers their bounds)."""
         phi_id = phi.id
-        k_num = k[0]
-        child_nodes = self._parse_nodes_neg(phi.children[0], k[1])
+        col_size = max(k[0], 1)
 
+        # Extract interval bounds
         t_start, t_end = phi.interval
         if isinstance(t_start, (int, float)) and isinstance(t_end, (int, float)):
             self.interval_dict[f"{phi_id}____"] = (float(t_start), float(t_end))
 
-        queue = [[cn] for cn in child_nodes]
-        while len(queue[0]) < k_num:
-            new_queue = []
-            for row in queue:
-                for cn in child_nodes:
-                    new_queue.append(row + [cn])
-            queue = new_queue
-
+        # Segment j covers [t_start or t{j+1}, t{j+2} or t_end]
+        intervals = []
+        for j in range(col_size):
+            tst = t_start if j == 0 else f"{phi_id}____t{j + 1}"
+            ted = t_end if j == col_size - 1 else f"{phi_id}____t{j + 2}"
+            # Store param bounds for symbolic boundaries
+            for bound in (tst, ted):
+                if isinstance(bound, str) and bound not in self.interval_dict:
+                    self._register_param_bound(bound, phi_id, t_start, t_end)
+            intervals.append((tst, ted))
+
+        tag = f"{polarity}Alw" if temporal_type == 'always' else f"{polarity}Ev"
+        return tag, intervals
+
+    def _build_temporal_nodes(self, rows: Iterable[tuple[int, ...]], tag: str,
+                              temporal_type: str, intervals: list[tuple]) -> Iterator[int]:
+        """
+        Build always/eventually-refined formulas from the rows of the product.
+
+        Segments whose child simplifies to TRUE or FALSE are dropped; a FALSE
+        segment makes an always formula FALSE (a TRUE one makes an eventually
+        formula TRUE), and no remaining segment makes it TRUE (FALSE). The
+        other segments are kept, with their intervals, for ``get_formula``.
+        As with Parser.m's ID strings, rows that leave the same segments at
+        different middle positions share one simplified ID; the last row
+        generated defines its formula.
+        """
+        intern, simplify = self.table.intern, self.simplify_dict
         if temporal_type == 'always':
-            return self._build_always_nodes(queue, phi_id, t_start, t_end, 'Neg')
+            absorbing, neutral = self._false, self._true
         else:
-            return self._build_eventually_nodes(queue, phi_id, t_start, t_end, 'Neg')
-
-    # ========================================================================
-    # Build temporal formula nodes
-    # ========================================================================
-
-    def _build_always_nodes(self, queue, phi_id, t_start, t_end,
-                            polarity: str) -> list[PhiNode]:
-        """Build always-refined formula nodes from the Cartesian product queue."""
-        result = []
-        col_size = len(queue[0])
-
-        for row in queue:
-            id_parts = [f"{polarity}Alw_"]
-            simp_id_parts = [f"{polarity}Alw_"]
-            simp_fixed_false = False
-            simp_exist_nontrue = False
-            phi_set = []
-            simp_phi_set = []
-
-            for j, pn in enumerate(row):
-                p = pn.formula
-                p_simp_id = self.simplify_dict[p.id]
-
-                if p_simp_id == 'FALSE':
-                    simp_fixed_false = True
-                elif p_simp_id != 'TRUE':
-                    simp_exist_nontrue = True
-
-                # Determine interval boundaries for this segment
-                tst = t_start if j == 0 else f"{phi_id}____t{j + 1}"
-                ted = t_end if j == col_size - 1 else f"{phi_id}____t{j + 2}"
-
-                # Store param bounds for symbolic boundaries
-                if isinstance(tst, str) and tst not in self.interval_dict:
-                    self._register_param_bound(tst, phi_id, t_start, t_end)
-                if isinstance(ted, str) and ted not in self.interval_dict:
-                    self._register_param_bound(ted, phi_id, t_start, t_end)
-
-                alw_node = STLNode.always_node(p, interval=(tst, ted), node_id=f"Alw{p.id}")
-                id_parts.append(p.id)
-                phi_set.append(alw_node)
-
-                if p_simp_id not in ('TRUE', 'FALSE'):
-                    if j == 0:
-                        simp_id_parts.append(f"st{p_simp_id}")
-                    elif j == col_size - 1:
-                        simp_id_parts.append(f"ed{p_simp_id}")
-                    else:
-                        simp_id_parts.append(p_simp_id)
-                    simp_alw = STLNode.always_node(
-                        self.formula_dict[p_simp_id],
-                        interval=(tst, ted),
-                        node_id=f"Alw{p_simp_id}"
-                    )
-                    simp_phi_set.append(simp_alw)
-
-            full_id = "".join(id_parts)
-            # Combine temporal segments with AND
-            full_formula = self._chain_and(phi_set, full_id)
-            result.append(PhiNode(formula=full_formula))
-
-            # Simplification
-            if simp_fixed_false:
-                simplified_id = 'FALSE'
-                self.formula_dict['FALSE'] = STLNode.false_node()
-            elif not simp_exist_nontrue:
-                simplified_id = 'TRUE'
-                self.formula_dict['TRUE'] = STLNode.true_node()
-            else:
-                simplified_id = "".join(simp_id_parts)
-                self.formula_dict[simplified_id] = self._chain_and(simp_phi_set, simplified_id)
-
-            self.simplify_dict[full_id] = simplified_id
-
-        return result
-
-    def _build_eventually_nodes(self, queue, phi_id, t_start, t_end,
-                                polarity: str) -> list[PhiNode]:
-        """Build eventually-refined formula nodes from the Cartesian product queue."""
-        result = []
-        col_size = len(queue[0])
-
-        for row in queue:
-            id_parts = [f"{polarity}Ev_"]
-            simp_id_parts = [f"{polarity}Ev_"]
-            simp_fixed_true = False
-            simp_exist_nonfalse = False
-            phi_set = []
-            simp_phi_set = []
-
-            for j, pn in enumerate(row):
-                p = pn.formula
-                p_simp_id = self.simplify_dict[p.id]
-
-                if p_simp_id == 'TRUE':
-                    simp_fixed_true = True
-                elif p_simp_id != 'FALSE':
-                    simp_exist_nonfalse = True
-
-                tst = t_start if j == 0 else f"{phi_id}____t{j + 1}"
-                ted = t_end if j == col_size - 1 else f"{phi_id}____t{j + 2}"
-
-                if isinstance(tst, str) and tst not in self.interval_dict:
-                    self._register_param_bound(tst, phi_id, t_start, t_end)
-                if isinstance(ted, str) and ted not in self.interval_dict:
-                    self._register_param_bound(ted, phi_id, t_start, t_end)
-
-                ev_node = STLNode.eventually_node(p, interval=(tst, ted), node_id=f"Ev{p.id}")
-                id_parts.append(p.id)
-                phi_set.append(ev_node)
-
-                if p_simp_id not in ('TRUE', 'FALSE'):
-                    if j == 0:
-                        simp_id_parts.append(f"st{p_simp_id}")
-                    elif j == col_size - 1:
-                        simp_id_parts.append(f"ed{p_simp_id}")
-                    else:
-                        simp_id_parts.append(p_simp_id)
-                    simp_ev = STLNode.eventually_node(
-                        self.formula_dict[p_simp_id],
-                        interval=(tst, ted),
-                        node_id=f"Ev{p_simp_id}"
-                    )
-                    simp_phi_set.append(simp_ev)
-
-            full_id = "".join(id_parts)
-            # Combine temporal segments with OR
-            full_formula = self._chain_or(phi_set, full_id)
-            result.append(PhiNode(formula=full_formula))
-
-            # Simplification
-            if simp_fixed_true:
-                simplified_id = 'TRUE'
-                self.formula_dict['TRUE'] = STLNode.true_node()
-            elif not simp_exist_nonfalse:
-                simplified_id = 'FALSE'
-                self.formula_dict['FALSE'] = STLNode.false_node()
+            absorbing, neutral = self._true, self._false
+        trivial = (self._true, self._false)
+        last = len(intervals) - 1
+
+        for row in rows:
+            simp_key = [tag]
+            pieces = []
+            fixed = False
+            for j, p in enumerate(row):
+                p_simp = simplify[p]
+                if p_simp in trivial:
+                    fixed = fixed or p_simp == absorbing
+                    continue
+                if j == 0:
+                    simp_key += ('st', p_simp)
+                elif j == last:
+                    simp_key += ('ed', p_simp)
+                else:
+                    simp_key.append(p_simp)
+                pieces.append((p_simp, intervals[j]))
+
+            new_id = intern((tag,) + row)
+            if fixed:
+                simplified_id = absorbing
+            elif not pieces:
+                simplified_id = neutral
             else:
-                simplified_id = "".join(simp_id_parts)
-                self.formula_dict[simplified_id] = self._chain_or(simp_phi_set, simplified_id)
-
-            self.simplify_dict[full_id] = simplified_id
-
-        return result
+                simplified_id = intern(tuple(simp_key))
+                self._segments[simplified_id] = (temporal_type, pieces)
+            simplify[new_id] = simplified_id
+            yield new_id
 
     # ========================================================================
     # Edge generation (positive polarity)
     # ========================================================================
 
-    def _parse_edges_pos(self, phi: STLNode, k: list) -> list[_Edge]:
+    def _parse_edges_pos(self, phi: STLNode, k: list) -> Iterable[_Edge]:
         if phi.node_type == 'predicate':
-            pid = phi.id
-            return [_Edge(pid, pid), _Edge(pid, 'FALSE'), _Edge('FALSE', 'FALSE')]
+            pid = self.table.get((phi.id,))
+            return [(pid, pid), (pid, self._false), (self._false, self._false)]
 
         elif phi.node_type == 'not':
             child_edges = self._parse_edges_neg(phi.children[0], k[1])
-            return [_Edge(f"PosNot_{e.greater}", f"PosNot_{e.smaller}") for e in child_edges]
+            return self._wrap_edges('PosNot', child_edges)
 
         elif phi.node_type == 'and':
-            edges1 = self._parse_edges_pos(phi.children[0], k[1])
-            edges2 = self._parse_edges_pos(phi.children[1], k[2])
-            return [
-                _Edge(f"PosAnd_{e1.greater}{e2.greater}", f"PosAnd_{e1.smaller}{e2.smaller}")
-                for e1 in edges1 for e2 in edges2
-            ]
+            edges1 = list(self._parse_edges_pos(phi.children[0], k[1]))
+            edges2 = list(self._parse_edges_pos(phi.children[1], k[2]))
+            return self._combine_edges('PosAnd', edges1, edges2)
 
         elif phi.node_type == 'or':
-            edges1 = self._parse_edges_pos(phi.children[0], k[1])
-            edges2 = self._parse_edges_pos(phi.children[1], k[2])
-            return [
-                _Edge(f"PosOr_{e1.greater}{e2.greater}", f"PosOr_{e1.smaller}{e2.smaller}")
-                for e1 in edges1 for e2 in edges2
-            ]
+            edges1 = list(self._parse_edges_pos(phi.children[0], k[1]))
+            edges2 = list(self._parse_edges_pos(phi.children[1], k[2]))
+            return self._combine_edges('PosOr', edges1, edges2)
 
         elif phi.node_type == 'always':
             return self._parse_temporal_edges(phi, k, 'PosAlw')
@@ -537,30 +523,24 @@ class Parser:
     # Edge generation (negative polarity)
     # ========================================================================
 
-    def _parse_edges_neg(self, phi: STLNode, k: list) -> list[_Edge]:
+    def _parse_edges_neg(self, phi: STLNode, k: list) -> Iterable[_Edge]:
         if phi.node_type == 'predicate':
-            pid = phi.id
-            return [_Edge(pid, pid), _Edge(pid, 'TRUE'), _Edge('TRUE', 'TRUE')]
+            pid = self.table.get((phi.id,))
+            return [(pid, pid), (pid, self._true), (self._true, self._true)]
 
         elif phi.node_type == 'not':
             child_edges = self._parse_edges_pos(phi.children[0], k[1])
-            return [_Edge(f"NegNot_{e.greater}", f"NegNot_{e.smaller}") for e in child_edges]
+            return self._wrap_edges('NegNot', child_edges)
 
         elif phi.node_type == 'and':
-            edges1 = self._parse_edges_neg(phi.children[0], k[1])
-            edges2 = self._parse_edges_neg(phi.children[1], k[2])
-            return [
-                _Edge(f"NegAnd_{e1.greater}{e2.greater}", f"NegAnd_{e1.smaller}{e2.smaller}")
-                for e1 in edges1 for e2 in edges2
-            ]
+            edges1 = list(self._parse_edges_neg(phi.children[0], k[1]))
+            edges2 = list(self._parse_edges_neg(phi.children[1], k[2]))
+            return self._combine_edges('NegAnd', edges1, edges2)
 
         elif phi.node_type == 'or':
-            edges1 = self._parse_edges_neg(phi.children[0], k[1])
-            edges2 = self._parse_edges_neg(phi.children[1], k[2])
-            return [
-                _Edge(f"NegOr_{e1.greater}{e2.greater}", f"NegOr_{e1.smaller}{e2.smaller}")
-                for e1 in edges1 for e2 in edges2
-            ]
+            edges1 = list(self._parse_edges_neg(phi.children[0], k[1]))
+            edges2 = list(self._parse_edges_neg(phi.children[1], k[2]))
+            return self._combine_edges('NegOr', edges1, edges2)
 
         elif phi.node_type == 'always':
             return self._parse_temporal_edges(phi, k, 'NegAlw')
@@ -571,37 +551,168 @@ class Parser:
         return []
 
     # ========================================================================
-    # Shared temporal edge generation
+    # Shared edge generation
     # ========================================================================
-
-    def _parse_temporal_edges(self, phi: STLNode, k: list, prefix: str) -> list[_Edge]:
+    #
+    # An edge endpoint is looked up (never interned): every endpoint is a
+    # generated formula, and a missing one (None) is skipped by ``parse``.
+
+    def _wrap_edges(self, tag: str, child_edges: Iterable[_Edge]) -> Iterator[_Edge]:
+        get = self.table.get
+        for g, s in child_edges:
+            yield get((tag, g)), get((tag, s))
+
+    def _combine_edges(self, tag: str, edges1: list[_Edge], edges2: list[_Edge]) -> Iterator[_Edge]:
+        get = self.table.get
+        for g1, s1 in edges1:
+            for g2, s2 in edges2:
+                yield get((tag, g1, g2)), get((tag, s1, s2))
+
+    def _parse_temporal_edges(self, phi: STLNode, k: list, prefix: str) -> Iterator[_Edge]:
         """Generate edges for temporal operators via Cartesian product of child edges."""
         k_num = k[0]
 
         # Determine which polarity to use for child edges
         if prefix.startswith('Pos'):
-            child_edges = self._parse_edges_pos(phi.children[0], k[1])
+            child_edges = list(self._parse_edges_pos(phi.children[0], k[1]))
         else:
-            child_edges = self._parse_edges_neg(phi.children[0], k[1])
+            child_edges = list(self._parse_edges_neg(phi.children[0], k[1]))
 
-        # Cartesian product: child_edges^k_num
-        queue = [[e] for e in child_edges]
-        while len(queue[0]) < k_num:
-            new_queue = []
-            for row in queue:
-                for e in child_edges:
-                    new_queue.append(row + [e])
-            queue = new_queue
-
-        result = []
-        for row in queue:
-            id_1 = f"{prefix}_"
-            id_2 = f"{prefix}_"
-            for edge in row:
-                id_1 += edge.greater
-                id_2 += edge.smaller
-            result.append(_Edge(id_1, id_2))
-        return result
+        # Cartesian product child_edges^k_num, one row at a time
+        get = self.table.get
+        head = (prefix,)
+        for row in cartesian_product(child_edges, repeat=max(k_num, 1)):
+            greater, smaller = zip(*row)
+            yield get(head + greater), get(head + smaller)
+
+    # ========================================================================
+    # Cover generation (hasse_edges)
+    # ========================================================================
+    #
+    # The implication edges of a level are the product of the child relations
+    # (each reflexive and transitive), i.e. the product order. Its covering
+    # pairs differ in one coordinate, which steps down one cover of that
+    # child; a predicate has the single cover p -> TRUE (FALSE when positive).
+
+    def _parse_covers(self, phi: STLNode, k: list,
+                      polarity: str) -> tuple[Iterable[int], Iterable[_Edge]]:
+        """Refined formulas of ``phi`` (looked up) and the covers among them."""
+        get = self.table.get
+        if phi.node_type == 'predicate':
+            pid = get((phi.id,))
+            bottom = self._true if polarity == 'Neg' else self._false
+            return [pid, bottom], [(pid, bottom)]
+
+        if phi.node_type == 'not':
+            tag = f"{polarity}Not"
+            flipped = 'Pos' if polarity == 'Neg' else 'Neg'
+            nodes, covers = self._parse_covers(phi.children[0], k[1], flipped)
+            return ((get((tag, p)) for p in nodes),
+                    ((get((tag, g)), get((tag, s))) for g, s in covers))
+
+        if phi.node_type in ('and', 'or'):
+            tag = polarity + ('And' if phi.node_type == 'and' else 'Or')
+            nodes1, covers1 = (list(x) for x in self._parse_covers(phi.children[0], k[1], polarity))
+            nodes2, covers2 = (list(x) for x in self._parse_covers(phi.children[1], k[2], polarity))
+            return ((get((tag, p1, p2)) for p1 in nodes1 for p2 in nodes2),
+                    self._combine_covers(tag, nodes1, covers1, nodes2, covers2))
+
+        if phi.node_type in ('always', 'eventually'):
+            tag = polarity + ('Alw' if phi.node_type == 'always' else 'Ev')
+            nodes, covers = (list(x) for x in self._parse_covers(phi.children[0], k[1], polarity))
+            col_size = max(k[0], 1)
+            return ((get((tag,) + row) for row in cartesian_product(nodes, repeat=col_size)),
+                    self._temporal_covers(tag, nodes, covers, col_size))
+
+        return [], []
+
+    def _combine_covers(self, tag: str, nodes1: list[int], covers1: list[_Edge],
+                        nodes2: list[int], covers2: list[_Edge]) -> Iterator[_Edge]:
+        get = self.table.get
+        for g1, s1 in covers1:
+            for p2 in nodes2:
+                yield get((tag, g1, p2)), get((tag, s1, p2))
+        for p1 in nodes1:
+            for g2, s2 in covers2:
+                yield get((tag, p1, g2)), get((tag, p1, s2))
+
+    def _temporal_covers(self, tag: str, nodes: list[int], covers: list[_Edge],
+                         col_size: int) -> Iterator[_Edge]:
+        get = self.table.get
+        for j in range(col_size):
+            for head in cartesian_product(nodes, repeat=j):
+                head = (tag,) + head
+                for tail in cartesian_product(nodes, repeat=col_size - 1 - j):
+                    for g, s in covers:
+                        yield get(head + (g,) + tail), get(head + (s,) + tail)
+
+    def _connect_covers(self, size: int, position: dict[int, int], covers: Iterable[_Edge]
+                        ) -> tuple[list[list[int]], list[list[int]], Optional[int]]:
+        """
+        Immediate edges of the ``size`` lattice nodes from the product covers.
+
+        Mapped through simplification, the covers span the implication
+        relation (its transitive closure is the edge set ``parse`` would
+        build) but may include shortcuts, which are dropped. TRUE, below every
+        node, is left out of the immediate edges, as in ``set_imme``;
+        ``smaller_imme`` is in ``set_imme``'s peeling order (height above
+        TRUE, then node order).
+
+        Returns:
+            (``smaller_imme`` rows, ``greater_imme`` rows, position of TRUE
+            if it is a node).
+        """
+        simplify = self.simplify_dict
+        bottom = position.get(self._true)
+        below: list[set[int]] = [set() for _ in range(size)]
+        for g, s in covers:
+            gi = position.get(simplify.get(g))
+            si = position.get(simplify.get(s))
+            if gi is not None and si is not None and gi != si and si != bottom:
+                below[gi].add(si)
+
+        # Post-order: every node after all of its candidates.
+        order: list[int] = []
+        done = [False] * size
+        for root in range(size):
+            if done[root]:
+                continue
+            done[root] = True
+            stack = [(root, iter(below[root]))]
+            while stack:
+                node, it = stack[-1]
+                for nxt in it:
+                    if not done[nxt]:
+                        done[nxt] = True
+                        stack.append((nxt, iter(below[nxt])))
+                        break
+                else:
+                    stack.pop()
+                    order.append(node)
+
+        # Strict down-sets as int bitsets; a candidate reachable through
+        # another candidate is a shortcut.
+        reach = [0] * size
+        height = [0] * size
+        imme: list[list[int]] = [[] for _ in range(size)]
+        for i in order:
+            via = 0
+            for j in below[i]:
+                via |= reach[j]
+            row = [j for j in below[i] if not via >> j & 1]
+            reach_i = via
+            for j in row:
+                reach_i |= 1 << j
+                height[i] = max(height[i], height[j] + 1)
+            reach[i] = reach_i
+            imme[i] = sorted(row, key=lambda j: (height[j], j))
+
+        greater_imme: list[list[int]] = [[] for _ in range(size)]
+        for i in range(size):
+            for j in imme[i]:
+                greater_imme[j].append(i)
+
+        return imme, greater_imme, bottom
 
     # ========================================================================
     # Helpers
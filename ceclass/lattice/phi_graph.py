@@ -1,8 +1,111 @@
 from __future__ import annotations
+import heapq
 import random
+from typing import Optional
+
 from ceclass.lattice.phi_node import PhiNode
 
 
+def immediate_edges(smaller: list[list[int]], greater: list[list[int]],
+                    size: Optional[int] = None) -> list[list[int]]:
+    """
+    Immediate smaller nodes of every graph node, as computed by PhiGraph.m set_imme().
+
+    The MATLAB loop repeatedly peels off minima (nodes with one remaining
+    entry in ``smaller_all``, or else none) and links every remaining node
+    ``nn`` above a minimum ``m`` unless some ``sn`` between them is still in
+    ``nn.smaller_all``. A node leaves ``nn.smaller_all`` once it has been
+    peeled, so with ``rank`` the position in peeling order the edge
+    ``nn -> m`` exists iff ``nn`` is peeled in a later round than ``m`` (or
+    never) and no ``sn`` in both ``nn.smaller_all`` and ``m.greater_all``
+    has ``rank(sn) > rank(m)``.
+
+    The peeling order is found by decrementing per-node counters; the edges
+    then come from integer bitsets over rank order, one OR per (node,
+    smaller node) pair instead of nested list scans.
+
+    Args:
+        smaller: ``smaller_all`` of graph nodes 0..n-1, as node indices.
+        greater: ``greater_all`` of graph nodes 0..n-1, as node indices.
+        size: Number of distinct indices; indices >= n are nodes outside
+            the graph, which are never peeled. Defaults to n.
+
+    Returns:
+        For every graph node, its immediate smaller nodes in peeling order
+        (the order the MATLAB loop appends them to ``smaller_imme``).
+    """
+    num_nodes = len(smaller)
+    size = num_nodes if size is None else size
+
+    # 1. Peeling order. above[m]: graph nodes with m in smaller_all.
+    above: list[list[int]] = [[] for _ in range(size)]
+    for i, row in enumerate(smaller):
+        for j in row:
+            above[j].append(i)
+    count = [len(row) for row in smaller]
+    unpeeled = [True] * size
+    remaining = list(range(num_nodes))
+    order: list[int] = []
+    round_start: list[int] = []   # position in order where each round begins
+    peel_round: list[Optional[int]] = [None] * size
+    while True:
+        minima = [i for i in remaining if count[i] == 1]
+        if not minima:
+            minima = [i for i in remaining if count[i] == 0]
+        if not minima:
+            break  # every remaining node has 2+ unpeeled smaller nodes
+        round_start.append(len(order))
+        for m in minima:
+            unpeeled[m] = False
+            peel_round[m] = len(round_start) - 1
+        remaining = [i for i in remaining if unpeeled[i]]
+        for m in minima:
+            order.append(m)
+            for nn in above[m]:
+                if unpeeled[nn]:
+                    count[nn] -= 1
+        if len(remaining) <= 1:
+            break
+
+    # 2. Bit position of every node: peeled nodes by rank, then the rest.
+    position = [0] * size
+    for pos, i in enumerate(order):
+        position[i] = pos
+    rest = len(order)
+    for i in range(size):
+        if unpeeled[i]:
+            position[i] = rest
+            rest += 1
+
+    # below[sn]: peeled m with sn in m.greater_all and rank(m) < rank(sn).
+    below = [0] * size
+    for m in order:
+        bit = 1 << position[m]
+        for sn in greater[m]:
+            if position[sn] > position[m]:
+                below[sn] |= bit
+
+    # 3. nn -> m for peeled m in smaller_all from an earlier round, not covered.
+    result: list[list[int]] = []
+    for nn in range(num_nodes):
+        r = peel_round[nn]
+        limit = len(order) if r is None else round_start[r]
+        candidates = 0
+        covered = 0
+        for sn in smaller[nn]:
+            if position[sn] < limit:
+                candidates |= 1 << position[sn]
+            covered |= below[sn]
+        edges = candidates & ~covered
+        row = []
+        while edges:
+            low = edges & -edges
+            row.append(order[low.bit_length() - 1])
+            edges ^= low
+        result.append(row)
+    return result
+
+
 class PhiGraph:
     """
     Directed acyclic graph of refined STL formulas.
@@ -11,13 +114,39 @@ class PhiGraph:
     "if greater holds, then smaller must hold".
 
     Supports pruning operations for classification algorithms.
+
+    Attributes:
+        transitive: Whether ``smaller_all`` / ``greater_all`` hold the
+            implication closure. A lattice built from product covers
+            (``Parser(hasse_edges=True)``) keeps only the immediate edges;
+            ``below`` / ``above`` derive the rest.
+        bottom: With ``transitive`` off, the node below every other one
+            that the immediate edges leave out (TRUE), if any.
     """
 
     def __init__(self, nodes: list[PhiNode]):
         self.nodes = nodes
         self.maxima: list[PhiNode] = []
+        self.transitive = True
+        self.bottom: Optional[PhiNode] = None
         self._val_longest_path = 0
         self._seq_longest_path: list[PhiNode] = []
+        # Every write to ``node.active`` is reported to ``_active_changed``.
+        self._num_active = 0
+        for nd in nodes:
+            nd._graph = self
+            self._num_active += nd.active
+        # Active-maxima state (see ``_track_parents``), indexed like ``nodes``.
+        self._index: Optional[dict[int, int]] = None
+        self._children: list[list[int]] = []
+        self._active_parents: list[int] = []
+        self._roots: set[int] = set()
+        # Longest-path DP state (see ``_update_depths``), keyed by id(node).
+        self._order: Optional[list[PhiNode]] = None
+        self._rank: dict[int, int] = {}
+        self._parents: dict[int, list[PhiNode]] = {}
+        self._depth: dict[int, int] = {}
+        self._depth_changed: Optional[list[PhiNode]] = None
 
     # --- Graph construction ---
 
@@ -25,60 +154,24 @@ class PhiGraph:
         """
         Compute immediate (transitive reduction) edges from transitive closure.
 
-        Port of PhiGraph.m set_imme(). Works by iteratively processing minima
-        (nodes with only self in smaller_all) and establishing immediate edges.
+        Port of PhiGraph.m set_imme(); see ``immediate_edges`` for the
+        semantics. Edges are appended in the order the MATLAB loop adds them.
         """
-        t_nodes = list(self.nodes)
-
-        # Save original smaller_all for restoration
-        saved_smaller_all = [list(nd.smaller_all) for nd in self.nodes]
-
-        while True:
-            # Find minima: nodes whose smaller_all has exactly 1 entry (themselves)
-            minima = []
-            min_idx = []
-            for i, nd in enumerate(t_nodes):
-                if len(nd.smaller_all) == 1:
-                    minima.append(nd)
-                    min_idx.append(i)
-
-            # If no minima found among remaining nodes with smaller_all == 1,
-            # also check for nodes with empty smaller_all (leaf nodes)
-            if not minima:
-                for i, nd in enumerate(t_nodes):
-                    if len(nd.smaller_all) == 0:
-                        minima.append(nd)
-                        min_idx.append(i)
-
-            # Remove minima from working set (in reverse order to preserve indices)
-            for idx in sorted(min_idx, reverse=True):
-                t_nodes.pop(idx)
-
-            # For each minimum, check which remaining nodes should have it as immediate child
-            for m in minima:
-                for nn in t_nodes:
-                    if m in nn.smaller_all:
-                        # Check if there's an intermediate node between nn and m
-                        flag = False
-                        for sn in nn.smaller_all:
-                            if sn is not nn and sn is not m and sn in m.greater_all:
-                                flag = True
-                                break
-
-                        if not flag:
-                            nn.add_to_smaller_imme(m)
-                            m.add_to_greater_imme(nn)
-
-                        # Remove m from nn.smaller_all
-                        if m in nn.smaller_all:
-                            nn.smaller_all.remove(m)
-
-            if len(t_nodes) <= 1:
-                break
-
-        # Restore original smaller_all
-        for i, nd in enumerate(self.nodes):
-            nd.smaller_all = saved_smaller_all[i]
+        nodes = self.nodes
+        index: dict[PhiNode, int] = {}
+        for nd in nodes:
+            index.setdefault(nd, len(index))
+        # Nodes referenced by the edge lists but not in the graph are never peeled.
+        smaller = [[index.setdefault(s, len(index)) for s in nd.smaller_all] for nd in nodes]
+        greater = [[index.setdefault(g, len(index)) for g in nd.greater_all] for nd in nodes]
+
+        by_index = {i: nd for nd, i in index.items()}
+        for nd, row in zip(nodes, immediate_edges(smaller, greater, len(index))):
+            for m in row:
+                nd.add_to_smaller_imme(by_index[m])
+                by_index[m].add_to_greater_imme(nd)
+        self._index = None
+        self._order = None
 
     def set_maxima(self):
         """Find root nodes (no immediate ancestors)."""
@@ -86,37 +179,188 @@ class PhiGraph:
 
     def set_active_maxima(self):
         """Recompute maxima among active nodes only."""
-        self.maxima = []
-        for n in self.nodes:
-            if n.active:
-                has_active_ancestor = any(gi.active for gi in n.greater_imme)
-                if not has_active_ancestor:
-                    self.maxima.append(n)
+        self._track_parents()
+        self._publish_maxima()
+
+    def _track_parents(self):
+        """
+        Count the active ``greater_imme`` parents of every node.
+
+        From then on ``_active_changed`` keeps the counters, and the set of
+        active nodes without active parents (the active maxima), up to date.
+        """
+        nodes = self.nodes
+        index = {id(nd): i for i, nd in enumerate(nodes)}
+        children: list[list[int]] = [[] for _ in nodes]
+        counts = [0] * len(nodes)
+        for i, nd in enumerate(nodes):
+            for g in nd.greater_imme:
+                j = index.get(id(g))
+                if j is not None:
+                    children[j].append(i)
+                if g.active:
+                    counts[i] += 1
+        self._index = index
+        self._children = children
+        self._active_parents = counts
+        self._roots = {i for i, nd in enumerate(nodes) if nd.active and counts[i] == 0}
+        self._num_active = sum(nd.active for nd in nodes)
+
+    def _publish_maxima(self):
+        nodes = self.nodes
+        self.maxima = [nodes[i] for i in sorted(self._roots)]
+
+    def _active_changed(self, node: PhiNode):
+        """Bookkeeping for one flip of ``node.active`` (called by ``PhiNode``)."""
+        delta = 1 if node.active else -1
+        self._num_active += delta
+        if self._depth_changed is not None:
+            self._depth_changed.append(node)
+        if self._index is None:
+            return
+        i = self._index.get(id(node))
+        if i is None:
+            return
+        nodes, counts, roots = self.nodes, self._active_parents, self._roots
+        for j in self._children[i]:
+            counts[j] += delta
+            if nodes[j].active and counts[j] == 0:
+                roots.add(j)
+            else:
+                roots.discard(j)
+        if node.active and counts[i] == 0:
+            roots.add(i)
+        else:
+            roots.discard(i)
+
+    # --- Comparabilities ---
+
+    def below(self, node: PhiNode) -> list[PhiNode]:
+        """Nodes strictly below ``node`` (``node.smaller_all`` when ``transitive``)."""
+        if self.transitive:
+            return node.smaller_all
+        return self._reach(node, 'smaller_imme', node is not self.bottom)
+
+    def above(self, node: PhiNode) -> list[PhiNode]:
+        """Nodes strictly above ``node`` (``node.greater_all`` when ``transitive``)."""
+        if self.transitive:
+            return node.greater_all
+        if node is self.bottom:
+            return [nd for nd in self.nodes if nd is not node]
+        return self._reach(node, 'greater_imme', False)
+
+    def _reach(self, node: PhiNode, attr: str, with_bottom: bool) -> list[PhiNode]:
+        """Nodes reached from ``node`` through ``attr`` edges, first reached first."""
+        seen = {id(node)}
+        out: list[PhiNode] = []
+        stack = [node]
+        while stack:
+            for nxt in getattr(stack.pop(), attr):
+                if id(nxt) not in seen:
+                    seen.add(id(nxt))
+                    out.append(nxt)
+                    stack.append(nxt)
+        if with_bottom and self.bottom is not None and id(self.bottom) not in seen:
+            out.append(self.bottom)
+        return out
 
     # --- Path finding ---
 
     def get_longest_path(self) -> tuple[list[PhiNode], int]:
-        """Find longest path in DAG via DFS from maxima. Returns (path, length)."""
+        """
+        Longest active path from the maxima. Returns (path, length).
+
+        ``depth`` (nodes on the longest active chain down from a node) is a
+        DP over ``smaller_imme`` that is kept between calls and only updated
+        above nodes whose ``active`` flag changed. Among paths of maximal
+        length the first in DFS order is returned (maxima in order, then
+        children in ``smaller_imme`` order), as the recursive search of
+        PhiGraph.m did: start at the first maximum of full depth and always
+        step to the first child that still reaches it.
+        """
+        depth = self._update_depths()
         self._val_longest_path = 0
         self._seq_longest_path = []
 
-        if self.maxima:
-            for cur in self.maxima:
-                if cur.active:
-                    self._dfs([cur], cur, 1)
+        starts = [m for m in self.maxima if m.active]
+        if starts:
+            length = max(depth[id(m)] for m in starts)
+            cur = next(m for m in starts if depth[id(m)] == length)
+            path = [cur]
+            for remaining in range(length - 1, 0, -1):
+                cur = next(s for s in cur.smaller_imme if depth[id(s)] == remaining)
+                path.append(cur)
+            self._val_longest_path = length
+            self._seq_longest_path = path
 
         return self._seq_longest_path, self._val_longest_path
 
-    def _dfs(self, seq: list[PhiNode], node: PhiNode, val: int):
-        """DFS helper for longest path computation."""
-        if node.active:
-            if val > self._val_longest_path:
-                self._val_longest_path = val
-                self._seq_longest_path = list(seq)
+    def _topological_order(self):
+        """Order every node reachable through ``smaller_imme`` children first."""
+        order: list[PhiNode] = []
+        parents: dict[int, list[PhiNode]] = {}
+        seen: set[int] = set()
+        for root in self.nodes:
+            if id(root) in seen:
+                continue
+            seen.add(id(root))
+            stack = [(root, iter(root.smaller_imme))]
+            while stack:
+                node, children = stack[-1]
+                for child in children:
+                    parents.setdefault(id(child), []).append(node)
+                    if id(child) not in seen:
+                        seen.add(id(child))
+                        stack.append((child, iter(child.smaller_imme)))
+                        break
+                else:
+                    stack.pop()
+                    order.append(node)
+        self._order = order
+        self._rank = {id(nd): r for r, nd in enumerate(order)}
+        self._parents = parents
+        self._depth = {}
+        self._depth_changed = None
+
+    def _update_depths(self) -> dict[int, int]:
+        """
+        Active depth of every node, keyed by id(node).
 
-            for s in node.smaller_imme:
-                if s.active:
-                    self._dfs(seq + [s], s, val + 1)
+        The first call (or the first after ``set_imme``) fills the DP in
+        topological order. Later calls take the nodes whose ``active`` flag
+        changed since the last call (``eliminate_hold`` / ``eliminate_unhold``
+        only touch a cone of the lattice) and recompute the ancestors of
+        those nodes lowest rank first, stopping wherever a depth is unchanged.
+        """
+        if self._order is None:
+            self._topological_order()
+        order, depth = self._order, self._depth
+
+        if self._depth_changed is None:
+            for nd in order:
+                depth[id(nd)] = 1 + max((depth[id(s)] for s in nd.smaller_imme), default=0) \
+                    if nd.active else 0
+            self._depth_changed = []
+            return depth
+
+        rank, parents = self._rank, self._parents
+        queued = {rank[id(nd)] for nd in self._depth_changed if id(nd) in rank}
+        self._depth_changed.clear()
+        heap = list(queued)
+        heapq.heapify(heap)
+        while heap:
+            nd = order[heapq.heappop(heap)]
+            value = 1 + max((depth[id(s)] for s in nd.smaller_imme), default=0) \
+                if nd.active else 0
+            if value == depth[id(nd)]:
+                continue
+            depth[id(nd)] = value
+            for parent in parents.get(id(nd), ()):
+                r = rank[id(parent)]
+                if r not in queued:
+                    queued.add(r)
+                    heapq.heappush(heap, r)
+        return depth
 
     def get_random_path(self) -> tuple[list[PhiNode], int]:
         """Random walk from maxima downward. Returns (path, length)."""
@@ -144,11 +388,18 @@ class PhiGraph:
         formulas must also be satisfied.
         """
         if node.active:
+            if self._index is None:
+                self._track_parents()
             node.active = False
             node.add_to_results(witness)
-            for g in node.greater_imme:
-                self.eliminate_hold(g, witness)
-            self.set_active_maxima()
+            stack = [node]
+            while stack:
+                for g in stack.pop().greater_imme:
+                    if g.active:
+                        g.active = False
+                        g.add_to_results(witness)
+                        stack.append(g)
+            self._publish_maxima()
 
     def eliminate_unhold(self, node: PhiNode):
         """
@@ -159,14 +410,18 @@ class PhiGraph:
         """
         if node.active:
             node.active = False
-            for s in node.smaller_imme:
-                self.eliminate_unhold(s)
+            stack = [node]
+            while stack:
+                for s in stack.pop().smaller_imme:
+                    if s.active:
+                        s.active = False
+                        stack.append(s)
 
     # --- Query ---
 
     def is_empty(self) -> bool:
         """Check if any active nodes remain."""
-        return not any(n.active for n in self.nodes)
+        return self._num_active == 0
 
     def get_active_nodes(self) -> list[PhiNode]:
         """Return all currently active nodes."""
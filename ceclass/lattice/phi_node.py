@@ -11,6 +11,9 @@ class PhiNode:
 
     Each node represents a refined STL formula. Edges represent logical
     implication: if A is in greater_all of B, then A holding implies B holds.
+
+    Writes to ``active`` are reported to the ``PhiGraph`` the node belongs
+    to, which keeps its active count and maxima up to date.
     """
 
     formula: STLNode
@@ -44,6 +47,13 @@ class PhiNode:
     def add_to_results(self, result: Any):
         self.results.append(result)
 
+    def __setattr__(self, name: str, value: Any):
+        graph = self.__dict__.get('_graph') if name == 'active' else None
+        changed = graph is not None and bool(value) != self.active
+        object.__setattr__(self, name, value)
+        if changed:
+            graph._active_changed(self)
+
     def __hash__(self) -> int:
         return hash(self.formula.id)
 
@@ -0,0 +1,192 @@
+"""
+Root product of a ``Parser``, built across worker processes.
+
+The lattice gets big at the root: the pairs of an AND/OR's two child lists,
+or the ``child^k`` rows of a temporal operator, and the same product over
+the child edge lists. Children are parsed in the parent. Each worker is a
+copy of the parser taken after that (inherited by fork, pickled under
+spawn), and builds contiguous slices of the product, split on the first
+coordinate.
+
+Simplified formulas go back as table keys in first-seen order. Edges go back
+as node positions, deduplicated within the slice. The parent interns the keys
+and merges the slices in order, so the lattice is the sequential one, node
+order and edge order included.
+"""
+from __future__ import annotations
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import product as cartesian_product
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+# Slices per worker, for load balance.
+_SLICES_PER_WORKER = 4
+
+# Per-worker state, set up by ``_init_worker``.
+_parser = None
+_root: Optional[RootProduct] = None
+_positions: Optional[dict] = None
+
+Exported = Union[int, tuple]
+
+
+@dataclass
+class RootProduct:
+    """
+    Factors of the root product, as parsed in the parent.
+
+    Attributes:
+        op: ``'and'`` / ``'or'`` for a binary root, ``'always'`` /
+            ``'eventually'`` for a temporal one.
+        tag: Table tag of the root (``'NegAnd'``, ``'NegAlw'``, ...).
+        nodes: Refined formula IDs of each factor (one list per child, or
+            the child list once for a temporal root).
+        edges: Implication edges of each factor, likewise.
+        repeat: Number of factors of a temporal root (segments).
+        intervals: Segment intervals of a temporal root.
+        base: Table size when the workers start; IDs below it are shared.
+    """
+    op: str
+    tag: str
+    nodes: list[list[int]]
+    edges: list[list[tuple[int, int]]]
+    repeat: int = 2
+    intervals: Optional[list[tuple]] = None
+    base: int = 0
+
+    @property
+    def temporal(self) -> bool:
+        return self.op in ('always', 'eventually')
+
+    def rows(self, factors: list[list], start: int, stop: int) -> Iterator[tuple]:
+        """Product of ``factors`` whose first coordinate is in ``[start, stop)``."""
+        if self.temporal:
+            factors = [factors[0]] * self.repeat
+        rest = factors[1:]
+        for first in factors[0][start:stop]:
+            for tail in cartesian_product(*rest):
+                yield (first,) + tail
+
+
+def root_product(parser) -> Optional[RootProduct]:
+    """Parse the children of ``parser``'s root, or None if it is no product."""
+    phi, k = parser.formula, parser.k
+    if phi.node_type in ('and', 'or') and len(phi.children) == 2:
+        children = [(phi.children[0], k[1]), (phi.children[1], k[2])]
+        tag = 'NegAnd' if phi.node_type == 'and' else 'NegOr'
+        root = RootProduct(phi.node_type, tag,
+                           [list(parser._parse_nodes_neg(c, ck)) for c, ck in children],
+                           [list(parser._parse_edges_neg(c, ck)) for c, ck in children])
+    elif phi.node_type in ('always', 'eventually'):
+        child, ck = phi.children[0], k[1]
+        nodes = list(parser._parse_nodes_neg(child, ck))
+        tag, intervals = parser._temporal_segments(phi, k, phi.node_type, 'Neg')
+        root = RootProduct(phi.node_type, tag, [nodes], [list(parser._parse_edges_neg(child, ck))],
+                           repeat=len(intervals), intervals=intervals)
+    else:
+        return None
+    root.base = len(parser.table)
+    return root
+
+
+def _init_worker(parser, root: RootProduct, positions: Optional[dict]) -> None:
+    global _parser, _root, _positions
+    _parser, _root, _positions = parser, root, positions
+
+
+def _simplified(row: tuple) -> int:
+    """Simplified ID of the root formula with operands ``row``, in the worker."""
+    parser, root = _parser, _root
+    if root.temporal:
+        fid = next(parser._build_temporal_nodes([row], root.tag, root.op, root.intervals))
+    else:
+        fid = next(parser._combine_binary(root.tag, root.op, [row[0]], [row[1]]))
+    return parser.simplify_dict[fid]
+
+
+def _export(simp: int) -> Exported:
+    return simp if simp < _root.base else _parser.table.key(simp)
+
+
+def _node_slice(start: int, stop: int) -> list[tuple[Exported, Optional[tuple]]]:
+    """Simplified formulas of a slice, first seen first, with their segments."""
+    seen: dict[int, None] = {}
+    for row in _root.rows(_root.nodes, start, stop):
+        seen.setdefault(_simplified(row), None)
+    return [(_export(simp), _parser._segments.get(simp) if simp >= _root.base else None)
+            for simp in seen]
+
+
+def _edge_slice(start: int, stop: int) -> np.ndarray:
+    """(greater, smaller) node positions of a slice's edges, first seen first."""
+    memo: dict[tuple, int] = {}
+
+    def position(row: tuple) -> int:
+        pos = memo.get(row)
+        if pos is None:
+            pos = memo[row] = _positions[_export(_simplified(row))]
+        return pos
+
+    seen: set[tuple[int, int]] = set()
+    out: list[tuple[int, int]] = []
+    for row in _root.rows(_root.edges, start, stop):
+        greater, smaller = zip(*row)
+        if None in greater or None in smaller:
+            continue  # Not a generated formula (see Parser._wrap_edges)
+        edge = position(greater), position(smaller)
+        if edge[0] != edge[1] and edge not in seen:
+            seen.add(edge)
+            out.append(edge)
+    return np.array(out, dtype=np.int64).reshape(-1, 2)
+
+
+def _slices(length: int, workers: int) -> list[tuple[int, int]]:
+    count = max(1, min(length, workers * _SLICES_PER_WORKER))
+    bounds = np.linspace(0, length, count + 1).astype(int).tolist()
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _run(parser, root: RootProduct, positions: Optional[dict], workers: int,
+         task, length: int) -> list:
+    context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+    slices = _slices(length, workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(parser, root, positions)) as pool:
+        return list(pool.map(task, *zip(*slices)))
+
+
+def parse_root(parser, workers: int) -> Optional[tuple[list[int], list[tuple[int, int]]]]:
+    """
+    Nodes and edges of ``parser``'s lattice, with the root product in ``workers`` processes.
+
+    Returns:
+        (simplified IDs in first-seen order, (greater, smaller) position
+        pairs in first-seen order without self loops), or None when the
+        root is not an AND/OR or temporal product.
+    """
+    root = root_product(parser)
+    if root is None:
+        return None
+    table = parser.table
+
+    simp_ids: dict[int, int] = {}
+    for part in _run(parser, root, None, workers, _node_slice, len(root.nodes[0])):
+        for item, segments in part:
+            simp = item if isinstance(item, int) else table.intern(item)
+            if segments is not None:
+                parser._segments[simp] = segments
+            simp_ids.setdefault(simp, len(simp_ids))
+
+    positions = {(s if s < root.base else table.key(s)): i for s, i in simp_ids.items()}
+    seen: set[tuple[int, int]] = set()
+    edges: list[tuple[int, int]] = []
+    for part in _run(parser, root, positions, workers, _edge_slice, len(root.edges[0])):
+        for edge in map(tuple, part.tolist()):
+            if edge not in seen:
+                seen.add(edge)
+                edges.append(edge)
+    return list(simp_ids), edges
@@ -3,3 +3,5 @@ from ceclass.strategies.no_prune import NoPruneClassifier
 from ceclass.strategies.alw_mid import AlwMidClassifier
 from ceclass.strategies.bs_random import BSRandomClassifier
 from ceclass.strategies.long_bs import LongBSClassifier
+from ceclass.strategies.chain_bs import ChainBSClassifier
+from ceclass.strategies.factored import FactoredClassifier
@@ -20,6 +20,8 @@ class AlwMidClassifier(BaseClassifier):
     Port of MyClassProblemAlwMid.m.
     """
 
+    supports_lazy_graph = True
+
     def solve(self) -> ClassificationResult:
         t_start = time.time()
 
@@ -1,30 +1,55 @@
 from __future__ import annotations
+import os
 import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Optional, Sequence
+from typing import Optional, Sequence, Union
 
 import torch
 
 from ceclass.formula.stl_node import STLNode
-from ceclass.formula.converter import to_stlcgpp
+from ceclass.formula.predicate_store import PredicateStore
+from ceclass.formula.signal_cache import SignalCache
+from ceclass.formula.template import FormulaTemplate
+from ceclass.lattice.cache import LatticeCache
+from ceclass.lattice.canonical import CanonicalForms
+from ceclass.lattice.lazy_graph import LazyGraph
 from ceclass.lattice.phi_graph import PhiGraph
 from ceclass.lattice.phi_node import PhiNode
 from ceclass.lattice.parser import Parser
 from ceclass.synthesis.param_synth import ParamSynthesis, SynthResult
-from ceclass.utils.stl_eval import min_rob0_vmap
+from ceclass.synthesis.exact_synth import ExactSynthesis
+from ceclass.utils.shard_pool import ProcessShardPool
+from ceclass.utils.stl_eval import crop_to_horizon, max_rob0_batch
+
+# Formulas compiled into one batched non-parametric evaluation.
+_MAX_BATCH_NODES = 256
+# Largest lazy product enumerated for ``num_classes`` / ``num_covered``.
+_MAX_LAZY_TERMS = 1 << 16
 
 
 @dataclass
 class ClassificationResult:
-    """Results of a classification run."""
-    num_classes: int         # Total refined formulas in lattice
-    num_covered: int         # Formulas with identified counterexamples
+    """
+    Results of a classification run.
+
+    With ``lazy_graph``, ``num_classes`` / ``num_covered`` are counted by
+    enumerating the product (None above ``_MAX_LAZY_TERMS`` terms), the
+    node lists only hold nodes that were built, and the ``num_terms``,
+    ``num_built`` and ``num_covered_generators`` fields describe the search.
+    """
+    num_classes: Optional[int]   # Total refined formulas in lattice
+    num_covered: Optional[int]   # Formulas with identified counterexamples
     time_split: float        # Time for parsing/lattice construction
     time_class: float        # Time for classification loop
     time_total: float        # Total time
     num_synth_calls: int     # Number of synthesis/robustness evaluations
     covered_nodes: list[PhiNode] = field(default_factory=list)
+    refuted_nodes: list[PhiNode] = field(default_factory=list)  # Shown to have none
+    # Lazy runs only (None otherwise).
+    num_terms: Optional[int] = None               # Product size, before simplification
+    num_built: Optional[int] = None               # Lattice nodes built
+    num_covered_generators: Optional[int] = None  # Minimal covered terms
 
 
 class BaseClassifier(ABC):
@@ -37,6 +62,9 @@ class BaseClassifier(ABC):
     - Different node selection and pruning strategies (implemented in solve())
     """
 
+    # Whether solve() only walks paths (and so can run on a LazyGraph).
+    supports_lazy_graph = False
+
     def __init__(
         self,
         formula: STLNode,
@@ -47,6 +75,16 @@ class BaseClassifier(ABC):
         max_time_per_node: float = 60.0,
         max_evals_per_node: int = 500,
         eval_devices: Optional[Sequence[torch.device]] = None,
+        synth_mode: str = 'cmaes',
+        witness_values: bool = True,
+        eval_workers: Optional[int] = None,
+        compact_graph: bool = False,
+        lattice_cache: Union[None, str, os.PathLike, LatticeCache] = None,
+        hasse_edges: bool = False,
+        canonical: bool = False,
+        parse_workers: Optional[int] = None,
+        previous: Optional[ClassificationResult] = None,
+        lazy_graph: bool = False,
     ):
         """
         Args:
@@ -59,22 +97,83 @@ class BaseClassifier(ABC):
             max_evals_per_node: Max CMA-ES evaluations per node.
             eval_devices: Robustness vmap devices (``None`` → use both CUDA GPUs
                 when available, else ``device``). Pass ``(device,)`` for single GPU.
+            synth_mode: ``'cmaes'`` or ``'exact'`` (enumerate the discrete
+                split-point grid; CMA-ES only when the grid is too large).
+            witness_values: Compute the min robustness (``obj_best``) of covered
+                non-parametric nodes. Verdicts always come from sign-only
+                evaluation; with this off, their ``obj_best`` is NaN.
+            eval_workers: Shard the traces across this many CPU worker processes
+                (``ProcessShardPool``) instead of ``eval_devices``. Call
+                ``close()`` to stop the workers.
+            compact_graph: Run on an array-backed ``CompactGraph`` instead of
+                a ``PhiGraph`` (``Parser.parse_compact``).
+            lattice_cache: Directory (or ``LatticeCache``) to load the parsed
+                lattice from, and store it in on a miss.
+            hasse_edges: Parse with ``Parser(hasse_edges=True)``: immediate
+                edges from the product covers, without the full implication
+                relation. Same lattice.
+            canonical: Parse with ``Parser(canonical=True)``: refinements with
+                the same canonical form (``CanonicalForms``) are one node and
+                take one test.
+            parse_workers: Build the root product of the lattice in this many
+                worker processes (``Parser(workers=...)``). Same lattice.
+            previous: Result of an earlier run on the same traces (e.g. with
+                k - 1) to pre-prune the lattice with, see ``reuse``.
+            lazy_graph: Explore the root product on demand (``LazyGraph``)
+                instead of parsing the whole lattice. Path-based strategies
+                only, without the lattice options above or ``previous``.
+                ``num_classes`` is None until ``solve``, and
+                ``covered_nodes`` holds the nodes found covered, not the
+                nodes implied above them (see ``ClassificationResult``).
         """
+        if synth_mode not in ('cmaes', 'exact'):
+            raise ValueError(f"Unknown synth_mode: {synth_mode}")
+        if lazy_graph and not self.supports_lazy_graph:
+            raise ValueError(f"{type(self).__name__} needs the whole lattice, not lazy_graph")
+        if lazy_graph and (compact_graph or lattice_cache is not None or canonical
+                           or hasse_edges or parse_workers):
+            raise ValueError("lazy_graph builds no lattice to compact, cache, merge "
+                             "or parse in parallel")
+        if lazy_graph and previous is not None:
+            raise ValueError("lazy_graph has no nodes to pre-prune with previous")
         self.traces = traces
         self.device = device
         self.dt = dt
         self.max_time_per_node = max_time_per_node
         self.max_evals_per_node = max_evals_per_node
         self.eval_devices = eval_devices
+        self.synth_mode = synth_mode
+        self.witness_values = witness_values
 
         # Parse formula into refinement lattice
         t_start = time.time()
-        self.parser = Parser(formula, k)
-        self.graph = self.parser.parse()
+        self.parser = Parser(formula, k, hasse_edges=hasse_edges, canonical=canonical,
+                             workers=parse_workers)
+        if lazy_graph:
+            self.graph = LazyGraph(self.parser)
+        elif lattice_cache is None:
+            self.graph = self.parser.parse_compact() if compact_graph else self.parser.parse()
+        else:
+            if not isinstance(lattice_cache, LatticeCache):
+                lattice_cache = LatticeCache(lattice_cache)
+            self.graph = lattice_cache.parse(self.parser)
+            if compact_graph:
+                self.graph = self.parser.compact()
         self.time_split = time.time() - t_start
 
-        self.num_classes = len(self.graph.nodes)
+        self.num_classes = None if lazy_graph else len(self.graph.nodes)
         self._num_synth_calls = 0
+        # Nodes found to have no counterexample (by test or by reuse).
+        self._refuted: list[PhiNode] = []
+        self.num_reused = self.reuse(previous) if previous is not None else 0
+        # Signals of parameter-free subformulas, shared by every node test.
+        self.signal_cache = SignalCache()
+        # Predicate robustness over the whole trace set, computed once per run.
+        self.predicate_store = PredicateStore()
+        # CPU worker processes for trace sharding, if requested.
+        self.shard_pool = ProcessShardPool(eval_workers) if eval_workers else None
+        # Non-parametric verdicts computed ahead of their _test_node call, by formula id.
+        self._prefetched: dict[str, tuple[bool, SynthResult]] = {}
 
     @abstractmethod
     def solve(self) -> ClassificationResult:
@@ -88,62 +187,210 @@ class BaseClassifier(ABC):
         Returns:
             (satisfied, synth_result): satisfied=True if counterexample exists.
         """
+        return self._record(node, self._synthesize(node))
+
+    def _record(self, node: PhiNode,
+                verdict: tuple[bool, Optional[SynthResult]]) -> tuple[bool, Optional[SynthResult]]:
+        """Count a node test and note a refuted node. Returns ``verdict``."""
         self._num_synth_calls += 1
+        if not verdict[0]:
+            self._refuted.append(node)
+        return verdict
+
+    def _synthesize(self, node: PhiNode,
+                    max_time: Optional[float] = None) -> tuple[bool, Optional[SynthResult]]:
+        """
+        Verdict of ``node``, without recording it.
+
+        Safe to call from worker threads: the caches and the shard pool
+        are locked, and the graph is not touched. ``max_time`` overrides
+        ``max_time_per_node`` for a CMA-ES search.
+        """
         param_names = node.formula.get_param_names()
         param_bounds = self.parser.get_param_bounds_for_node(node)
 
         if not param_names:
-            # No parametric intervals — direct robustness check.
-            # A node is "satisfied" (covered) if any input trace violates the formula
-            # (robustness of phi < 0 for at least one trace). This matches the paper's
-            # semantics: each counterexample trace is tested individually and a node is
-            # covered if ANY trace falsifies it.
-            #
-            # IMPORTANT: torch.vmap(stl_formula)(traces) returns shape (num_traces, T)
-            # where rob[:, 0] is the global robustness at t=0.  Using rob.min() would
-            # pick up the -1e9 out-of-bounds sentinel stlcgpp emits for time windows
-            # that extend past the trace, causing false positives for any formula whose
-            # interval reaches the trace boundary.
+            # No parametric intervals — direct robustness check (see
+            # evaluate_nonparametric), unless a batched pass already decided it.
+            verdict = self._prefetched.pop(node.formula.id, None)
+            if verdict is None:
+                verdict = self.evaluate_nonparametric([node])[0]
+        else:
+            # CMA-ES (or exact grid) parameter synthesis
+            synth_cls = ExactSynthesis if self.synth_mode == 'exact' else ParamSynthesis
+            synth = synth_cls(
+                formula=node.formula,
+                traces=self.traces,
+                param_names=param_names,
+                param_bounds=param_bounds,
+                device=self.device,
+                dt=self.dt,
+                max_time=self.max_time_per_node if max_time is None else max_time,
+                max_evals=self.max_evals_per_node,
+                eval_devices=self.eval_devices,
+                signal_cache=self.signal_cache,
+                predicate_store=self.predicate_store,
+                shard_pool=self.shard_pool,
+            )
+            result = synth.solve()
+            verdict = result.satisfied, result
+        return verdict
+
+    def reuse(self, previous: ClassificationResult) -> int:
+        """
+        Pre-prune the lattice with the verdicts of an earlier run.
+
+        ``previous`` must come from the same traces, typically with k - 1.
+        Nodes are matched by canonical form (``CanonicalForms``): the
+        (k+1)-refinements that only split a k-segment in two describe the
+        same formulas as that segment. A node matching a covered node gets
+        its witness, and so does everything above it (``eliminate_hold``).
+        A node matching a refuted node is pruned with everything below it
+        (``eliminate_unhold``). Witness parameters keep the names of the
+        earlier formula.
+
+        Returns:
+            Number of nodes matched.
+        """
+        forms = CanonicalForms()
+        covered = {}
+        for n in previous.covered_nodes:
+            covered.setdefault(forms.key(n.formula), n.results[0])
+        refuted = {forms.key(n.formula) for n in previous.refuted_nodes}
+
+        matched = 0
+        for node in self.graph.nodes:
+            key = forms.key(node.formula)
+            if key in covered:
+                matched += 1
+                if not node.results:
+                    self.graph.eliminate_hold(node, covered[key])
+            elif key in refuted:
+                matched += 1
+                self._refuted.append(node)
+                self.graph.eliminate_unhold(node)
+        return matched
+
+    def evaluate_nonparametric(
+        self, nodes: Sequence[PhiNode],
+    ) -> list[tuple[bool, SynthResult]]:
+        """
+        Test a set of non-parametric nodes together, in one pass over the traces.
+
+        A node is "satisfied" (covered) if any input trace violates its formula
+        (robustness of phi < 0 at t=0 for at least one trace). This matches the
+        paper's semantics: each counterexample trace is tested individually and a
+        node is covered if ANY trace falsifies it.
+
+        All formulas are compiled into one ``FormulaTemplate``, so subtrees they
+        share are evaluated once, and the verdicts come from sign-only evaluation
+        (exact at rho == 0, see ``ceclass.formula.boolean``) with a single host
+        sync per batch. With ``witness_values``, the min robustness of covered
+        nodes is computed in a second batched pass. Does not count towards
+        ``num_synth_calls``; ``_test_node`` does.
+
+        Args:
+            nodes: Nodes whose formulas have no symbolic parameters.
+
+        Returns:
+            One (satisfied, synth_result) pair per node, in order.
+        """
+        results = []
+        for first in range(0, len(nodes), _MAX_BATCH_NODES):
+            batch = nodes[first:first + _MAX_BATCH_NODES]
             try:
-                min_rob = min_rob0_vmap(
-                    lambda d: to_stlcgpp(node.formula, {}, d, self.dt),
-                    self.traces,
-                    self.device,
-                    eval_devices=self.eval_devices,
-                )
-                result = SynthResult(
-                    satisfied=min_rob < 0,
-                    obj_best=min_rob,
-                    num_evals=1,
-                )
-                return min_rob < 0, result
+                results.extend(self._evaluate_batch([n.formula for n in batch]))
             except Exception:
-                return False, SynthResult(satisfied=False, obj_best=1e9)
-
-        # CMA-ES parameter synthesis
-        synth = ParamSynthesis(
-            formula=node.formula,
-            traces=self.traces,
-            param_names=param_names,
-            param_bounds=param_bounds,
-            device=self.device,
-            dt=self.dt,
-            max_time=self.max_time_per_node,
-            max_evals=self.max_evals_per_node,
-            eval_devices=self.eval_devices,
-        )
-        result = synth.solve()
-        return result.satisfied, result
+                if len(batch) == 1:
+                    results.append((False, SynthResult(satisfied=False, obj_best=1e9)))
+                else:
+                    # Isolate the formula that failed.
+                    results.extend(self.evaluate_nonparametric([n])[0] for n in batch)
+        return results
+
+    def _evaluate_batch(self, formulas: list[STLNode]) -> list[tuple[bool, SynthResult]]:
+        # IMPORTANT: only the robustness at t=0 counts.  The min over all
+        # timesteps would pick up the -1e9 out-of-bounds sentinel stlcgpp emits
+        # for time windows that extend past the trace, causing false positives
+        # for any formula whose interval reaches the trace boundary.
+        horizons = [f.horizon(self.dt) for f in formulas]
+        horizon = None if None in horizons else max(horizons)
+        traces = crop_to_horizon(self.traces, horizon)
+        if self.device is not None:
+            traces = traces.to(self.device)
+        template = FormulaTemplate(formulas, self.dt)
+        if self.shard_pool is not None:
+            task = self.shard_pool.task(template, 'violated_all')
+            verdicts = [v > 0 for v in self.shard_pool.max_rob0_batch(task, traces)]
+        else:
+            verdicts = template.violated_all(traces, self.predicate_store).any(dim=1).tolist()
+
+        results = [(v, SynthResult(satisfied=v, obj_best=float('nan'), num_evals=1))
+                   for v in verdicts]
+        covered = [i for i, v in enumerate(verdicts) if v]
+        if not (covered and self.witness_values):
+            return results
+
+        # min_i rho(phi) = -max_i rho(NOT phi), for every covered formula at once.
+        witness = FormulaTemplate([formulas[i] for i in covered], self.dt)
+        if self.shard_pool is not None:
+            task = self.shard_pool.task(witness, 'rob0_all', negate=True)
+            max_neg = self.shard_pool.max_rob0_batch(task, self.traces, horizon=horizon)
+        else:
+            max_neg = max_rob0_batch(
+                lambda t: -witness.rob0_all(t, cache=self.signal_cache,
+                                            predicates=self.predicate_store),
+                self.traces,
+                self.device,
+                eval_devices=self.eval_devices,
+                horizon=horizon,
+            )
+        for i, neg in zip(covered, max_neg):
+            min_rob = -neg
+            results[i] = (min_rob < 0, SynthResult(satisfied=min_rob < 0,
+                                                   obj_best=min_rob, num_evals=1))
+        return results
+
+    def _prefetch(self, nodes) -> None:
+        """Batch-evaluate the non-parametric ``nodes`` not already prefetched."""
+        pending = {}
+        for node in nodes:
+            fid = node.formula.id
+            if fid not in self._prefetched and not node.formula.get_param_names():
+                pending.setdefault(fid, node)
+        if pending:
+            results = self.evaluate_nonparametric(list(pending.values()))
+            self._prefetched.update(zip(pending, results))
+
+    def close(self) -> None:
+        """Stop the worker processes of ``eval_workers``, if any."""
+        if self.shard_pool is not None:
+            self.shard_pool.close()
+            self.shard_pool = None
 
     def _build_result(self, time_class: float) -> ClassificationResult:
         """Build the final classification result."""
         covered = self.graph.get_covered_nodes()
+        # A refuted node refutes everything below it.
+        refuted = set()
+        for node in self._refuted:
+            refuted.add(node.id)
+            refuted.update(n.id for n in self.graph.below(node))
+        num_classes, num_covered, lazy = self.num_classes, len(covered), {}
+        if isinstance(self.graph, LazyGraph):
+            graph = self.graph
+            if graph.num_terms <= _MAX_LAZY_TERMS:
+                num_classes, num_covered = graph.count_classes()
+            lazy = dict(num_terms=graph.num_terms, num_built=len(graph.nodes),
+                        num_covered_generators=graph.num_covered_generators)
         return ClassificationResult(
-            num_classes=self.num_classes,
-            num_covered=len(covered),
+            num_classes=num_classes,
+            num_covered=num_covered,
             time_split=self.time_split,
             time_class=time_class,
             time_total=self.time_split + time_class,
             num_synth_calls=self._num_synth_calls,
             covered_nodes=covered,
+            refuted_nodes=[n for n in self.graph.nodes if n.id in refuted and not n.results],
+            **lazy,
         )
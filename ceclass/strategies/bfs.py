@@ -16,7 +16,7 @@ class BFSClassifier(BaseClassifier):
     Bottom-up walk: queue starts at **minima** (nodes with no weaker
     ``smaller_imme`` children, e.g. leaves), then follows ``greater_imme``
     toward stronger formulas when a node is covered; on failure, deactivates
-    ``greater_all`` (stronger ancestors).
+    every stronger ancestor (``graph.above``).
 
     This differs from MATLAB ``MyClassProblem.m``, which seeds the queue from
     ``graph.maxima`` and walks downward.
@@ -34,6 +34,9 @@ class BFSClassifier(BaseClassifier):
 
             if not cur.active:
                 continue
+            if not cur.formula.get_param_names():
+                # Resolve the whole non-parametric frontier in one batched pass.
+                self._prefetch([cur] + [n for n in queue if n.active])
 
             satisfied, result = self._test_node(cur)
 
@@ -44,7 +47,7 @@ class BFSClassifier(BaseClassifier):
                         queue.append(nd)
                         seen_ids.add(nd.formula.id)
             else:
-                for nd in cur.greater_all:
+                for nd in self.graph.above(cur):
                     nd.active = False
 
         time_class = time.time() - t_start
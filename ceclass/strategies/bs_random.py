@@ -19,6 +19,8 @@ class BSRandomClassifier(BaseClassifier):
     Port of MyClassProblemBSRandom.m (with bug fix for undefined 'verdict').
     """
 
+    supports_lazy_graph = True
+
     def solve(self) -> ClassificationResult:
         t_start = time.time()
 
@@ -0,0 +1,201 @@
+"""
+Product-lattice factorization.
+
+When the specification's root is a binary AND/OR, ``Parser`` builds its
+lattice as the product of the two children's lattices: one node per
+(simplified) pair of child nodes. A product node's formula combines the two
+child formulas, and its parameters are the union of theirs. As long as the
+children share no temporal operator, coverage therefore follows from the
+children alone:
+
+* ``a AND b`` is violated by a trace iff ``a`` or ``b`` is, so the pair is
+  covered iff either child node is covered by the trace set.
+* ``a OR b`` is violated by a trace iff both are, so the pair is covered iff
+  one trace covers both child nodes. This takes per-trace results: each
+  child lattice is classified once per trace.
+
+The child lattices are searched with any strategy. With two ``16^k``
+children that is two searches of ``16^k`` nodes (per trace for OR) instead
+of one of ``16^k x 16^k``.
+"""
+from __future__ import annotations
+import time
+from typing import Optional
+
+import torch
+
+from ceclass.formula.stl_node import STLNode
+from ceclass.strategies.base import BaseClassifier, ClassificationResult
+from ceclass.strategies.long_bs import LongBSClassifier
+from ceclass.synthesis.param_synth import SynthResult
+
+_TRUE = STLNode.true_node().id
+_FALSE = STLNode.false_node().id
+
+
+def _temporal_ids(phi: STLNode) -> set[str]:
+    ids = set()
+    stack = [phi]
+    while stack:
+        node = stack.pop()
+        if node.node_type in ('always', 'eventually'):
+            ids.add(node.id)
+        stack.extend(node.children)
+    return ids
+
+
+def product_id(op: str, id1: str, id2: str) -> str:
+    """
+    ID of the root-lattice node for the pair (``id1``, ``id2``).
+
+    Mirrors ``Parser._simplify_and`` / ``_simplify_or`` (the root is parsed
+    with negative polarity).
+    """
+    if op == 'and':
+        absorbing, neutral, tag = _FALSE, _TRUE, 'NegAnd'
+    else:
+        absorbing, neutral, tag = _TRUE, _FALSE, 'NegOr'
+    if absorbing in (id1, id2):
+        return absorbing
+    if id1 == neutral:
+        return id2
+    if id2 == neutral:
+        return id1
+    return f"{tag}_{id1}{id2}"
+
+
+def _combine(op: str, r1: Optional[SynthResult],
+             r2: Optional[SynthResult]) -> Optional[SynthResult]:
+    """Witness of a product node from the witnesses of its two child nodes."""
+    if op == 'and':
+        found = [r for r in (r1, r2) if r is not None]
+        if not found:
+            return None
+        obj_best = min(r.obj_best for r in found)
+    else:
+        if r1 is None or r2 is None:
+            return None
+        found = [r1, r2]
+        obj_best = max(r1.obj_best, r2.obj_best)
+    params = {}
+    for r in found:
+        params.update(r.params_best or {})
+    return SynthResult(satisfied=True, obj_best=obj_best, params_best=params or None,
+                       exact=all(r.exact for r in found))
+
+
+class FactoredClassifier(BaseClassifier):
+    """
+    Classify the two children of a root AND/OR separately, then combine.
+
+    The root lattice is still parsed (it is what the result reports), but
+    only the child lattices are searched, each with ``strategy``. Falls back
+    to running ``strategy`` on the root lattice when the root is not a
+    binary AND/OR or its children share a temporal operator.
+
+    Args:
+        strategy: Classifier class used on each child lattice.
+        **kwargs: ``BaseClassifier`` arguments, also passed to every child
+            classifier. With OR, ``eval_workers`` and ``previous`` are
+            dropped for the per-trace searches.
+    """
+
+    def __init__(self, formula: STLNode, k: list, traces: torch.Tensor,
+                 strategy: type[BaseClassifier] = LongBSClassifier, **kwargs):
+        self.strategy = strategy
+        self._kwargs = kwargs
+        super().__init__(formula, k, traces, **{**kwargs, 'eval_workers': None})
+
+    def factorable(self) -> bool:
+        """Whether the root lattice is a product of two child lattices."""
+        formula = self.parser.formula
+        if formula.node_type not in ('and', 'or') or len(formula.children) != 2:
+            return False
+        first, second = formula.children
+        return not _temporal_ids(first) & _temporal_ids(second)
+
+    def solve(self) -> ClassificationResult:
+        t_start = time.time()
+        self._time_sub_split = 0.0
+        formula, k = self.parser.formula, self.parser.k
+        by_id = {n.id: n for n in self.graph.nodes}
+
+        if not self.factorable():
+            covered, _, refuted = self._classify(formula, k, self.traces)
+            for fid, result in covered.items():
+                if not by_id[fid].results:
+                    by_id[fid].add_to_results(result)
+            self._refuted.extend(by_id[fid] for fid in refuted)
+        elif formula.node_type == 'and':
+            (cov1, ids1, ref1), (cov2, ids2, ref2) = (
+                self._classify(child, k[i + 1], self.traces)
+                for i, child in enumerate(formula.children))
+            for id1 in ids1:
+                for id2 in ids2:
+                    self._mark(by_id, 'and', id1, id2, cov1.get(id1), cov2.get(id2),
+                               id1 in ref1 and id2 in ref2)
+        else:
+            self._solve_or(formula, k, by_id)
+
+        self.time_split += self._time_sub_split
+        return self._build_result(time.time() - t_start - self._time_sub_split)
+
+    def _solve_or(self, formula: STLNode, k: list, by_id: dict) -> None:
+        # covers[i][node ID]: bit t set iff trace t covers the child node;
+        # refutes[i][node ID]: bit t set iff trace t is shown not to.
+        covers: list[dict[str, int]] = [{}, {}]
+        refutes: list[dict[str, int]] = [{}, {}]
+        results: list[dict[tuple[str, int], SynthResult]] = [{}, {}]
+        ids: list[list[str]] = [[], []]
+        num_traces = self.traces.shape[0]
+        for t in range(num_traces):
+            for i, child in enumerate(formula.children):
+                # ``previous`` is about the whole trace set, not trace t.
+                covered, ids[i], refuted = self._classify(
+                    child, k[i + 1], self.traces[t:t + 1], eval_workers=None, previous=None)
+                for fid, result in covered.items():
+                    covers[i][fid] = covers[i].get(fid, 0) | 1 << t
+                    results[i][fid, t] = result
+                for fid in refuted:
+                    refutes[i][fid] = refutes[i].get(fid, 0) | 1 << t
+
+        every_trace = (1 << num_traces) - 1
+        for id1 in ids[0]:
+            cover1, refute1 = covers[0].get(id1, 0), refutes[0].get(id1, 0)
+            for id2 in ids[1]:
+                both = cover1 & covers[1].get(id2, 0)
+                t = (both & -both).bit_length() - 1
+                self._mark(by_id, 'or', id1, id2,
+                           results[0].get((id1, t)), results[1].get((id2, t)),
+                           refute1 | refutes[1].get(id2, 0) == every_trace)
+
+    def _classify(self, formula: STLNode, k: list, traces: torch.Tensor,
+                  **overrides) -> tuple[dict[str, SynthResult], list[str], set[str]]:
+        """
+        Run ``strategy`` on one lattice.
+
+        Returns:
+            (covered node ID -> witness, all node IDs, refuted node IDs)
+        """
+        sub = self.strategy(formula, k, traces, **{**self._kwargs, **overrides})
+        try:
+            result = sub.solve()
+        finally:
+            sub.close()
+        self._num_synth_calls += result.num_synth_calls
+        self._time_sub_split += sub.time_split
+        covered = {n.id: n.results[0] for n in result.covered_nodes}
+        refuted = {n.id for n in result.refuted_nodes}
+        return covered, [n.id for n in sub.graph.nodes], refuted
+
+    def _mark(self, by_id: dict, op: str, id1: str, id2: str,
+              r1: Optional[SynthResult], r2: Optional[SynthResult], refuted: bool) -> None:
+        node = by_id.get(product_id(op, id1, id2))
+        if node is None or node.results:
+            return
+        witness = _combine(op, r1, r2)
+        if witness is not None:
+            node.add_to_results(witness)
+        elif refuted and node.active:
+            node.active = False
+            self._refuted.append(node)
@@ -1,11 +1,13 @@
 from __future__ import annotations
 import math
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional
 
 import torch
 
 from ceclass.formula.stl_node import STLNode
+from ceclass.lattice.phi_node import PhiNode
 from ceclass.strategies.base import BaseClassifier, ClassificationResult
 
 
@@ -20,12 +22,50 @@ class LongBSClassifier(BaseClassifier):
 
     Expected complexity: O(log n) node tests per path.
 
+    With ``speculative_workers``, the midpoint and both possible next
+    midpoints (the quarter points) are tested at once in a thread pool;
+    once the midpoint resolves, the quarter point on the discarded side is
+    cancelled. Verdicts are recorded in search order, so with
+    deterministic synthesis (``synth_mode='exact'``) the eliminations and
+    ``num_synth_calls`` are those of the sequential search. Concurrent
+    CMA-ES searches share the CPU, so they are budgeted by
+    ``max_evals_per_node`` only: a wall-clock ``max_time_per_node`` would
+    give each of them less work than a sequential search gets. A path takes
+    about half as many rounds of synthesis; that only shortens the run with
+    idle cores to fill, and for work that releases the GIL.
+
     Port of MyClassProblemLongBS.m.
+
+    Args:
+        speculative_workers: Threads for speculative tests (3 keeps the
+            midpoint and both quarter points busy). ``None``: sequential.
+        **kwargs: ``BaseClassifier`` arguments.
+
+    Attributes:
+        num_speculative_wasted: Speculative tests that were started but
+            not used.
     """
 
+    supports_lazy_graph = True
+
+    def __init__(self, formula: STLNode, k: list, traces: torch.Tensor,
+                 speculative_workers: Optional[int] = None, **kwargs):
+        super().__init__(formula, k, traces, **kwargs)
+        self.speculative_workers = speculative_workers
+        self.num_speculative_wasted = 0
+
     def solve(self) -> ClassificationResult:
         t_start = time.time()
 
+        if self.speculative_workers:
+            with ThreadPoolExecutor(max_workers=self.speculative_workers) as pool:
+                while not self.graph.is_empty():
+                    path, path_len = self.graph.get_longest_path()
+                    if path_len == 0:
+                        break
+                    self._search_speculative(path, pool)
+            return self._build_result(time.time() - t_start)
+
         while not self.graph.is_empty():
             path, path_len = self.graph.get_longest_path()
             if path_len == 0:
@@ -51,3 +91,38 @@ class LongBSClassifier(BaseClassifier):
 
         time_class = time.time() - t_start
         return self._build_result(time_class)
+
+    def _search_speculative(self, path: list[PhiNode], pool: ThreadPoolExecutor) -> None:
+        """Binary search on ``path``, testing the next midpoints ahead."""
+        pending: dict[int, Future] = {}
+
+        def launch(i: int) -> None:
+            if i not in pending:
+                # Budget by evaluations (see the class docstring).
+                pending[i] = pool.submit(self._synthesize, path[i], math.inf)
+
+        istart = 0
+        iend = len(path) - 1
+
+        while istart <= iend:
+            mid = math.ceil((istart + iend) / 2)
+            launch(mid)
+            if mid + 1 <= iend:
+                launch(math.ceil((mid + 1 + iend) / 2))
+            if istart <= mid - 1:
+                launch(math.ceil((istart + mid - 1) / 2))
+            cur = path[mid]
+
+            satisfied, result = self._record(cur, pending.pop(mid).result())
+
+            if satisfied:
+                self.graph.eliminate_hold(cur, result)
+                istart = mid + 1
+            else:
+                self.graph.eliminate_unhold(cur)
+                iend = mid - 1
+
+            # Tests outside the remaining range lost: cancel them if not started.
+            for i in [i for i in pending if not istart <= i <= iend]:
+                if not pending.pop(i).cancel():
+                    self.num_speculative_wasted += 1
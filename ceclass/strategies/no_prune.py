@@ -13,7 +13,8 @@ class NoPruneClassifier(BaseClassifier):
     """
     Exhaustive classification strategy with no pruning (baseline).
 
-    Tests every node in the lattice, regardless of results.
+    Tests every node in the lattice, regardless of results (only nodes
+    already resolved by ``previous`` are skipped).
     This is the baseline for comparison — worst case O(n).
 
     Port of MyClassProblemNoPrune.m.
@@ -22,7 +23,10 @@ class NoPruneClassifier(BaseClassifier):
     def solve(self) -> ClassificationResult:
         t_start = time.time()
 
-        for cur in self.graph.nodes:
+        # Every node gets tested: resolve all non-parametric ones in one batch.
+        nodes = [n for n in self.graph.nodes if n.active]
+        self._prefetch(nodes)
+        for cur in nodes:
             satisfied, result = self._test_node(cur)
             if satisfied:
                 cur.add_to_results(result)
@@ -1 +1,2 @@
 from ceclass.synthesis.param_synth import ParamSynthesis, SynthResult
+from ceclass.synthesis.exact_synth import ExactSynthesis
@@ -0,0 +1,144 @@
+"""
+Exact split-point synthesis.
+
+``to_stlcgpp`` rounds every interval bound to ``int(round(a / dt))``, so the
+search space of a refined node is a finite grid of timestep indices. The
+split points of one refined temporal operator (``{phi_id}____t2``,
+``{phi_id}____t3``, ...) cut its interval into consecutive segments and are
+enumerated in non-decreasing order; split points of different operators vary
+independently. Candidates are scored in chunks through the node's
+``FormulaTemplate`` (split-point windows are sparse-table lookups) and the
+search stops at the first violating candidate, so "not covered" is only
+reported once every grid point has been checked. Grids larger than
+``max_combinations`` fall back to CMA-ES.
+"""
+from __future__ import annotations
+import math
+import time
+
+import torch
+
+from ceclass.formula.stl_node import STLNode
+from ceclass.synthesis.param_synth import ParamSynthesis, SynthResult
+from ceclass.utils.stl_eval import crop_to_horizon
+
+# Largest grid enumerated before falling back to CMA-ES.
+DEFAULT_MAX_COMBINATIONS = 1 << 22
+# Elements of (candidates x traces x timesteps) scored per chunk.
+_MAX_CHUNK_ELEMENTS = 1 << 24
+
+
+def _ordered_grid(lo: int, hi: int, m: int) -> torch.Tensor:
+    """All non-decreasing m-tuples over [lo, hi], shape (C(hi - lo + m, m), m)."""
+    grid = torch.arange(lo, hi + 1).unsqueeze(1)
+    for _ in range(1, m):
+        counts = hi - grid[:, -1] + 1
+        rows = torch.repeat_interleave(grid, counts, dim=0)
+        starts = torch.repeat_interleave(torch.cumsum(counts, 0) - counts, counts)
+        offsets = torch.arange(rows.shape[0]) - starts
+        grid = torch.cat([rows, (rows[:, -1] + offsets).unsqueeze(1)], dim=1)
+    return grid
+
+
+class ExactSynthesis(ParamSynthesis):
+    """
+    Exhaustive parameter synthesis over the discrete split-point grid.
+
+    Takes the same arguments as ``ParamSynthesis`` plus ``max_combinations``.
+    ``max_time`` and ``max_evals`` only apply to the CMA-ES fallback: an exact
+    search runs to completion (or to the first counterexample).
+    """
+
+    def __init__(self, *args, max_combinations: int = DEFAULT_MAX_COMBINATIONS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_combinations = max_combinations
+
+    def split_point_groups(self) -> list[list[int]]:
+        """
+        Parameter columns grouped by temporal operator, each in split order.
+
+        ``{phi_id}____t{j}`` parameters sharing ``phi_id`` and bounds form one
+        ordered group; any other parameter is a group of its own.
+        """
+        groups: dict[str, list[tuple[int, int]]] = {}
+        singletons = []
+        for col, name in enumerate(self.param_names):
+            prefix, sep, index = name.rpartition('____t')
+            if sep and index.isdigit():
+                groups.setdefault(prefix, []).append((int(index), col))
+            else:
+                singletons.append([col])
+
+        result = []
+        for members in groups.values():
+            cols = [col for _, col in sorted(members)]
+            if len({self.param_bounds[self.param_names[c]] for c in cols}) == 1:
+                result.append(cols)
+            else:
+                result.extend([c] for c in cols)
+        return result + singletons
+
+    def _step_range(self, col: int) -> tuple[int, int]:
+        lb, ub = self.param_bounds[self.param_names[col]]
+        return round(lb / self.dt), round(ub / self.dt)
+
+    def num_combinations(self) -> int:
+        """Size of the discrete search space."""
+        total = 1
+        for cols in self.split_point_groups():
+            lo, hi = self._step_range(cols[0])
+            total *= math.comb(max(hi - lo + 1, 0) + len(cols) - 1, len(cols))
+        return total
+
+    def solve(self) -> SynthResult:
+        """
+        Enumerate the split-point grid; fall back to CMA-ES when it is too large.
+        """
+        if self.num_combinations() > self.max_combinations:
+            return super().solve()
+
+        neg_formula = STLNode.negate(self.formula)
+        start_time = time.time()
+        groups = self.split_point_groups()
+        grids = [_ordered_grid(*self._step_range(cols[0]), len(cols)) for cols in groups]
+        total = math.prod(g.shape[0] for g in grids)
+
+        template = self._template(neg_formula)
+        traces = crop_to_horizon(self.traces, self.horizon)
+        num_traces, num_steps = traces.shape[0], traces.shape[1]
+        per_candidate = max(num_traces, 1) * template.candidate_length(num_steps)
+        chunk = max(1, _MAX_CHUNK_ELEMENTS // per_candidate)
+
+        best_obj = float('inf')
+        best_steps = None
+        num_evals = 0
+        for first in range(0, total, chunk):
+            index = torch.arange(first, min(total, first + chunk))
+            steps = torch.empty(index.shape[0], len(self.param_names), dtype=torch.long)
+            # Mixed-radix decode: the last group varies fastest.
+            for cols, grid in reversed(list(zip(groups, grids))):
+                steps[:, cols] = grid[index % grid.shape[0]]
+                index = index // grid.shape[0]
+
+            params = steps.to(torch.float64) * self.dt
+            max_robs = self._max_rob0(template, params, traces)
+            num_evals += len(max_robs)
+            i = max(range(len(max_robs)), key=max_robs.__getitem__)
+            if -max_robs[i] < best_obj:
+                best_obj = -max_robs[i]
+                best_steps = steps[i]
+            if best_obj < 0:
+                break
+
+        best_params = None
+        if best_steps is not None:
+            best_params = {name: float(s) * self.dt
+                           for name, s in zip(self.param_names, best_steps.tolist())}
+        return SynthResult(
+            satisfied=best_obj < 0,
+            obj_best=best_obj,
+            params_best=best_params,
+            num_evals=num_evals,
+            time_spent=time.time() - start_time,
+            exact=True,
+        )
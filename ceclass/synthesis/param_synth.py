@@ -13,7 +13,11 @@ except ImportError:
 
 from ceclass.formula.stl_node import STLNode
 from ceclass.formula.converter import to_stlcgpp
-from ceclass.utils.stl_eval import max_rob0_vmap, min_rob0_vmap
+from ceclass.formula.predicate_store import PredicateStore
+from ceclass.formula.signal_cache import SignalCache
+from ceclass.formula.template import FormulaTemplate
+from ceclass.utils.shard_pool import ProcessShardPool
+from ceclass.utils.stl_eval import max_rob0_batch, min_rob0_vmap
 
 
 @dataclass
@@ -24,6 +28,7 @@ class SynthResult:
     params_best: Optional[dict[str, float]] = None  # Best parameter values
     num_evals: int = 0
     time_spent: float = 0.0
+    exact: bool = False                    # True if the verdict comes from exhaustive search
 
 
 class ParamSynthesis:
@@ -53,6 +58,9 @@ class ParamSynthesis:
         max_evals: int = 500,
         pop_size: Optional[int] = None,
         eval_devices: Optional[Sequence[torch.device]] = None,
+        signal_cache: Optional[SignalCache] = None,
+        predicate_store: Optional[PredicateStore] = None,
+        shard_pool: Optional[ProcessShardPool] = None,
     ):
         self.formula = formula
         self.traces = traces          # (num_traces, timesteps, dims)
@@ -64,6 +72,12 @@ class ParamSynthesis:
         self.max_evals = max_evals
         self.pop_size = pop_size
         self.eval_devices = eval_devices
+        self.signal_cache = signal_cache  # shared with other nodes' searches
+        self.predicate_store = predicate_store
+        self.shard_pool = shard_pool  # CPU worker processes; replaces eval_devices
+        self._templates: dict[str, FormulaTemplate] = {}
+        # Last sample any candidate can read; traces are cropped to it.
+        self.horizon = formula.horizon(dt, param_bounds)
 
         # Compute initial guess and bounds
         self.lb = np.array([param_bounds[p][0] for p in param_names])
@@ -134,20 +148,11 @@ class ParamSynthesis:
         best_x = None
         num_evals = 0
 
-        # Grid search with 20 points
+        # Grid search with 20 points, scored in one batched pass
         n_grid = min(20, self.max_evals)
-        for val in np.linspace(lb, ub, n_grid):
-            params = {self.param_names[0]: float(val)}
-            try:
-                max_rob = max_rob0_vmap(
-                    lambda d: to_stlcgpp(neg_formula, params, d, self.dt),
-                    self.traces,
-                    self.device,
-                    eval_devices=self.eval_devices,
-                )
-                obj = -max_rob
-            except Exception:
-                obj = 1e9
+        grid = np.linspace(lb, ub, n_grid)
+        objs = self._batch_evaluate(grid.reshape(-1, 1), neg_formula)
+        for val, obj in zip(grid, objs):
             num_evals += 1
 
             if obj < best_obj:
@@ -157,9 +162,6 @@ class ParamSynthesis:
             if best_obj < 0:
                 break
 
-            if time.time() - start_time >= self.max_time:
-                break
-
         elapsed = time.time() - start_time
         best_params = {self.param_names[0]: best_x} if best_x is not None else None
 
@@ -173,26 +175,42 @@ class ParamSynthesis:
 
     def _batch_evaluate(self, candidates: list, neg_formula: STLNode) -> list[float]:
         """
-        Evaluate all CMA-ES candidates. Each candidate is a parameter vector.
+        Evaluate all CMA-ES candidates in one vectorized pass over (candidates × traces).
 
-        For each candidate, compute robustness of NOT(φ) across ALL traces on GPU.
+        Robustness of NOT(φ) is computed for the whole population at once.
         The objective is −max_i(rob(NOT φ, σ_i)): we want to find params where
         the best (most-violated) trace has rob(NOT φ) > 0, i.e., some trace violates φ.
         """
-        fitnesses = []
-        for candidate in candidates:
-            params = dict(zip(self.param_names, candidate))
-            try:
-                max_rob = max_rob0_vmap(
-                    lambda d: to_stlcgpp(neg_formula, params, d, self.dt),
-                    self.traces,
-                    self.device,
-                    eval_devices=self.eval_devices,
-                )
-                fitnesses.append(-max_rob)  # Minimize -max_rob to find any violating trace
-            except Exception:
-                fitnesses.append(1e9)  # Invalid params → large penalty
-        return fitnesses
+        params = torch.as_tensor(np.asarray(candidates, dtype=np.float64))
+        template = self._template(neg_formula)
+        try:
+            max_robs = self._max_rob0(template, params, self.traces)
+            return [-r for r in max_robs]  # Minimize -max_rob to find any violating trace
+        except Exception:
+            return [1e9] * len(candidates)  # Invalid params → large penalty
+
+    def _max_rob0(self, template: FormulaTemplate, params: torch.Tensor,
+                  traces: torch.Tensor) -> list[float]:
+        """max_i rob0 of every candidate, sharded over the worker pool if any."""
+        if self.shard_pool is not None:
+            return self.shard_pool.max_rob0_batch(
+                self.shard_pool.task(template, params=params), traces, horizon=self.horizon)
+        return max_rob0_batch(
+            lambda t: template.rob0(t, params, cache=self.signal_cache,
+                                    predicates=self.predicate_store),
+            traces,
+            self.device,
+            eval_devices=self.eval_devices,
+            horizon=self.horizon,
+        )
+
+    def _template(self, formula: STLNode) -> FormulaTemplate:
+        """Compiled template for ``formula``, built once per synthesis run."""
+        template = self._templates.get(formula.id)
+        if template is None:
+            template = FormulaTemplate(formula, self.dt, self.param_names)
+            self._templates[formula.id] = template
+        return template
 
     def evaluate_direct(self, formula: STLNode) -> float:
         """
@@ -205,4 +223,5 @@ class ParamSynthesis:
             self.traces,
             self.device,
             eval_devices=self.eval_devices,
+            horizon=formula.horizon(self.dt),
         )
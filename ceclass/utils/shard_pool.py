@@ -0,0 +1,195 @@
+"""
+Trace sharding across CPU worker processes.
+
+On CPU-only hosts every robustness pass runs in one process, whatever the
+number of cores. A ``ProcessShardPool`` splits the trace batch into one
+contiguous shard per worker process, evaluates the shards concurrently and
+reduces the per-candidate maxima in the parent (``max_rob0_batch``
+semantics; min is max of the negation).
+
+Traces are copied into shared memory once per trace set, so workers map
+them instead of receiving a copy per call. Evaluators must be picklable:
+``TemplateTask`` wraps a ``FormulaTemplate`` pass. Each worker keeps the
+templates it has been sent (with their sparse tables) and its own
+``SignalCache`` / ``PredicateStore``.
+"""
+from __future__ import annotations
+import os
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp  # registers shared-memory tensor pickling
+
+from ceclass.formula.predicate_store import PredicateStore
+from ceclass.formula.signal_cache import SignalCache, traces_key
+from ceclass.formula.template import FormulaTemplate
+from ceclass.utils.stl_eval import crop_to_horizon
+
+# Trace sets kept in shared memory by one pool.
+_MAX_SHARED_TRACE_SETS = 4
+# Templates kept by each worker between tasks.
+_MAX_WORKER_TEMPLATES = 64
+
+# Per-worker state, set up by ``_init_worker``.
+_worker_cache: Optional[SignalCache] = None
+_worker_predicates: Optional[PredicateStore] = None
+_worker_templates: OrderedDict = OrderedDict()
+
+
+def _init_worker(num_threads: int) -> None:
+    global _worker_cache, _worker_predicates
+    torch.set_num_threads(num_threads)
+    _worker_cache = SignalCache()
+    _worker_predicates = PredicateStore()
+
+
+@dataclass
+class TemplateTask:
+    """
+    Picklable evaluator: one pass of a ``FormulaTemplate`` over a trace shard.
+
+    Attributes:
+        template: Compiled formula(s).
+        uid: Identity of ``template`` across processes, so workers reuse their copy.
+        mode: ``'rob0'`` (one row per candidate of ``params``), ``'rob0_all'``
+            (one row per compiled formula) or ``'violated_all'`` (one row per
+            formula, 1.0 where rho < 0 from sign-only evaluation).
+        params: Candidate matrix for ``'rob0'``.
+        negate: Return -rho, whose max over traces is -min rho.
+    """
+    template: FormulaTemplate
+    uid: str
+    mode: str = 'rob0'
+    params: Optional[np.ndarray] = None
+    negate: bool = False
+
+    def __call__(self, traces: torch.Tensor,
+                 cache: Optional[SignalCache] = None,
+                 predicates: Optional[PredicateStore] = None) -> torch.Tensor:
+        """Shape (rows, num_traces)."""
+        if self.mode == 'violated_all':
+            return self.template.violated_all(traces, predicates).to(traces.dtype)
+        if self.mode == 'rob0':
+            out = self.template.rob0(traces, self.params, cache=cache, predicates=predicates)
+        elif self.mode == 'rob0_all':
+            out = self.template.rob0_all(traces, cache=cache, predicates=predicates)
+        else:
+            raise ValueError(f"Unknown task mode: {self.mode}")
+        return -out if self.negate else out
+
+
+def _run_shard(task: TemplateTask, shard: torch.Tensor) -> torch.Tensor:
+    """Worker side: per-row max over the shard's traces."""
+    template = _worker_templates.get(task.uid)
+    if template is None:
+        _worker_templates[task.uid] = task.template
+        if len(_worker_templates) > _MAX_WORKER_TEMPLATES:
+            _worker_templates.popitem(last=False)
+    else:
+        _worker_templates.move_to_end(task.uid)
+        task.template = template
+    with torch.no_grad():
+        return task(shard, _worker_cache, _worker_predicates).amax(dim=1)
+
+
+class ProcessShardPool:
+    """
+    Pool of CPU worker processes that evaluate trace shards concurrently.
+
+    Args:
+        num_workers: Worker processes (default: ``os.cpu_count()``).
+        threads_per_worker: Torch intra-op threads per worker (default: the
+            cores divided evenly among the workers).
+        start_method: ``multiprocessing`` start method. ``'spawn'`` is safe
+            with torch's thread pools; ``'fork'`` starts faster.
+    """
+
+    def __init__(self, num_workers: Optional[int] = None,
+                 threads_per_worker: Optional[int] = None,
+                 start_method: str = 'spawn'):
+        cpus = os.cpu_count() or 1
+        self.num_workers = max(1, num_workers or cpus)
+        threads = threads_per_worker or max(1, cpus // self.num_workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=mp.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(threads,),
+        )
+        self._uids: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._shared: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def task(self, template: FormulaTemplate, mode: str = 'rob0',
+             params=None, negate: bool = False) -> TemplateTask:
+        """Picklable evaluator for ``template`` (see ``TemplateTask``)."""
+        with self._lock:
+            uid = self._uids.get(template)
+            if uid is None:
+                uid = self._uids[template] = uuid.uuid4().hex
+        if params is not None:
+            if isinstance(params, torch.Tensor):
+                params = params.detach().cpu().numpy()
+            params = np.asarray(params, dtype=np.float64)
+        return TemplateTask(template, uid, mode, params, negate)
+
+    def max_rob0_batch(self, task: TemplateTask, traces: torch.Tensor,
+                       horizon: Optional[int] = None) -> list[float]:
+        """
+        Per-row max of ``task`` over all traces, with one shard per worker.
+
+        Same contract as ``stl_eval.max_rob0_batch``; ``horizon`` crops the
+        traces before they are shared.
+        """
+        traces = self._share(crop_to_horizon(traces, horizon))
+        n = traces.shape[0]
+        if n == 0:
+            with torch.no_grad():
+                rob = task(traces)
+            return [-1e9] * rob.shape[0]
+
+        num_shards = min(self.num_workers, n)
+        sizes = [n // num_shards + (1 if i < n % num_shards else 0) for i in range(num_shards)]
+        futures = []
+        start = 0
+        for size in sizes:
+            futures.append(self._executor.submit(_run_shard, task, traces[start:start + size]))
+            start += size
+        return torch.stack([f.result() for f in futures]).amax(dim=0).tolist()
+
+    def _share(self, traces: torch.Tensor) -> torch.Tensor:
+        """Shared-memory CPU copy of ``traces``, made once per trace set."""
+        key = traces_key(traces)
+        with self._lock:
+            entry = self._shared.get(key)
+            if entry is not None:
+                self._shared.move_to_end(key)
+                return entry[1]
+        shared = traces.detach().to('cpu', copy=True).contiguous().share_memory_()
+        with self._lock:
+            # Holding ``traces`` keeps its storage (and so the key) from being reused.
+            self._shared[key] = (traces, shared)
+            if len(self._shared) > _MAX_SHARED_TRACE_SETS:
+                self._shared.popitem(last=False)
+        return shared
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        self._executor.shutdown(wait=True)
+        self._shared.clear()
+
+    def __enter__(self) -> "ProcessShardPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"ProcessShardPool(num_workers={self.num_workers})"
@@ -1,6 +1,14 @@
 """
-stlcgpp robustness at t=0: prefer full-batch vmap on GPU; optional multi-GPU
-trace sharding; chunked fallback on CUDA OOM.
+stlcgpp robustness at t=0: prefer full-batch vmap on GPU; optional N-way
+multi-device trace sharding; chunked fallback on CUDA OOM. Sharding across CPU
+worker processes lives in ``ceclass.utils.shard_pool``.
+
+``max_rob0_batch`` applies the same sharding / OOM handling to evaluators that
+score a whole population of parameter candidates at once.
+
+All entry points take an optional ``horizon`` (see ``STLNode.horizon``): traces
+are cropped to the samples that rob[:, 0] can read before they are shipped to
+a device or vmapped.
 """
 from __future__ import annotations
 
@@ -20,15 +28,29 @@ def _is_cuda_oom(err: BaseException) -> bool:
     return "out of memory" in msg
 
 
+def crop_to_horizon(traces: torch.Tensor, horizon: Optional[int]) -> torch.Tensor:
+    """
+    First ``horizon + 1`` samples of every trace (a view).
+
+    Traces that are not longer than that are returned unchanged, so windows
+    that run past their end still read stlcgpp's -1e9 padding.
+    """
+    if horizon is None or horizon + 1 >= traces.shape[1]:
+        return traces
+    return traces[:, : horizon + 1]
+
+
 def _resolve_eval_devices(
     traces: torch.Tensor,
-    primary: torch.device,
+    primary: Optional[torch.device],
     eval_devices: Optional[Sequence[torch.device]],
 ) -> tuple[torch.device, ...]:
     if eval_devices is not None:
         return tuple(eval_devices)
+    if primary is None:
+        primary = traces.device
     if primary.type == "cuda" and torch.cuda.device_count() >= 2:
-        return (torch.device("cuda:0"), torch.device("cuda:1"))
+        return tuple(torch.device(f"cuda:{i}") for i in range(torch.cuda.device_count()))
     return (primary,)
 
 
@@ -129,15 +151,19 @@ def min_rob0_vmap(
     primary_device: torch.device,
     eval_devices: Optional[Sequence[torch.device]] = None,
     chunk_size: Optional[int] = None,
+    horizon: Optional[int] = None,
 ) -> float:
     """
     min_i rho(phi, trace_i) at t=0.
 
     - ``make_stl(dev)`` builds the stlcgpp module on ``dev`` (needed for multi-GPU).
-    - Default ``eval_devices``: use ``cuda:0`` and ``cuda:1`` when two GPUs exist
-      and ``primary_device`` is CUDA; otherwise only ``primary_device``.
+    - Default ``eval_devices``: every visible GPU when two or more exist and
+      ``primary_device`` is CUDA; otherwise only ``primary_device``. Shards run
+      concurrently, one thread per device.
     - Tries a full vmap on each shard first; on CUDA OOM, halves chunk size until it fits.
+    - ``horizon`` crops the traces first (``crop_to_horizon``).
     """
+    traces = crop_to_horizon(traces, horizon)
     devices = _resolve_eval_devices(traces, primary_device, eval_devices)
     n = traces.shape[0]
     if n == 0:
@@ -149,7 +175,7 @@ def min_rob0_vmap(
         t = traces.to(dev)
         return _min_rob0_one_device_try_full_then_chunk(stl, t, chunk_size)
 
-    # Multi-GPU: split batch along trace dimension
+    # Multi-device: split batch along trace dimension
     n_dev = len(devices)
     sizes = [n // n_dev + (1 if i < n % n_dev else 0) for i in range(n_dev)]
     starts = [0]
@@ -168,25 +194,16 @@ def min_rob0_vmap(
         t = traces.to(dev)
         return _min_rob0_one_device_try_full_then_chunk(stl, t, chunk_size)
 
-    if n_dev == 2:
-        def _work(i: int) -> float:
-            dev, shard = _shard(i)
-            if dev.type == "cuda":
-                torch.cuda.set_device(dev)
-            stl = make_stl(dev)
-            return _min_rob0_one_device_try_full_then_chunk(stl, shard, chunk_size)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as ex:
-            futs = [ex.submit(_work, i) for i in range(2)]
-            vals = [f.result() for f in futs]
-        return min(vals)
-
-    # 3+ devices: sequential shards (rare)
-    vals = []
-    for i in range(n_dev):
+    def _work(i: int) -> float:
         dev, shard = _shard(i)
+        if dev.type == "cuda":
+            torch.cuda.set_device(dev)
         stl = make_stl(dev)
-        vals.append(_min_rob0_one_device_try_full_then_chunk(stl, shard, chunk_size))
+        return _min_rob0_one_device_try_full_then_chunk(stl, shard, chunk_size)
+
+    # One thread per device: shards are evaluated concurrently.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_dev) as ex:
+        vals = list(ex.map(_work, range(n_dev)))
     return min(vals)
 
 
@@ -196,8 +213,10 @@ def max_rob0_vmap(
     primary_device: torch.device,
     eval_devices: Optional[Sequence[torch.device]] = None,
     chunk_size: Optional[int] = None,
+    horizon: Optional[int] = None,
 ) -> float:
     """max_i rho(phi, trace_i) at t=0 (e.g. negated formula in param synth)."""
+    traces = crop_to_horizon(traces, horizon)
     devices = _resolve_eval_devices(traces, primary_device, eval_devices)
     n = traces.shape[0]
     if n == 0:
@@ -226,27 +245,86 @@ def max_rob0_vmap(
         t = traces.to(dev)
         return _max_rob0_one_device_try_full_then_chunk(stl, t, chunk_size)
 
-    if n_dev == 2:
-        def _work(i: int) -> float:
-            dev, shard = _shard(i)
-            if dev.type == "cuda":
-                torch.cuda.set_device(dev)
-            stl = make_stl(dev)
-            return _max_rob0_one_device_try_full_then_chunk(stl, shard, chunk_size)
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as ex:
-            futs = [ex.submit(_work, i) for i in range(2)]
-            vals = [f.result() for f in futs]
-        return max(vals)
-
-    vals = []
-    for i in range(n_dev):
+    def _work(i: int) -> float:
         dev, shard = _shard(i)
+        if dev.type == "cuda":
+            torch.cuda.set_device(dev)
         stl = make_stl(dev)
-        vals.append(_max_rob0_one_device_try_full_then_chunk(stl, shard, chunk_size))
+        return _max_rob0_one_device_try_full_then_chunk(stl, shard, chunk_size)
+
+    # One thread per device: shards are evaluated concurrently.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_dev) as ex:
+        vals = list(ex.map(_work, range(n_dev)))
     return max(vals)
 
 
+def _max_rob0_batch_one_device(
+    evaluate: Callable[[torch.Tensor], torch.Tensor],
+    traces_on_dev: torch.Tensor,
+) -> torch.Tensor:
+    """Per-candidate max over traces; full batch first, halving trace chunks on OOM."""
+    n = traces_on_dev.shape[0]
+    if n == 0:
+        rob = evaluate(traces_on_dev)
+        return rob.new_full((rob.shape[0],), -1e9)
+    cs = n
+    while True:
+        try:
+            parts = [
+                evaluate(traces_on_dev[start : start + cs]).amax(dim=1)
+                for start in range(0, n, cs)
+            ]
+            return torch.stack(parts).amax(dim=0)
+        except RuntimeError as e:
+            if not _is_cuda_oom(e):
+                raise
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            if cs <= 1:
+                raise
+            cs = max(1, cs // 2)
+
+
+def max_rob0_batch(
+    evaluate: Callable[[torch.Tensor], torch.Tensor],
+    traces: torch.Tensor,
+    primary_device: Optional[torch.device],
+    eval_devices: Optional[Sequence[torch.device]] = None,
+    horizon: Optional[int] = None,
+) -> list[float]:
+    """
+    max_i rho(phi_p, trace_i) at t=0 for every candidate p, with one host sync.
+
+    - ``evaluate(traces_on_dev)`` returns robustness of shape (num_candidates, n_shard)
+      (see ``ceclass.formula.batched.batch_rob0``).
+    - Device selection, trace sharding and ``horizon`` cropping follow ``max_rob0_vmap``.
+    """
+    traces = crop_to_horizon(traces, horizon)
+    devices = _resolve_eval_devices(traces, primary_device, eval_devices)
+    n = traces.shape[0]
+    n_dev = len(devices)
+
+    if n_dev == 1 or n < n_dev:
+        best = _max_rob0_batch_one_device(evaluate, traces.to(devices[0]))
+        return best.tolist()
+
+    sizes = [n // n_dev + (1 if i < n % n_dev else 0) for i in range(n_dev)]
+    starts = [0]
+    for s in sizes[:-1]:
+        starts.append(starts[-1] + s)
+
+    def _work(i: int) -> torch.Tensor:
+        dev = devices[i]
+        if dev.type == "cuda":
+            torch.cuda.set_device(dev)
+        shard = traces[starts[i] : starts[i] + sizes[i]].to(dev, non_blocking=True)
+        return _max_rob0_batch_one_device(evaluate, shard).cpu()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_dev) as ex:
+        vals = list(ex.map(_work, range(n_dev)))
+    return torch.stack(vals).amax(dim=0).tolist()
+
+
 # Backwards-compatible: fixed chunk size (no full-batch attempt first)
 def min_rob0_vmap_chunked(
     stl_formula: torch.nn.Module,
@@ -40,6 +40,7 @@ from ceclass.examples.autotrans import (
     run_classification,
     STRATEGIES,
 )
+from ceclass.strategies.base import ClassificationResult
 from ceclass.utils.data import load_traces
 
 DATA_DIR = Path("/home/parvk/CEClassification/test/data")
@@ -108,7 +109,8 @@ def run_benchmark(
     data_dir: Path = DATA_DIR,
     max_traces: Optional[int] = None,
     eval_devices: Optional[Sequence[torch.device]] = None,
-) -> dict:
+    previous: Optional[ClassificationResult] = None,
+) -> tuple[dict, ClassificationResult]:
     trace_path = data_dir / bench.trace_file
     print(f"\n{'='*70}")
     print(f"  {bench.name}  k={k_val}  strategy={strategy_name}")
@@ -132,6 +134,7 @@ def run_benchmark(
         dt=bench.dt,
         max_time_per_node=max_time,
         eval_devices=eval_devices,
+        previous=previous,
     )
 
     row = {
@@ -153,7 +156,7 @@ def run_benchmark(
         _write_csv(csv_path, row)
         print(f"  Saved: {csv_path}")
 
-    return row
+    return row, result
 
 
 def _write_csv(path: Path, row: dict) -> None:
@@ -220,6 +223,11 @@ def main():
         metavar="LIST",
         help="Comma-separated devices for vmap, e.g. cuda:0,cuda:1 (overrides default)",
     )
+    parser.add_argument(
+        "--reuse-k",
+        action="store_true",
+        help="Pre-prune each k lattice with the k-1 result of the same benchmark and strategy",
+    )
     args = parser.parse_args()
 
     device = torch.device(args.device if torch.cuda.is_available() or args.device == "cpu"
@@ -244,11 +252,13 @@ def main():
     wall_start = time.time()
 
     for bench in benches:
+        # Result of the previous k per strategy, for --reuse-k.
+        previous = {}
         for k_val in k_vals:
             strategies = [args.strategy] if args.strategy else bench.strategies
             for strat in strategies:
                 try:
-                    row = run_benchmark(
+                    row, result = run_benchmark(
                         bench=bench,
                         k_val=k_val,
                         strategy_name=strat,
@@ -258,7 +268,9 @@ def main():
                         data_dir=data_dir,
                         max_traces=args.max_traces,
                         eval_devices=eval_devices,
+                        previous=previous.get(strat) if args.reuse_k else None,
                     )
+                    previous[strat] = result
                     rows.append(row)
                 except Exception as exc:
                     print(f"  ERROR: {bench.name} k={k_val} {strat}: {exc}")
@@ -87,6 +87,26 @@ def _make_traces(values: list, dt=DT, device=DEVICE) -> torch.Tensor:
     return torch.stack(tensors).to(device)  # (N, T, num_signals)
 
 
+def _at1_random_traces(seed, lo_speed, span_speed, lo_rpm, span_rpm,
+                       num_traces=3, timesteps=31) -> torch.Tensor:
+    """Seeded (speed, RPM) traces, uniform in [lo, lo + span) per signal."""
+    torch.manual_seed(seed)
+    return torch.stack([lo_speed + span_speed * torch.rand(num_traces, timesteps),
+                        lo_rpm + span_rpm * torch.rand(num_traces, timesteps)], -1)
+
+
+def _exhaustive(formula, k, traces):
+    """NoPrune with exact synthesis: the reference verdict of every node."""
+    from ceclass.strategies import NoPruneClassifier
+    return NoPruneClassifier(formula, k, traces, synth_mode="exact").solve()
+
+
+def _assert_matches_exhaustive(result, expected):
+    """Same covered nodes as the ``_exhaustive`` run ``expected``."""
+    assert sorted(n.id for n in result.covered_nodes) == \
+        sorted(n.id for n in expected.covered_nodes)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # T1 – Robustness semantics
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1071,3 +1091,1394 @@ class TestLatticeEdgeCases:
         g = Parser(formula, k).parse()
         ids = [n.formula.id for n in g.nodes]
         assert len(ids) == len(set(ids)), "Duplicate formula IDs found in lattice"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T11 – Batched population evaluation
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestBatchedEvaluation:
+    """batch_rob0 must reproduce stlcgpp's rob[:, 0] for every candidate."""
+
+    def _stlcgpp_rob0(self, formula, traces, params, dt=1.0):
+        f = to_stlcgpp(formula, params, DEVICE, dt)
+        with torch.no_grad():
+            rob = torch.vmap(f)(traces)
+        return rob[:, 0] if rob.ndim > 1 else rob
+
+    def _nested_formula(self):
+        p = _pred("s", "<", 0.5, 0, "p")
+        q = _pred("r", ">", -0.2, 1, "q")
+        inner = STLNode.always_node(STLNode.or_node(p, q, "p_or_q"),
+                                    interval=(0, "t_in"), node_id="alw_in")
+        left = STLNode.eventually_node(inner, interval=(1, "t_mid"), node_id="ev_left")
+        right = STLNode.always_node(STLNode.not_node(q, "not_q"),
+                                    interval=("t_mid", 9), node_id="alw_right")
+        return STLNode.and_node(left, right, "root"), ["t_in", "t_mid"]
+
+    def test_matches_stlcgpp_per_candidate(self):
+        from ceclass.formula.batched import batch_rob0
+        torch.manual_seed(0)
+        formula, names = self._nested_formula()
+        traces = torch.randn(4, 12, 2, device=DEVICE)
+        # Includes an empty window (t_mid < 1) and windows past the trace end.
+        candidates = torch.tensor([[2.0, 4.0], [0.0, 0.0], [6.0, 11.0], [3.4, 7.6]],
+                                  dtype=torch.float64)
+        batch = batch_rob0(formula, traces, 1.0, candidates, names)
+        assert batch.shape == (4, 4)
+        for i, row in enumerate(candidates.tolist()):
+            expected = self._stlcgpp_rob0(formula, traces, dict(zip(names, row)))
+            assert torch.allclose(batch[i], expected, atol=1e-5), \
+                f"Candidate {row}: batched {batch[i]} != stlcgpp {expected}"
+
+    def test_out_of_bounds_sentinel_preserved(self):
+        """A window past the trace end reads stlcgpp's -1e9 padding."""
+        from ceclass.formula.batched import batch_rob0
+        formula = _alw(_pred("s", "<", 100.0, 0, "p"), 0, 5, "alw")
+        traces = _make_traces([{"s": [80.0] * 4}])
+        rob0 = batch_rob0(formula, traces, 1.0)
+        assert rob0.item() == pytest.approx(self._stlcgpp_rob0(formula, traces, {}).item())
+        assert rob0.item() < -1e8
+
+    def test_batch_evaluate_matches_single_candidate_loop(self):
+        from ceclass.synthesis.param_synth import ParamSynthesis
+        from ceclass.utils.stl_eval import max_rob0_vmap
+        torch.manual_seed(1)
+        formula, names = self._nested_formula()
+        traces = torch.randn(5, 12, 2, device=DEVICE)
+        synth = ParamSynthesis(formula, traces, names, {n: (0.0, 9.0) for n in names},
+                               device=DEVICE, dt=1.0)
+        neg = STLNode.negate(formula)
+        candidates = [[1.0, 2.0], [4.2, 8.9], [0.0, 5.5]]
+        fitnesses = synth._batch_evaluate(candidates, neg)
+        for cand, fit in zip(candidates, fitnesses):
+            expected = -max_rob0_vmap(
+                lambda d: to_stlcgpp(neg, dict(zip(names, cand)), d, 1.0), traces, DEVICE,
+            )
+            assert fit == pytest.approx(expected, abs=1e-5)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T12 – Compiled formula templates
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestFormulaTemplate:
+    """A FormulaTemplate is compiled once and re-bound to new candidates."""
+
+    def test_shared_subtrees_compiled_once(self):
+        from ceclass.formula.template import FormulaTemplate
+        p = _pred("s", "<", 0.5, 0, "p")
+        ev_a = STLNode.eventually_node(p, interval=(0, 2), node_id="ev_a")
+        ev_b = STLNode.eventually_node(_pred("s", "<", 0.5, 0, "p2"),
+                                       interval=(0, 2), node_id="ev_b")
+        formula = STLNode.and_node(ev_a, STLNode.not_node(ev_b, "n"), "root")
+        template = FormulaTemplate(formula)
+        # predicate, eventually, negation, and: the two eventually subtrees merge.
+        assert len(template.ops) == 4
+
+    def test_reused_across_candidate_batches(self):
+        from ceclass.formula.template import FormulaTemplate
+        torch.manual_seed(2)
+        formula, names = TestBatchedEvaluation()._nested_formula()
+        traces = torch.randn(3, 12, 2, device=DEVICE)
+        template = FormulaTemplate(formula, 1.0, names)
+        for batch in ([[2.0, 4.0]], [[0.0, 9.0], [5.0, 3.0], [1.6, 2.5]]):
+            rob0 = template.rob0(traces, batch)
+            assert rob0.shape == (len(batch), 3)
+            for i, row in enumerate(batch):
+                f = to_stlcgpp(formula, dict(zip(names, row)), DEVICE, 1.0)
+                with torch.no_grad():
+                    expected = torch.vmap(f)(traces)[:, 0]
+                assert torch.allclose(rob0[i], expected, atol=1e-5)
+
+    def test_synthesis_caches_template_per_formula(self):
+        from ceclass.synthesis.param_synth import ParamSynthesis
+        formula, names = TestBatchedEvaluation()._nested_formula()
+        traces = torch.randn(2, 12, 2, device=DEVICE)
+        synth = ParamSynthesis(formula, traces, names, {n: (0.0, 9.0) for n in names},
+                               device=DEVICE, dt=1.0)
+        neg = STLNode.negate(formula)
+        synth._batch_evaluate([[1.0, 2.0]], neg)
+        synth._batch_evaluate([[3.0, 4.0], [5.0, 6.0]], neg)
+        assert list(synth._templates) == [neg.id]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T13 – Sparse-table window queries
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestSparseTable:
+    """SparseTable.query must agree with a direct scan over each window."""
+
+    def _scan(self, signal, lo, hi, length, is_min):
+        padded = torch.cat([signal, torch.full((*signal.shape[:-1], length + max(hi, 0)), -1e9)], -1)
+        cols = []
+        for t in range(length):
+            a, b = t + max(lo, 0), t + hi
+            if a > b:
+                cols.append(torch.full(signal.shape[:-1], 1e9 if is_min else -1e9))
+            else:
+                window = padded[..., a:b + 1]
+                cols.append(window.amin(-1) if is_min else window.amax(-1))
+        return torch.stack(cols, -1)
+
+    @pytest.mark.parametrize("is_min", [True, False])
+    def test_matches_window_scan(self, is_min):
+        from ceclass.formula.sparse_table import SparseTable
+        torch.manual_seed(3)
+        signal = torch.randn(1, 3, 17)
+        table = SparseTable(signal, is_min)
+        windows = [(0, 0), (0, 5), (3, 9), (2, 16), (4, 30), (7, 3), (16, 16)]
+        lo = torch.tensor([w[0] for w in windows])
+        hi = torch.tensor([w[1] for w in windows])
+        out = table.query(lo, hi, 17)
+        assert out.shape == (len(windows), 3, 17)
+        for p, (a, b) in enumerate(windows):
+            assert torch.equal(out[p], self._scan(signal[0], a, b, 17, is_min)), (a, b)
+
+    def test_static_child_table_reused(self):
+        from ceclass.formula.template import FormulaTemplate
+        torch.manual_seed(4)
+        p = _pred("s", "<", 0.3, 0, "p")
+        formula = STLNode.eventually_node(p, interval=("t1", "t2"), node_id="ev")
+        traces = torch.randn(3, 15, 1, device=DEVICE)
+        template = FormulaTemplate(formula, 1.0, ["t1", "t2"])
+        template.rob0(traces, [[0.0, 4.0]])
+        (_, cached), = template._tables.values()
+        table = cached[template.root]
+        for row in ([2.0, 14.0], [5.0, 3.0], [10.0, 20.0]):
+            rob0 = template.rob0(traces, [row])
+            assert cached[template.root] is table
+            f = to_stlcgpp(formula, {"t1": row[0], "t2": row[1]}, DEVICE, 1.0)
+            with torch.no_grad():
+                expected = torch.vmap(f)(traces)[:, 0]
+            assert torch.allclose(rob0[0], expected, atol=1e-5), row
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T14 – Exact split-point synthesis
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestExactSynthesis:
+    """ExactSynthesis must agree with a brute-force scan of the split-point grid."""
+
+    def _traces(self, seed, n=4, T=35):
+        """Traces near the AT5 thresholds, so verdicts depend on the split points."""
+        g = torch.Generator().manual_seed(seed)
+        speed = 60 + 12 * torch.rand(n, T, generator=g)
+        rpm = 3700 + 120 * torch.rand(n, T, generator=g)
+        return torch.stack([speed, rpm], dim=-1).to(DEVICE)
+
+    def _brute_force(self, formula, traces, names, bounds):
+        import itertools
+        from ceclass.formula.batched import batch_rob0
+        grid = range(int(bounds[names[0]][0]), int(bounds[names[0]][1]) + 1)
+        combos = list(itertools.combinations_with_replacement(grid, len(names)))
+        params = torch.tensor(combos, dtype=torch.float64)
+        rob = batch_rob0(STLNode.negate(formula), traces, 1.0, params, names)
+        return rob.max().item() > 0
+
+    def test_ordered_grid(self):
+        import itertools
+        from ceclass.synthesis.exact_synth import _ordered_grid
+        grid = _ordered_grid(2, 6, 3)
+        expected = list(itertools.combinations_with_replacement(range(2, 7), 3))
+        assert [tuple(r) for r in grid.tolist()] == expected
+
+    @pytest.mark.parametrize("k_val", [2, 3])
+    def test_verdicts_match_brute_force(self, k_val):
+        from ceclass.synthesis.exact_synth import ExactSynthesis
+        formula, k = _build_at5_spec(k_val)
+        parser = Parser(formula, k)
+        graph = parser.parse()
+        traces = self._traces(k_val)
+        verdicts = []
+        for node in graph.nodes:
+            names = node.formula.get_param_names()
+            if not names:
+                continue
+            bounds = parser.get_param_bounds_for_node(node)
+            synth = ExactSynthesis(node.formula, traces, names, bounds, device=DEVICE, dt=1.0)
+            result = synth.solve()
+            assert result.exact
+            assert result.satisfied == self._brute_force(node.formula, traces, names, bounds), \
+                node.formula.id
+            verdicts.append(result.satisfied)
+        assert any(verdicts) and not all(verdicts)
+
+    def test_falls_back_to_cmaes_above_cap(self):
+        from ceclass.synthesis.exact_synth import ExactSynthesis
+        p = _pred("speed", "<", 100.0, 0, "p")
+        formula = STLNode.and_node(_alw(p, 0, "a____t2", "l"), _alw(p, "a____t2", 30, "r"), "root")
+        traces = _make_traces([{"speed": [120.0] * 31}])
+        synth = ExactSynthesis(formula, traces, ["a____t2"], {"a____t2": (0.0, 30.0)},
+                               device=DEVICE, dt=1.0, max_combinations=10)
+        assert synth.num_combinations() == 31
+        result = synth.solve()
+        assert not result.exact and result.satisfied
+
+    def test_classifier_exact_mode(self):
+        from ceclass.strategies.no_prune import NoPruneClassifier
+        formula, k = _build_at5_spec(2)
+        traces = self._traces(7)
+        exact = NoPruneClassifier(formula, k, traces, device=DEVICE, dt=1.0, synth_mode='exact')
+        result = exact.solve()
+        assert result.num_synth_calls == result.num_classes
+        with pytest.raises(ValueError):
+            NoPruneClassifier(formula, k, traces, device=DEVICE, dt=1.0, synth_mode='grid')
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T15 – Horizon-aware trace cropping
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestHorizonCropping:
+    """Cropping traces to the formula horizon must not change rob[:, 0]."""
+
+    def test_horizon_of_nested_intervals(self):
+        p = _pred("s", "<", 1.0, 0, "p")
+        inner = _alw(p, 0, 2.5, "alw")
+        formula = STLNode.and_node(_ev(inner, 1, "t", "ev"), _ev(p, 0, 4, "ev2"), "root")
+        assert formula.horizon(dt=0.5, param_bounds={"t": (0.0, 3.0)}) == 6 + 5
+        assert formula.horizon(dt=1.0) is None
+        assert _alw(p, 0, 30, "a").horizon(dt=0.01) == 3000
+
+    def test_crop_keeps_out_of_range_padding(self):
+        from ceclass.utils.stl_eval import crop_to_horizon
+        traces = torch.zeros(2, 10, 1)
+        assert crop_to_horizon(traces, 4).shape[1] == 5
+        assert crop_to_horizon(traces, 9) is traces
+        assert crop_to_horizon(traces, 25) is traces
+        assert crop_to_horizon(traces, None) is traces
+
+    def test_cropped_robustness_matches_full(self):
+        from ceclass.utils.stl_eval import min_rob0_vmap
+        torch.manual_seed(5)
+        formula, k = _build_at1_spec(2)
+        graph = Parser(formula, k).parse()
+        traces = torch.stack([80 + 20 * torch.rand(3, 60), 3500 + 1000 * torch.rand(3, 60)], -1)
+        for node in graph.nodes:
+            params = {n: 12.0 for n in node.formula.get_param_names()}
+            bounds = {n: (0.0, 30.0) for n in params}
+            horizon = node.formula.horizon(1.0, bounds)
+            assert horizon in (0, 30)  # TRUE/FALSE nodes read only t=0
+            make = lambda d: to_stlcgpp(node.formula, params, d, 1.0)
+            full = min_rob0_vmap(make, traces, torch.device("cpu"))
+            cropped = min_rob0_vmap(make, traces, torch.device("cpu"), horizon=horizon)
+            assert cropped == pytest.approx(full, abs=1e-5), node.formula.id
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T16 – Shared subformula signal cache
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestSignalCache:
+    """Parameter-free subtrees are evaluated once per trace set across nodes."""
+
+    def test_structurally_equal_subtrees_shared(self):
+        from ceclass.formula.signal_cache import SignalCache
+        from ceclass.formula.template import FormulaTemplate
+        torch.manual_seed(6)
+        traces = torch.randn(3, 20, 2, device=DEVICE)
+        p, q = _pred("s", "<", 0.1, 0, "p"), _pred("r", ">", 0.2, 1, "q")
+        first = _alw(STLNode.and_node(p, q, "pq"), 0, 19, "a1")
+        # Different node IDs and operand order, same conjunction.
+        q2, p2 = _pred("r", ">", 0.2, 1, "q2"), _pred("s", "<", 0.1, 0, "p2")
+        second = _ev(_alw(STLNode.and_node(q2, p2, "qp"), 0, 4, "a2"), 0, "t", "ev")
+        cache = SignalCache()
+        FormulaTemplate(first, 1.0).rob0(traces, cache=cache)
+        hits = cache.hits
+        template = FormulaTemplate(second, 1.0, ["t"])
+        rob0 = template.rob0(traces, [[3.0], [9.0]], cache=cache)
+        assert cache.hits > hits
+        for i, t in enumerate((3.0, 9.0)):
+            f = to_stlcgpp(second, {"t": t}, DEVICE, 1.0)
+            with torch.no_grad():
+                expected = torch.vmap(f)(traces)[:, 0]
+            assert torch.allclose(rob0[i], expected, atol=1e-5)
+
+    def test_eviction_bound(self):
+        from ceclass.formula.signal_cache import SignalCache
+        traces = torch.zeros(2, 100, 1)
+        signal = torch.zeros(1, 2, 100)
+        cache = SignalCache(max_bytes=3 * signal.element_size() * signal.nelement())
+        for i in range(5):
+            cache.put(traces, ("k", i), signal.clone())
+        assert len(cache) == 3 and cache.num_bytes <= cache.max_bytes
+        assert cache.get(traces, ("k", 0), 100) is None
+        assert cache.get(traces, ("k", 4), 100) is not None
+        assert cache.get(traces, ("k", 4), 101) is None  # shorter than requested
+
+    def test_classifier_reuses_signals(self):
+        from ceclass.strategies.no_prune import NoPruneClassifier
+        torch.manual_seed(7)
+        formula, k = _build_at1_spec(2)
+        traces = torch.stack([80 + 20 * torch.rand(4, 40), 3500 + 1000 * torch.rand(4, 40)], -1)
+        clf = NoPruneClassifier(formula, k, traces, device=torch.device("cpu"), dt=1.0,
+                                max_time_per_node=5.0, max_evals_per_node=50)
+        result = clf.solve()
+        assert clf.signal_cache.hits > 0
+        for node in clf.graph.nodes:
+            if node.formula.get_param_names():
+                continue
+            rob = torch.vmap(to_stlcgpp(node.formula, {}, torch.device("cpu"), 1.0))(traces)
+            assert (node in result.covered_nodes) == bool(rob[:, 0].min() < 0)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T17 – Predicate signal store
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestPredicateStore:
+    """Predicate signals are computed once per trace set and shared by crops."""
+
+    def test_values_and_crop_reuse(self):
+        from ceclass.formula.predicate_store import PredicateStore
+        from ceclass.utils.stl_eval import crop_to_horizon
+        traces = torch.randn(3, 25, 2)
+        store = PredicateStore()
+        full = store.signal(traces, '<', 1, 0.3)
+        assert torch.equal(full[0], 0.3 - traces[:, :, 1])
+        cropped = store.signal(crop_to_horizon(traces, 9), '<', 1, 0.3)
+        assert cropped.shape == (1, 3, 10) and store.hits == 1 and len(store) == 1
+        assert torch.equal(store.signal(traces, '>', 0, -1.0)[0], traces[:, :, 0] + 1.0)
+
+    def test_classifier_computes_each_predicate_once(self):
+        from ceclass.strategies.no_prune import NoPruneClassifier
+        torch.manual_seed(8)
+        formula, k = _build_at1_spec(2)
+        traces = torch.stack([80 + 20 * torch.rand(4, 40), 3500 + 1000 * torch.rand(4, 40)], -1)
+        clf = NoPruneClassifier(formula, k, traces, device=torch.device("cpu"), dt=1.0,
+                                max_time_per_node=5.0, max_evals_per_node=50)
+        clf.solve()
+        # speed < 90 and RPM < 4000, each on the (horizon-cropped) trace set.
+        assert len(clf.predicate_store) == 2
+        assert clf.predicate_store.hits > 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T18 – Sign-only verdicts
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestSignOnlyVerdict:
+    """FormulaTemplate.violated must equal rob0 < 0, including rho == 0."""
+
+    def _check(self, formula, traces):
+        from ceclass.formula.template import FormulaTemplate
+        template = FormulaTemplate(formula, 1.0)
+        rob = torch.vmap(to_stlcgpp(formula, {}, DEVICE, 1.0))(traces)[:, 0]
+        assert torch.equal(template.violated(traces), rob < 0), str(formula)
+
+    def test_zero_robustness_is_not_a_violation(self):
+        p = _pred("speed", "<", 90.0, 0, "p")
+        traces = _make_traces([{"speed": [90.0] * 6}, {"speed": [90.0] * 5 + [91.0]}], dt=1.0)
+        self._check(_alw(p, 0, 5, "alw"), traces)
+        # NOT(speed < 90) is 0 at speed == 90 as well.
+        self._check(_ev(STLNode.not_node(p, "np"), 0, 3, "ev"), traces)
+        self._check(STLNode.or_node(p, STLNode.not_node(p, "np"), "or"), traces)
+
+    def test_padding_and_empty_windows(self):
+        p = _pred("speed", "<", 90.0, 0, "p")
+        traces = _make_traces([{"speed": [80.0] * 6}], dt=1.0)
+        self._check(_alw(p, 2, 9, "past_end"), traces)       # reads -1e9 padding
+        self._check(_ev(p, 4, 2, "empty_ev"), traces)        # empty → -1e9
+        self._check(_alw(p, 4, 2, "empty_alw"), traces)      # empty → +1e9
+        self._check(STLNode.not_node(_ev(p, 3, 8, "ev"), "n"), traces)
+
+    def test_random_nested_formulas(self):
+        torch.manual_seed(9)
+        traces = torch.randint(-2, 3, (6, 15, 2), device=DEVICE).float()
+        p = _pred("s", "<", 0.0, 0, "p")
+        q = _pred("r", ">", 1.0, 1, "q")
+        formulas = [
+            _alw(_ev(STLNode.or_node(p, q, "o"), 1, 3, "e"), 0, 6, "a"),
+            _ev(STLNode.and_node(_alw(p, 0, 2, "a1"), STLNode.not_node(q, "nq"), "x"), 2, 12, "e2"),
+            STLNode.not_node(_alw(STLNode.and_node(p, STLNode.true_node(), "pt"), 0, 4, "a2"), "n"),
+        ]
+        for formula in formulas:
+            self._check(formula, traces)
+
+    def test_witness_values_only_for_covered_nodes(self):
+        from ceclass.strategies.no_prune import NoPruneClassifier
+        torch.manual_seed(10)
+        formula, k = _build_at1_spec(1)
+        traces = torch.stack([80 + 20 * torch.rand(3, 31), 3500 + 1000 * torch.rand(3, 31)], -1)
+        with_values = NoPruneClassifier(formula, k, traces, dt=1.0).solve()
+        signs_only = NoPruneClassifier(formula, k, traces, dt=1.0, witness_values=False).solve()
+        assert sorted(n.id for n in with_values.covered_nodes) == \
+            sorted(n.id for n in signs_only.covered_nodes)
+        for node in signs_only.covered_nodes:
+            if not node.formula.get_param_names():
+                assert math.isnan(node.results[0].obj_best)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T19 – Batched non-parametric node evaluation
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestBatchedNonParametric:
+    """evaluate_nonparametric must agree with one-node-at-a-time evaluation."""
+
+    def test_multi_root_template_matches_single(self):
+        from ceclass.formula.template import FormulaTemplate
+        torch.manual_seed(11)
+        traces = torch.randint(-2, 3, (5, 12, 1), device=DEVICE).float()
+        p = _pred("s", "<", 0.0, 0, "p")
+        formulas = [_alw(p, 0, 3, "a"), _ev(_alw(p, 0, 3, "a"), 1, 5, "e"),
+                    STLNode.not_node(p, "n")]
+        template = FormulaTemplate(formulas, 1.0)
+        robs = template.rob0_all(traces)
+        signs = template.violated_all(traces)
+        assert robs.shape == signs.shape == (3, 5)
+        for i, formula in enumerate(formulas):
+            single = FormulaTemplate(formula, 1.0)
+            assert torch.allclose(robs[i], single.rob0(traces)[0])
+            assert torch.equal(signs[i], single.violated(traces))
+
+    def test_verdicts_match_per_node(self):
+        from ceclass.strategies.no_prune import NoPruneClassifier
+        torch.manual_seed(12)
+        formula, k = _build_at1_spec(1)
+        traces = torch.stack([80 + 20 * torch.rand(4, 31), 3500 + 1000 * torch.rand(4, 31)], -1)
+        clf = NoPruneClassifier(formula, k, traces, dt=1.0)
+        nodes = [n for n in clf.graph.nodes if not n.formula.get_param_names()]
+        batched = clf.evaluate_nonparametric(nodes)
+        for node, (satisfied, result) in zip(nodes, batched):
+            single_sat, single = clf.evaluate_nonparametric([node])[0]
+            assert satisfied == single_sat
+            assert result.obj_best == pytest.approx(single.obj_best, nan_ok=True)
+        assert clf._num_synth_calls == 0
+
+    @pytest.mark.parametrize("strategy", ["bfs", "noprune"])
+    def test_prefetch_keeps_results_and_counts(self, strategy):
+        from ceclass.strategies.bfs import BFSClassifier
+        from ceclass.strategies.no_prune import NoPruneClassifier
+        cls = {"bfs": BFSClassifier, "noprune": NoPruneClassifier}[strategy]
+        torch.manual_seed(13)
+        formula, k = _build_at1_spec(1)
+        traces = torch.stack([80 + 20 * torch.rand(4, 31), 3500 + 1000 * torch.rand(4, 31)], -1)
+
+        # Exact synthesis keeps parametric verdicts deterministic.
+        batched = cls(formula, k, traces, dt=1.0, synth_mode="exact")
+        serial = cls(formula, k, traces, dt=1.0, synth_mode="exact")
+        serial._prefetch = lambda nodes: None
+        a, b = batched.solve(), serial.solve()
+        assert sorted(n.id for n in a.covered_nodes) == sorted(n.id for n in b.covered_nodes)
+        assert a.num_synth_calls == b.num_synth_calls
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T20 – CPU process sharding
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestProcessSharding:
+    """ProcessShardPool must reduce shards to the single-process answer."""
+
+    @pytest.fixture(scope="class")
+    def pool(self):
+        from ceclass.utils.shard_pool import ProcessShardPool
+        with ProcessShardPool(3, threads_per_worker=1, start_method="fork") as pool:
+            yield pool
+
+    def test_matches_single_process(self, pool):
+        from ceclass.formula.template import FormulaTemplate
+        torch.manual_seed(14)
+        traces = torch.randint(-2, 3, (7, 20, 1)).float()
+        p = _pred("s", "<", 0.0, 0, "p")
+        formula = _alw(_ev(p, 0, "t_b", "e"), 0, 10, "a")
+        template = FormulaTemplate(formula, 1.0, ["t_b"])
+        params = torch.tensor([[0.0], [2.0], [5.0]], dtype=torch.float64)
+        got = pool.max_rob0_batch(pool.task(template, params=params), traces)
+        assert got == template.rob0(traces, params).amax(dim=1).tolist()
+
+        formulas = [_alw(p, 0, 3, "a3"), STLNode.not_node(p, "n")]
+        multi = FormulaTemplate(formulas, 1.0)
+        got = pool.max_rob0_batch(pool.task(multi, "rob0_all", negate=True), traces)
+        assert got == (-multi.rob0_all(traces)).amax(dim=1).tolist()
+        got = pool.max_rob0_batch(pool.task(multi, "violated_all"), traces)
+        assert [v > 0 for v in got] == multi.violated_all(traces).any(dim=1).tolist()
+
+    def test_fewer_traces_than_workers(self, pool):
+        from ceclass.formula.template import FormulaTemplate
+        traces = torch.tensor([[[1.0], [-1.0], [2.0]]])
+        template = FormulaTemplate(_pred("s", "<", 0.0, 0, "p"), 1.0)
+        assert pool.max_rob0_batch(pool.task(template, "rob0_all"), traces) == [-1.0]
+
+    def test_classifier_with_workers(self, pool):
+        from ceclass.strategies.no_prune import NoPruneClassifier
+        torch.manual_seed(15)
+        formula, k = _build_at1_spec(1)
+        traces = torch.stack([80 + 20 * torch.rand(5, 31), 3500 + 1000 * torch.rand(5, 31)], -1)
+        local = NoPruneClassifier(formula, k, traces, dt=1.0, synth_mode="exact").solve()
+        sharded_clf = NoPruneClassifier(formula, k, traces, dt=1.0, synth_mode="exact")
+        sharded_clf.shard_pool = pool
+        sharded = sharded_clf.solve()
+        assert sorted(n.id for n in local.covered_nodes) == \
+            sorted(n.id for n in sharded.covered_nodes)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T21 – Bitset transitive reduction
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _reference_set_imme(graph):
+    """The list-scanning PhiGraph.set_imme (port of PhiGraph.m), for comparison."""
+    t_nodes = list(graph.nodes)
+    saved = [list(nd.smaller_all) for nd in graph.nodes]
+    while True:
+        minima = [nd for nd in t_nodes if len(nd.smaller_all) == 1]
+        if not minima:
+            minima = [nd for nd in t_nodes if len(nd.smaller_all) == 0]
+        t_nodes = [nd for nd in t_nodes if not any(nd is m for m in minima)]
+        for m in minima:
+            for nn in t_nodes:
+                if m in nn.smaller_all:
+                    flag = any(sn is not nn and sn is not m and sn in m.greater_all
+                               for sn in nn.smaller_all)
+                    if not flag:
+                        nn.add_to_smaller_imme(m)
+                        m.add_to_greater_imme(nn)
+                    nn.smaller_all.remove(m)
+        if len(t_nodes) <= 1:
+            break
+    for nd, smaller_all in zip(graph.nodes, saved):
+        nd.smaller_all = smaller_all
+
+
+class TestBitsetTransitiveReduction:
+    """set_imme must reproduce the reference edges, including list order."""
+
+    @staticmethod
+    def _edges(graph):
+        return [([s.id for s in n.smaller_imme], [g.id for g in n.greater_imme])
+                for n in graph.nodes]
+
+    def _check(self, build):
+        expected, actual = build(), build()
+        for n in expected.nodes + actual.nodes:
+            n.smaller_imme.clear()
+            n.greater_imme.clear()
+        _reference_set_imme(expected)
+        actual.set_imme()
+        assert self._edges(actual) == self._edges(expected)
+
+    @pytest.mark.parametrize("builder", [_build_at1_spec, _build_at3_spec, _build_at5_spec])
+    def test_spec_lattices(self, builder):
+        for k_val in (1, 2):
+            self._check(lambda: Parser(*builder(k_val)).parse())
+
+    def test_random_closed_relations(self):
+        rng = np.random.default_rng(16)
+        for trial in range(40):
+            n = int(rng.integers(2, 12))
+            below = np.tril(rng.random((n, n)) < 0.3, -1)
+            # Transitive closure, then a shuffled node order.
+            for _ in range(n):
+                below = below | ((below.astype(int) @ below.astype(int)) > 0)
+            perm = rng.permutation(n)
+
+            def build():
+                nodes = [PhiNode(formula=_pred("x", "<", float(i), 0, f"n{i}")) for i in range(n)]
+                for a, b in zip(*np.nonzero(below)):
+                    nodes[a].add_to_smaller_all(nodes[b])
+                    nodes[b].add_to_greater_all(nodes[a])
+                return PhiGraph([nodes[i] for i in perm])
+            self._check(build)
+
+    def test_smaller_all_untouched(self):
+        formula, k = _build_at1_spec(2)
+        g = Parser(formula, k).parse()
+        before = [[s.id for s in n.smaller_all] for n in g.nodes]
+        g.set_imme()
+        assert [[s.id for s in n.smaller_all] for n in g.nodes] == before
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T22 – Array-backed CompactGraph
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestCompactGraph:
+    """CompactGraph must answer every PhiGraph query identically."""
+
+    @staticmethod
+    def _ids(nodes):
+        return [n.id for n in nodes]
+
+    def test_from_closure_matches_set_imme(self):
+        from ceclass.lattice.compact_graph import CompactGraph
+        g = Parser(*_build_at1_spec(2)).parse()
+        position = {id(n): i for i, n in enumerate(g.nodes)}
+        c = CompactGraph.from_closure(
+            [n.formula for n in g.nodes],
+            [[position[id(s)] for s in n.smaller_all] for n in g.nodes])
+        for pn, cn in zip(g.nodes, c.nodes):
+            assert self._ids(cn.smaller_imme) == self._ids(pn.smaller_imme)
+            assert self._ids(cn.greater_imme) == self._ids(pn.greater_imme)
+            assert set(self._ids(cn.greater_all)) == set(self._ids(pn.greater_all))
+        assert self._ids(c.maxima) == self._ids(g.maxima)
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_pruning_sequence_matches(self, seed):
+        import random
+        from ceclass.lattice.compact_graph import CompactGraph
+        from ceclass.examples.autotrans import build_at2_spec
+        g = Parser(*build_at2_spec(3)).parse()
+        c = CompactGraph.from_phi_graph(g)
+        rng = random.Random(seed)
+        while not g.is_empty():
+            path, length = g.get_longest_path()
+            compact_path, compact_length = c.get_longest_path()
+            assert (self._ids(compact_path), compact_length) == (self._ids(path), length)
+            random.seed(seed)
+            expected = self._ids(g.get_random_path()[0])
+            random.seed(seed)
+            assert self._ids(c.get_random_path()[0]) == expected
+            i = g.nodes.index(rng.choice(g.get_active_nodes()))
+            if rng.random() < 0.5:
+                g.eliminate_hold(g.nodes[i], seed)
+                c.eliminate_hold(c.nodes[i], seed)
+            else:
+                g.eliminate_unhold(g.nodes[i])
+                c.eliminate_unhold(c.nodes[i])
+            assert self._ids(c.maxima) == self._ids(g.maxima)
+            assert self._ids(c.get_active_nodes()) == self._ids(g.get_active_nodes())
+        assert c.is_empty()
+        assert self._ids(c.get_covered_nodes()) == self._ids(g.get_covered_nodes())
+
+    @pytest.mark.parametrize("options", [
+        {}, {"hasse_edges": True}, {"canonical": True}, {"workers": 2},
+    ])
+    def test_parse_compact(self, options):
+        from ceclass.lattice.compact_graph import CompactGraph, CompactNode
+        from ceclass.examples.autotrans import build_at2_spec
+        expected = CompactGraph.from_phi_graph(Parser(*build_at2_spec(3), **options).parse())
+        parser = Parser(*build_at2_spec(3), **options)
+        graph = parser.parse_compact()
+        assert parser.phi_graph is graph
+        assert all(isinstance(nd, CompactNode) for nd in parser.simp_phi_dict.values())
+        assert self._ids(graph.nodes) == self._ids(expected.nodes)
+        for attr in ("smaller_all", "greater_all", "smaller_imme", "greater_imme"):
+            a, b = getattr(graph, attr), getattr(expected, attr)
+            assert a.indptr.tolist() == b.indptr.tolist()
+            assert a.indices.tolist() == b.indices.tolist()
+        assert self._ids(graph.maxima) == self._ids(expected.maxima)
+        assert graph.transitive == expected.transitive
+        assert self._ids([graph.bottom] if graph.bottom else []) == \
+            self._ids([expected.bottom] if expected.bottom else [])
+
+    @pytest.mark.parametrize("strategy", ["long_bs", "bfs", "alw_mid"])
+    def test_strategies_on_compact_graph(self, strategy):
+        from ceclass.strategies.alw_mid import AlwMidClassifier
+        from ceclass.strategies.bfs import BFSClassifier
+        from ceclass.strategies.long_bs import LongBSClassifier
+        cls = {"long_bs": LongBSClassifier, "bfs": BFSClassifier, "alw_mid": AlwMidClassifier}[strategy]
+        torch.manual_seed(17)
+        formula, k = _build_at1_spec(2)
+        traces = torch.stack([80 + 20 * torch.rand(4, 31), 3500 + 1000 * torch.rand(4, 31)], -1)
+        a = cls(formula, k, traces, dt=1.0, synth_mode="exact").solve()
+        b = cls(formula, k, traces, dt=1.0, synth_mode="exact", compact_graph=True).solve()
+        assert self._ids(b.covered_nodes) == self._ids(a.covered_nodes)
+        assert b.num_synth_calls == a.num_synth_calls
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T23 – Incremental longest-path DP
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _reference_longest_path(graph):
+    """The recursive-DFS PhiGraph.get_longest_path, for comparison."""
+    best = [[], 0]
+
+    def dfs(seq, node, val):
+        if node.active:
+            if val > best[1]:
+                best[:] = [list(seq), val]
+            for s in node.smaller_imme:
+                if s.active:
+                    dfs(seq + [s], s, val + 1)
+
+    for m in graph.maxima:
+        if m.active:
+            dfs([m], m, 1)
+    return [n.id for n in best[0]], best[1]
+
+
+class TestIncrementalLongestPath:
+    """get_longest_path must match the DFS, tie-breaking included, while pruning."""
+
+    @staticmethod
+    def _longest(graph):
+        path, length = graph.get_longest_path()
+        return [n.id for n in path], length
+
+    def test_diamond_prefers_first_child(self):
+        top, left, right, bottom = (PhiNode(formula=STLNode.predicate("s", "<", 1.0, 0, name))
+                                    for name in ("top", "left", "right", "bottom"))
+        top.smaller_imme = [left, right]
+        left.greater_imme = right.greater_imme = [top]
+        left.smaller_imme = right.smaller_imme = [bottom]
+        bottom.greater_imme = [left, right]
+        g = PhiGraph([top, left, right, bottom])
+        g.set_maxima()
+        assert self._longest(g) == ([top.id, left.id, bottom.id], 3)
+        g.eliminate_unhold(bottom)
+        assert self._longest(g) == ([top.id, left.id], 2)
+        g.eliminate_hold(left, None)
+        assert self._longest(g) == ([right.id], 1)
+        g.eliminate_hold(right, None)
+        assert self._longest(g) == ([], 0)
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_pruning_sequence_matches_dfs(self, seed):
+        import random
+        from ceclass.examples.autotrans import build_at2_spec
+        g = Parser(*build_at2_spec(3)).parse()
+        rng = random.Random(seed)
+        while not g.is_empty():
+            assert self._longest(g) == _reference_longest_path(g)
+            node = rng.choice(g.get_active_nodes())
+            r = rng.random()
+            if r < 0.4:
+                g.eliminate_hold(node, seed)
+            elif r < 0.8:
+                g.eliminate_unhold(node)
+            else:
+                node.active = False  # strategies may also flip flags directly
+                g.set_active_maxima()
+        assert self._longest(g) == ([], 0)
+
+    def test_set_imme_resets_depths(self):
+        formula, k = _build_at1_spec(2)
+        g = Parser(formula, k).parse()
+        assert self._longest(g) == _reference_longest_path(g)
+        for n in g.nodes:
+            n.smaller_imme.clear()
+            n.greater_imme.clear()
+        g.set_imme()
+        g.set_maxima()
+        assert self._longest(g) == _reference_longest_path(g)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T24 – Incremental active maxima
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestIncrementalMaxima:
+    """Maxima and is_empty follow every active flip without rescanning the graph."""
+
+    @staticmethod
+    def _scanned_maxima(graph):
+        return [n.id for n in graph.nodes
+                if n.active and not any(g.active for g in n.greater_imme)]
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_maxima_match_full_scan(self, seed):
+        import random
+        from ceclass.examples.autotrans import build_at2_spec
+        g = Parser(*build_at2_spec(3)).parse()
+        rng = random.Random(seed)
+        while not g.is_empty():
+            node = rng.choice(g.get_active_nodes())
+            r = rng.random()
+            if r < 0.5:
+                g.eliminate_hold(node, seed)
+                assert [m.id for m in g.maxima] == self._scanned_maxima(g)
+            elif r < 0.8:
+                g.eliminate_unhold(node)
+            else:
+                node.active = False
+            assert g.is_empty() == (not any(n.active for n in g.nodes))
+        g.set_active_maxima()
+        assert g.maxima == []
+
+    def test_reactivation_is_tracked(self):
+        formula, k = _build_at1_spec(2)
+        g = Parser(formula, k).parse()
+        g.set_active_maxima()
+        for n in g.nodes:
+            n.active = False
+        assert g.is_empty()
+        g.nodes[-1].active = True
+        assert not g.is_empty()
+        g.eliminate_hold(g.nodes[-1], None)
+        assert g.is_empty() and g.maxima == []
+
+    def test_long_chain_does_not_recurse(self):
+        chain = [PhiNode(formula=STLNode.predicate("s", "<", float(i), 0, f"n{i}"))
+                 for i in range(5000)]
+        for upper, lower in zip(chain, chain[1:]):
+            upper.smaller_imme = [lower]
+            lower.greater_imme = [upper]
+        g = PhiGraph(chain)
+        g.set_maxima()
+        g.eliminate_hold(chain[-1], "w")
+        assert g.is_empty()
+        assert all(n.results == ["w"] for n in chain)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T25 – Streaming lattice generation
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestStreamingParser:
+    """Root-level products are generated lazily, in the order of the old queues."""
+
+    def test_root_products_are_lazy(self):
+        from collections.abc import Iterator
+        from ceclass.examples.autotrans import build_at2_spec
+        p = Parser(*build_at2_spec(4))
+        nodes = p._parse_nodes_neg(p.formula, p.k)
+        edges = p._parse_edges_neg(p.formula, p.k)
+        assert isinstance(nodes, Iterator) and isinstance(edges, Iterator)
+        for _ in nodes:  # edges look up the generated formulas
+            pass
+        first = next(edges)
+        assert p.table.name(first[0]).startswith("NegAlw_")
+
+    def test_product_order_matches_queue_expansion(self):
+        p = Parser(*_build_at1_spec(3))
+        child = [p.table.name(i) for i in p._parse_nodes_neg(p.formula.children[0], p.k[1])]
+        p = Parser(*_build_at1_spec(3))
+        ids = [p.table.name(i) for i in p._parse_nodes_neg(p.formula, p.k)]
+        expected = ["NegAlw_" + a + b + c for a in child for b in child for c in child]
+        assert ids == expected
+
+    def test_edge_count_is_product_of_child_edges(self):
+        p = Parser(*_build_at1_spec(3))
+        child = list(p._parse_edges_neg(p.formula.children[0], p.k[1]))
+        assert sum(1 for _ in p._parse_edges_neg(p.formula, p.k)) == len(child) ** 3
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T26 – Interned formula IDs
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestFormulaTable:
+    """Structurally equal keys share one ID; names are built only on request."""
+
+    def test_intern_and_names(self):
+        from ceclass.lattice.formula_table import FormulaTable
+        table = FormulaTable()
+        a, t = table.intern(("speed_lt_90",)), table.intern(("TRUE",))
+        conj = table.intern(("NegAnd", a, t))
+        assert table.intern(("NegAnd", a, t)) == conj
+        assert table.get(("NegAnd", t, a)) is None
+        assert len(table) == 3
+        alw = table.intern(("NegAlw", "st", conj, "ed", a))
+        assert table.name(alw) == "NegAlw_stNegAnd_speed_lt_90TRUEedspeed_lt_90"
+
+    def test_simplified_formulas_are_shared(self):
+        from ceclass.examples.autotrans import build_at2_spec
+        p = Parser(*build_at2_spec(3))
+        g = p.parse()
+        assert len(p.table) > len(g.nodes)
+        # Formulas are only materialized for lattice nodes and their operands.
+        assert len(p.formula_dict) < len(p.simplify_dict)
+        for node in g.nodes:
+            assert p.simp_phi_dict[node.id] is node
+        for fid, formula in p.formula_dict.items():
+            tag, *operands = p.table.key(fid)
+            if operands and tag.endswith(("Not", "And", "Or")):
+                assert all(child is p.formula_dict[o]
+                           for child, o in zip(formula.children, operands))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T27 – On-disk lattice cache
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestLatticeCache:
+    """A cached lattice loads back identical to a fresh parse."""
+
+    @staticmethod
+    def _snapshot(parser, graph):
+        edges = [[[x.id for x in getattr(n, attr)]
+                  for attr in ("smaller_all", "greater_all", "smaller_imme", "greater_imme")]
+                 for n in graph.nodes]
+        return ([str(n.formula) for n in graph.nodes], edges,
+                [m.id for m in graph.maxima], dict(parser.interval_dict))
+
+    def test_round_trip(self):
+        from ceclass.examples.autotrans import build_at2_spec
+        from ceclass.lattice.cache import LatticeCache
+        with tempfile.TemporaryDirectory() as d:
+            cache = LatticeCache(d)
+            first = Parser(*build_at2_spec(3))
+            expected = self._snapshot(first, cache.parse(first))
+            second = Parser(*build_at2_spec(3))
+            graph = cache.parse(second)
+            assert (cache.hits, cache.misses) == (1, 1)
+            assert self._snapshot(second, graph) == expected
+            node = next(n for n in graph.nodes if n.formula.get_param_names())
+            assert second.get_param_bounds_for_node(node)
+            # Shared subformulas come back as shared objects.
+            assert len({id(f) for n in graph.nodes for f in n.formula.children}) < \
+                sum(len(n.formula.children) for n in graph.nodes)
+
+    def test_key_depends_on_formula_and_k(self):
+        from ceclass.examples.autotrans import build_at2_spec
+        from ceclass.lattice.cache import lattice_key
+        assert lattice_key(*build_at2_spec(2)) == lattice_key(*build_at2_spec(2))
+        assert lattice_key(*build_at2_spec(2)) != lattice_key(*build_at2_spec(3))
+        formula, k = _build_at1_spec(2)
+        other, _ = _build_at1_spec(2)
+        other.children[0].children[0].predicate_threshold += 1.0
+        assert lattice_key(formula, k) != lattice_key(other, k)
+
+    def test_hasse_edges_stored_apart(self):
+        from ceclass.lattice.cache import LatticeCache
+        with tempfile.TemporaryDirectory() as d:
+            cache = LatticeCache(d)
+            cache.parse(Parser(*_build_at1_spec(2)))
+            graph = cache.parse(Parser(*_build_at1_spec(2), hasse_edges=True))
+            assert (cache.hits, cache.misses) == (0, 2)
+            assert not graph.transitive
+            parser = Parser(*_build_at1_spec(2), hasse_edges=True)
+            again = cache.parse(parser)
+            assert cache.hits == 1 and not again.transitive
+            assert again.bottom is parser.simp_phi_dict[STLNode.true_node().id]
+
+    def test_corrupt_file_is_a_miss(self):
+        from ceclass.lattice.cache import LatticeCache
+        with tempfile.TemporaryDirectory() as d:
+            cache = LatticeCache(d)
+            parser = Parser(*_build_at1_spec(2))
+            cache.path(parser.formula, parser.k).parent.mkdir(parents=True, exist_ok=True)
+            cache.path(parser.formula, parser.k).write_bytes(b"not a lattice")
+            graph = cache.parse(parser)
+            assert cache.misses == 1 and len(graph.nodes) == 16
+            assert cache.parse(Parser(*_build_at1_spec(2))) is not graph
+            assert cache.hits == 1
+
+    def test_classifier_uses_cache(self, monkeypatch):
+        from ceclass.strategies.long_bs import LongBSClassifier
+        torch.manual_seed(3)
+        formula, k = _build_at1_spec(2)
+        traces = torch.stack([80 + 20 * torch.rand(4, 31), 3500 + 1000 * torch.rand(4, 31)], -1)
+        with tempfile.TemporaryDirectory() as d:
+            a = LongBSClassifier(formula, k, traces, dt=1.0, synth_mode="exact",
+                                 lattice_cache=d).solve()
+            monkeypatch.setattr(Parser, "parse", lambda self: pytest.fail("parsed again"))
+            b = LongBSClassifier(formula, k, traces, dt=1.0, synth_mode="exact",
+                                 lattice_cache=d).solve()
+        assert [n.id for n in b.covered_nodes] == [n.id for n in a.covered_nodes]
+        assert b.num_synth_calls == a.num_synth_calls
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T28 – Hasse edges from product covers
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestHasseEdges:
+    """``hasse_edges=True`` builds the lattice ``set_imme`` would."""
+
+    @staticmethod
+    def _snapshot(graph):
+        return ([n.id for n in graph.nodes],
+                [[x.id for x in n.smaller_imme] for n in graph.nodes],
+                [[x.id for x in n.greater_imme] for n in graph.nodes],
+                [sorted(x.id for x in graph.below(n)) for n in graph.nodes],
+                [sorted(x.id for x in graph.above(n)) for n in graph.nodes],
+                [m.id for m in graph.maxima])
+
+    @pytest.mark.parametrize("spec,k_val", [
+        ("at1", 2), ("at2", 3), ("at5", 3), ("afc1", 2), ("reach_avoid", 1),
+    ])
+    def test_same_lattice(self, spec, k_val):
+        from ceclass.examples.autotrans import SPEC_BUILDERS
+        expected = Parser(*SPEC_BUILDERS[spec](k_val)).parse()
+        graph = Parser(*SPEC_BUILDERS[spec](k_val), hasse_edges=True).parse()
+        assert self._snapshot(graph) == self._snapshot(expected)
+
+    def test_no_closure_lists(self):
+        from ceclass.lattice.compact_graph import CompactGraph
+        graph = Parser(*_build_at1_spec(3), hasse_edges=True).parse()
+        assert not graph.transitive and graph.bottom.id == STLNode.true_node().id
+        assert all(not n.smaller_all and not n.greater_all for n in graph.nodes)
+        compact = CompactGraph.from_phi_graph(graph)
+        assert compact.smaller_all.indices.size == 0
+        for pn, cn in zip(graph.nodes, compact.nodes):
+            assert sorted(x.id for x in compact.below(cn)) == sorted(x.id for x in graph.below(pn))
+            assert sorted(x.id for x in compact.above(cn)) == sorted(x.id for x in graph.above(pn))
+
+    def test_shortcuts_removed(self):
+        # Simplification merges product nodes in at2, so some mapped covers
+        # skip a level; none of them may survive as an immediate edge.
+        from ceclass.examples.autotrans import build_at2_spec
+        graph = Parser(*build_at2_spec(3), hasse_edges=True).parse()
+        for n in graph.nodes:
+            below = {id(x) for s in n.smaller_imme for x in graph.below(s)}
+            assert not any(id(s) in below for s in n.smaller_imme)
+
+    def test_classifier_option(self):
+        from ceclass.strategies.long_bs import LongBSClassifier
+        torch.manual_seed(3)
+        formula, k = _build_at1_spec(2)
+        traces = torch.stack([80 + 20 * torch.rand(4, 31), 3500 + 1000 * torch.rand(4, 31)], -1)
+        a = LongBSClassifier(formula, k, traces, dt=1.0, synth_mode="exact").solve()
+        b = LongBSClassifier(formula, k, traces, dt=1.0, synth_mode="exact",
+                             hasse_edges=True).solve()
+        assert [n.id for n in b.covered_nodes] == [n.id for n in a.covered_nodes]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T29 – Product-lattice factorization
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestFactoredClassifier:
+    """Classifying the child lattices gives the exhaustive root coverage."""
+
+    @staticmethod
+    def _covered(result):
+        return sorted(n.id for n in result.covered_nodes)
+
+    def test_and_root(self):
+        from ceclass.examples.autotrans import build_reach_avoid_spec
+        from ceclass.strategies import FactoredClassifier, LongBSClassifier, NoPruneClassifier
+        torch.manual_seed(0)
+        traces = torch.rand(6, 70, 2) * 22
+        formula, k = build_reach_avoid_spec(1)
+        expected = NoPruneClassifier(formula, k, traces, synth_mode="exact").solve()
+        clf = FactoredClassifier(formula, k, traces, strategy=LongBSClassifier, synth_mode="exact")
+        assert clf.factorable()
+        result = clf.solve()
+        assert result.num_classes == expected.num_classes
+        assert self._covered(result) == self._covered(expected)
+        assert result.num_synth_calls < expected.num_synth_calls
+
+    def test_or_root_needs_a_common_trace(self):
+        from ceclass.strategies import FactoredClassifier, NoPruneClassifier
+        def band(name, col, lo, hi):
+            return STLNode.and_node(
+                STLNode.predicate(name, "<", hi, signal_index=col, node_id=f"{name}_lt"),
+                STLNode.predicate(name, ">", lo, signal_index=col, node_id=f"{name}_gt"),
+                node_id=f"{name}_band")
+        formula = STLNode.or_node(
+            STLNode.always_node(band("speed", 0, 70, 90), interval=(0, 20), node_id="alw_speed"),
+            STLNode.always_node(band("RPM", 1, 3000, 4000), interval=(0, 20), node_id="alw_rpm"),
+            "Phi")
+        k_band = [1, [1, [1], [1]]]
+        k = [1, k_band, k_band]
+        # Trace 0 is too fast, trace 1 revs too high, trace 2 is too slow and
+        # revs too low: only trace 2 violates both children.
+        traces = torch.stack([torch.full((3, 31), 80.0), torch.full((3, 31), 3500.0)], -1)
+        traces[0, 3, 0] = 95.0
+        traces[1, 12, 1] = 4500.0
+        traces[2, 18, 0] = 60.0
+        traces[2, 1, 1] = 2500.0
+        expected = NoPruneClassifier(formula, k, traces, synth_mode="exact").solve()
+        result = FactoredClassifier(formula, k, traces, synth_mode="exact").solve()
+        assert result.num_classes == 10
+        assert self._covered(result) == self._covered(expected)
+        assert result.num_covered == 4
+
+    def test_falls_back_without_product(self):
+        from ceclass.strategies import FactoredClassifier, NoPruneClassifier
+        torch.manual_seed(3)
+        formula, k = _build_at1_spec(2)
+        traces = torch.stack([80 + 20 * torch.rand(4, 31), 3500 + 1000 * torch.rand(4, 31)], -1)
+        clf = FactoredClassifier(formula, k, traces, strategy=NoPruneClassifier, synth_mode="exact")
+        assert not clf.factorable()
+        expected = NoPruneClassifier(formula, k, traces, synth_mode="exact").solve()
+        assert self._covered(clf.solve()) == self._covered(expected)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T30 – Reusing k results at k+1
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestReuseAcrossK:
+    """A k result pre-prunes the (k+1) lattice without changing its coverage."""
+
+    def test_merged_segments_share_a_key(self):
+        from ceclass.lattice.canonical import CanonicalForms
+        forms = CanonicalForms()
+        coarse = Parser(*_build_at1_spec(1)).parse()
+        fine = Parser(*_build_at1_spec(2)).parse()
+        keys = {forms.key(n.formula) for n in fine.nodes}
+        assert all(forms.key(n.formula) in keys for n in coarse.nodes)
+        # Alw_[0,t2](speed) and Alw_[t2,30](speed) is Alw_[0,30](speed) ...
+        by_id = {n.id: n for n in fine.nodes}
+        split = by_id["NegAlw_stspeed_lt_90edspeed_lt_90"]
+        whole = next(n for n in coarse.nodes if n.id == "NegAlw_stspeed_lt_90")
+        assert forms.key(split.formula) == forms.key(whole.formula)
+        # ... but Alw_[0,t2](speed) alone is not.
+        assert forms.key(by_id["NegAlw_stspeed_lt_90"].formula) != forms.key(whole.formula)
+
+    def test_previous_result_prunes(self):
+        from ceclass.examples.autotrans import build_at5_spec
+        from ceclass.strategies import LongBSClassifier
+        traces = torch.stack([torch.full((6, 41), 80.0), torch.full((6, 41), 3500.0)], -1)
+        traces[0, 5, 0] = 60.0
+        traces[1, 12, 1] = 3000.0
+        traces[2, 25, :] = torch.tensor([60.0, 3000.0])
+        previous = None
+        for k_val in (1, 2, 3):
+            formula, k = build_at5_spec(k_val)
+            fresh = LongBSClassifier(formula, k, traces, synth_mode="exact").solve()
+            clf = LongBSClassifier(formula, k, traces, synth_mode="exact", previous=previous)
+            result = clf.solve()
+            assert sorted(n.id for n in result.covered_nodes) == \
+                sorted(n.id for n in fresh.covered_nodes)
+            assert result.num_covered + len(result.refuted_nodes) == result.num_classes
+            if previous is not None:
+                assert clf.num_reused >= previous.num_classes
+                assert result.num_synth_calls < fresh.num_synth_calls
+            previous = result
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T31 – Lazy lattice exploration
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestLazyGraph:
+    """A LazyGraph run decides every refinement as the full lattice does."""
+
+    @staticmethod
+    def _check(formula, k, traces, strategy):
+        from ceclass.lattice.lazy_graph import COVERED
+        expected = _exhaustive(formula, k, traces)
+        covered = {n.id for n in expected.covered_nodes}
+        clf = strategy(formula, k, traces, synth_mode="exact", lazy_graph=True)
+        result = clf.solve()
+        graph = clf.graph
+        assert graph.is_empty()
+        assert result.num_built == len(graph.nodes)
+        for term in graph.terms():
+            assert (graph.state(term) == COVERED) == (graph.node(term).id in covered)
+        assert {n.id for n in result.covered_nodes} <= covered
+        assert (result.num_classes, result.num_covered) == \
+            (expected.num_classes, expected.num_covered)
+        assert result.num_terms == graph.num_terms
+        return result, expected
+
+    def test_temporal_root(self):
+        from ceclass.strategies import AlwMidClassifier, LongBSClassifier
+        formula, k = _build_at1_spec(3)
+        traces = _at1_random_traces(1, 85, 10, 3800, 400)
+        for strategy in (LongBSClassifier, AlwMidClassifier):
+            result, expected = self._check(formula, k, traces, strategy)
+            assert result.num_classes == expected.num_classes
+            assert result.num_synth_calls < expected.num_synth_calls
+
+    def test_and_root(self):
+        from ceclass.examples.autotrans import build_reach_avoid_spec
+        from ceclass.strategies import BSRandomClassifier, LongBSClassifier
+        torch.manual_seed(1)
+        formula, k = build_reach_avoid_spec(1)
+        traces = torch.rand(6, 61, 2) * 20
+        for strategy in (LongBSClassifier, BSRandomClassifier):
+            self._check(formula, k, traces, strategy)
+
+    def test_builds_few_nodes(self):
+        from ceclass.strategies import LongBSClassifier
+        formula, k = _build_at1_spec(6)
+        traces = _at1_random_traces(1, 85, 10, 3800, 400)
+        clf = LongBSClassifier(formula, k, traces, synth_mode="exact", lazy_graph=True)
+        result = clf.solve()
+        assert clf.num_classes is None and result.num_terms == 4 ** 6
+        assert result.num_built < 200
+
+    def test_needs_a_path_strategy(self):
+        from ceclass.strategies import BFSClassifier, NoPruneClassifier
+        formula, k = _build_at1_spec(1)
+        traces = torch.zeros(1, 31, 2)
+        for strategy in (BFSClassifier, NoPruneClassifier):
+            with pytest.raises(ValueError):
+                strategy(formula, k, traces, lazy_graph=True)
+
+    @pytest.mark.parametrize("option", [
+        {"hasse_edges": True}, {"parse_workers": 2}, {"canonical": True}, {"compact_graph": True},
+    ])
+    def test_rejects_lattice_options(self, option):
+        from ceclass.strategies import LongBSClassifier
+        formula, k = _build_at1_spec(1)
+        with pytest.raises(ValueError):
+            LongBSClassifier(formula, k, torch.zeros(1, 31, 2), lazy_graph=True, **option)
+
+    def test_rejects_previous(self):
+        from ceclass.strategies import LongBSClassifier
+        formula, k = _build_at1_spec(2)
+        traces = _at1_random_traces(1, 85, 10, 3800, 400)
+        previous = LongBSClassifier(formula, k, traces, synth_mode="exact").solve()
+        with pytest.raises(ValueError):
+            LongBSClassifier(*_build_at1_spec(3), traces, synth_mode="exact",
+                             lazy_graph=True, previous=previous)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T32 – Canonical-form deduplication
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestCanonicalDedup:
+    """Refinements with the same canonical form are one lattice node."""
+
+    def test_boolean_normal_form(self):
+        from ceclass.lattice.canonical import CanonicalForms
+        a = STLNode.predicate("speed", "<", 90, signal_index=0, node_id="a")
+        b = STLNode.predicate("RPM", "<", 4000, signal_index=1, node_id="b")
+        forms = CanonicalForms()
+        ab = STLNode.and_node(a, b, "NegAnd_ab")
+        assert forms.key(ab) == forms.key(STLNode.and_node(b, a, "NegAnd_ba"))
+        assert forms.key(ab) == forms.key(STLNode.and_node(ab, a, "PosAnd_NegAnd_aba"))
+        assert forms.key(ab) != forms.key(STLNode.or_node(a, b, "NegOr_ab"))
+        absorbed = STLNode.and_node(a, STLNode.or_node(a, b, "NegOr_ab"), "NegAnd_aNegOr_ab")
+        assert forms.key(absorbed) == forms.key(a)
+        twice = STLNode.not_node(STLNode.not_node(a, "PosNot_a"), "NegNot_PosNot_a")
+        assert forms.key(twice) == forms.key(a)
+
+    def test_merged_lattice_keeps_coverage(self):
+        from ceclass.strategies import LongBSClassifier, NoPruneClassifier
+        formula, k = _build_at1_spec(4)
+        traces = _at1_random_traces(2, 88, 4, 3900, 200)
+        full = _exhaustive(formula, k, traces)
+        clf = NoPruneClassifier(formula, k, traces, synth_mode="exact", canonical=True)
+        merged = clf.solve()
+        assert merged.num_classes < full.num_classes
+        covered = {n.id for n in full.covered_nodes}
+        merged_covered = {n.id for n in merged.covered_nodes}
+        for fid, node in clf.parser.simp_phi_dict.items():
+            assert (fid in covered) == (node.id in merged_covered)
+        fast = LongBSClassifier(formula, k, traces, synth_mode="exact", canonical=True).solve()
+        assert {n.id for n in fast.covered_nodes} == merged_covered
+        assert fast.num_synth_calls < LongBSClassifier(
+            formula, k, traces, synth_mode="exact").solve().num_synth_calls
+
+    def test_cache_keeps_aliases(self):
+        from ceclass.lattice.cache import LatticeCache
+        formula, k = _build_at1_spec(3)
+        with tempfile.TemporaryDirectory() as d:
+            cache = LatticeCache(d)
+            first = Parser(formula, k, canonical=True)
+            cache.parse(first)
+            second = Parser(formula, k, canonical=True)
+            cache.parse(second)
+            assert cache.hits == 1
+        assert len(second.simp_phi_dict) > len(second.phi_graph.nodes)
+        assert {fid: n.id for fid, n in second.simp_phi_dict.items()} == \
+            {fid: n.id for fid, n in first.simp_phi_dict.items()}
+        nodes = {id(n) for n in second.phi_graph.nodes}
+        assert all(id(n) in nodes for n in second.simp_phi_dict.values())
+
+    def test_hasse_edges_agree(self):
+        formula, k = _build_at1_spec(4)
+        plain = Parser(formula, k, canonical=True).parse()
+        hasse = Parser(formula, k, canonical=True, hasse_edges=True).parse()
+        assert [(n.id, [s.id for s in n.smaller_imme]) for n in plain.nodes] == \
+            [(n.id, [s.id for s in n.smaller_imme]) for n in hasse.nodes]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T33 – Parallel root product
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestParallelProduct:
+    """A root product built in worker processes is the sequential lattice."""
+
+    @staticmethod
+    def _shape(graph):
+        return ([(n.id, str(n.formula), [s.id for s in n.smaller_all],
+                  [g.id for g in n.greater_all], [s.id for s in n.smaller_imme])
+                 for n in graph.nodes], [m.id for m in graph.maxima])
+
+    @pytest.mark.parametrize("spec", ["at5", "reach_avoid"])
+    def test_same_lattice(self, spec):
+        from ceclass.examples.autotrans import SPEC_BUILDERS
+        formula, k = SPEC_BUILDERS[spec](3 if spec == "at5" else 1)
+        sequential = Parser(formula, k)
+        pooled = Parser(formula, k, workers=2)
+        assert self._shape(pooled.parse()) == self._shape(sequential.parse())
+        assert pooled.interval_dict == sequential.interval_dict
+
+    def test_other_roots_stay_sequential(self):
+        from ceclass.lattice.product_pool import parse_root
+        phi = STLNode.not_node(STLNode.predicate("speed", "<", 90, signal_index=0, node_id="p"), "n")
+        assert parse_root(Parser(phi, [1, [1]]), 2) is None
+        assert len(Parser(phi, [1, [1]], workers=2).parse().nodes) == 2
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T34 – Chain-decomposition binary search
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestChainBS:
+    """Minimum chain decompositions, and ChainBS coverage."""
+
+    def test_decomposition_has_width_chains(self):
+        from ceclass.strategies.chain_bs import min_chain_decomposition
+        # Boolean lattice of {a, b, c}: width 3.
+        subsets = list(range(8))
+        smaller = [[t for t in subsets if t != s and t & s == t] for s in subsets]
+        chains = min_chain_decomposition(smaller)
+        assert len(chains) == 3
+        assert sorted(x for c in chains for x in c) == subsets
+        for chain in chains:
+            assert all(b in smaller[a] for a, b in zip(chain, chain[1:]))
+
+    def test_lattice_chains(self):
+        from ceclass.strategies.chain_bs import min_chain_decomposition
+        graph = Parser(*_build_at1_spec(3)).parse()
+        index = {n.id: i for i, n in enumerate(graph.nodes)}
+        chains = min_chain_decomposition([[index[s.id] for s in n.smaller_all]
+                                          for n in graph.nodes])
+        assert sorted(x for c in chains for x in c) == list(range(len(graph.nodes)))
+        for chain in chains:
+            assert all(graph.nodes[b] in graph.nodes[a].smaller_all
+                       for a, b in zip(chain, chain[1:]))
+        assert len(chains) == 20  # the lattice's width
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_matches_exhaustive(self, compact):
+        import math
+        from ceclass.strategies import ChainBSClassifier
+        formula, k = _build_at1_spec(4)
+        traces = _at1_random_traces(2, 88, 4, 3900, 200)
+        expected = _exhaustive(formula, k, traces)
+        clf = ChainBSClassifier(formula, k, traces, synth_mode="exact", compact_graph=compact)
+        result = clf.solve()
+        assert clf.graph.is_empty()
+        _assert_matches_exhaustive(result, expected)
+        assert result.num_synth_calls <= sum(math.ceil(math.log2(len(c) + 1))
+                                             for c in clf.chains)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# T35 – Speculative binary search
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestSpeculativeLongBS:
+    """Speculative LongBS records the verdicts of the sequential search."""
+
+    @pytest.mark.parametrize("lazy", [False, True])
+    def test_matches_sequential(self, lazy):
+        from ceclass.strategies import LongBSClassifier
+        formula, k = _build_at1_spec(4)
+        traces = _at1_random_traces(2, 88, 4, 3900, 200)
+        expected = LongBSClassifier(formula, k, traces, synth_mode="exact",
+                                    lazy_graph=lazy).solve()
+        clf = LongBSClassifier(formula, k, traces, synth_mode="exact", lazy_graph=lazy,
+                               speculative_workers=3)
+        result = clf.solve()
+        assert clf.graph.is_empty()
+        _assert_matches_exhaustive(result, expected)
+        assert sorted(n.id for n in result.refuted_nodes) == \
+            sorted(n.id for n in expected.refuted_nodes)
+        assert result.num_synth_calls == expected.num_synth_calls
+
+    def test_cmaes_budget_by_evaluations(self, monkeypatch):
+        import ceclass.strategies.base as base
+        from ceclass.strategies import LongBSClassifier
+        from ceclass.synthesis.param_synth import SynthResult
+        budgets = []
+
+        class Recorder(base.ParamSynthesis):
+            def solve(self):
+                budgets.append(self.max_time)
+                return SynthResult(satisfied=False, obj_best=1.0)
+
+        monkeypatch.setattr(base, "ParamSynthesis", Recorder)
+        formula, k = _build_at1_spec(3)
+        traces = _at1_random_traces(1, 85, 10, 3800, 400)
+        LongBSClassifier(formula, k, traces, max_time_per_node=5.0,
+                         speculative_workers=3).solve()
+        assert budgets and all(b == math.inf for b in budgets)